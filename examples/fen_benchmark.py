@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+
+"""
+Micro-benchmarks for converting between FENs and boards: the former
+square by square and character by character implementations, the
+bitboard based codec and the FEN cache.
+"""
+
+import argparse
+import random
+import timeit
+
+import medieval_chess
+
+from typing import Callable, List
+
+
+def legacy_board_fen(board: medieval_chess.Board) -> str:
+    builder: List[str] = []
+    empty = 0
+
+    for square in medieval_chess.SQUARES_180:
+        piece = board.piece_at(square)
+
+        if not piece:
+            empty += 1
+        else:
+            if empty:
+                builder.append(str(empty))
+                empty = 0
+            builder.append(piece.symbol())
+
+        if medieval_chess.BB_SQUARES[square] & medieval_chess.BB_FILE_H:
+            if empty:
+                builder.append(str(empty))
+                empty = 0
+
+            if square != medieval_chess.H1:
+                builder.append("/")
+
+    return "".join(builder)
+
+
+def legacy_set_board_fen(board: medieval_chess.Board, fen: str) -> None:
+    # Validation is shared with the slow path of the new parser.
+    board._set_board_fen_slow(fen)
+
+
+def positions(count: int, seed: int) -> List[medieval_chess.Board]:
+    rng = random.Random(seed)
+    boards: List[medieval_chess.Board] = []
+    while len(boards) < count:
+        board = medieval_chess.Board()
+        for _ in range(rng.randint(0, 80)):
+            moves = list(board.legal_moves)
+            if not moves:
+                break
+            board.push(rng.choice(moves))
+        boards.append(board.copy(stack=False))
+    return boards
+
+
+def bench(name: str, func: Callable[[], object], number: int, items: int) -> float:
+    seconds = min(timeit.repeat(func, number=number, repeat=5)) / (number * items)
+    print(f"{name:32} {seconds * 1e6:8.2f} us")
+    return seconds
+
+
+def main(count: int, number: int) -> None:
+    boards = positions(count, seed=0)
+    fens = [board.fen() for board in boards]
+    board_fens = [fen.split()[0] for fen in fens]
+
+    scratch = medieval_chess.Board(None)
+    for board, board_fen in zip(boards, board_fens):
+        assert legacy_board_fen(board) == board.board_fen() == board_fen
+        scratch._set_board_fen(board_fen)
+        assert scratch.board_fen() == board_fen
+
+    print(f"{count} positions from random games, time per position:")
+
+    old = bench("board_fen() (square by square)", lambda: [legacy_board_fen(board) for board in boards], number, count)
+    new = bench("board_fen()", lambda: [board.board_fen() for board in boards], number, count)
+    print(f"{'':32} {old / new:8.1f}x")
+
+    def set_board_fens_legacy() -> None:
+        for fen in board_fens:
+            legacy_set_board_fen(scratch, fen)
+
+    def set_board_fens() -> None:
+        for fen in board_fens:
+            scratch._set_board_fen(fen)
+
+    old = bench("set_board_fen() (by character)", set_board_fens_legacy, number, count)
+    new = bench("set_board_fen()", set_board_fens, number, count)
+    print(f"{'':32} {old / new:8.1f}x")
+
+    bench("fen()", lambda: [board.fen() for board in boards], number, count)
+    bench("fen(medieval=True)", lambda: [board.fen(medieval=True) for board in boards], number, count)
+    bench("Board(fen)", lambda: [medieval_chess.Board(fen) for fen in fens], number, count)
+
+    cache = medieval_chess.FenCache(maxsize=count)
+    bench("FenCache.board(fen) (hits)", lambda: [cache.board(fen) for fen in fens], number, count)
+    print(f"{'':32} {cache.hits} hits, {cache.misses} misses")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-c", "--count", type=int, default=200, help="Number of positions")
+    parser.add_argument("-n", "--number", type=int, default=20, help="Passes over the positions per measurement")
+    args = parser.parse_args()
+    main(args.count, args.number)
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+
+"""
+Measure the import time of medieval_chess before and after the attack
+table cache: with the cache disabled (tables built in pure Python, as
+before), with a cold cache (tables built and written) and with a warm
+cache.
+
+Pass --baseline with a checkout of an earlier version, for example from
+``git worktree add /tmp/baseline <rev>``, to also measure its import time.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from typing import Callable, Dict, List, Optional
+
+
+def import_time(env: Dict[str, str], cwd: Optional[str] = None) -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "import medieval_chess"], env=env, cwd=cwd, check=True)
+    return time.perf_counter() - start
+
+
+def baseline(env: Dict[str, str]) -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "pass"], env=env, check=True)
+    return time.perf_counter() - start
+
+
+def cold_import_time(env: Dict[str, str]) -> float:
+    with tempfile.TemporaryDirectory() as cache_dir:
+        return import_time(dict(env, MEDIEVAL_CHESS_CACHE_DIR=cache_dir))
+
+
+def main(runs: int, baseline_dir: Optional[str]) -> None:
+    with tempfile.TemporaryDirectory() as cache_dir:
+        scenarios: Dict[str, Callable[[], float]] = {}
+        if baseline_dir is not None:
+            # Run from the checkout, so that it shadows this tree.
+            baseline_env = dict(os.environ, PYTHONPATH=baseline_dir)
+            import_time(baseline_env, cwd=baseline_dir)
+            scenarios["baseline"] = lambda: import_time(baseline_env, cwd=baseline_dir)
+        no_cache_env = dict(os.environ, MEDIEVAL_CHESS_CACHE_DIR="")
+        warm_cache_env = dict(os.environ, MEDIEVAL_CHESS_CACHE_DIR=cache_dir)
+        scenarios["no cache"] = lambda: import_time(no_cache_env)
+        scenarios["cold cache"] = lambda: cold_import_time(os.environ.copy())
+        scenarios["warm cache"] = lambda: import_time(warm_cache_env)
+
+        # Populate the cache and the bytecode cache.
+        import_time(warm_cache_env)
+
+        interpreter = statistics.median(baseline(os.environ.copy()) for _ in range(runs))
+        for name, measure in scenarios.items():
+            samples: List[float] = [measure() - interpreter for _ in range(runs)]
+            print(f"{name}: {statistics.median(samples) * 1000:.1f} ms (median of {runs}, interpreter startup excluded)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", "--runs", type=int, default=20, help="Number of imports per scenario")
+    parser.add_argument("--baseline", metavar="DIR", help="Checkout of an earlier version to compare with")
+    args = parser.parse_args()
+    main(args.runs, args.baseline)
@@ -406,19 +406,22 @@ def start_game_from_fen(fen=None, print_moves=False):
                                 print(f"Move: {chess.square_name(selected_square)}{chess.square_name(clicked_square)}")
                             
                             # Check game end conditions
-                            if board.is_checkmate():
-                                display_message(screen, "Checkmate! " + ("White wins!" if board.turn == chess.BLACK else "Black wins!"))
+                            outcome = board.outcome()
+                            if outcome is None:
+                                pass
+                            elif outcome.termination == chess.Termination.CHECKMATE:
+                                display_message(screen, "Checkmate! " + ("White wins!" if outcome.winner == chess.WHITE else "Black wins!"))
                                 running = False
-                            elif board.is_stalemate():
+                            elif outcome.termination == chess.Termination.STALEMATE:
                                 display_message(screen, "Stalemate! It's a draw!")
                                 running = False
-                            elif board.is_insufficient_material():
+                            elif outcome.termination == chess.Termination.INSUFFICIENT_MATERIAL:
                                 display_message(screen, "Draw due to insufficient material!")
                                 running = False
-                            elif board.is_seventyfive_moves():
+                            elif outcome.termination == chess.Termination.SEVENTYFIVE_MOVES:
                                 display_message(screen, "Draw due to the 75-move rule!")
                                 running = False
-                            elif board.is_fivefold_repetition():
+                            elif outcome.termination == chess.Termination.FIVEFOLD_REPETITION:
                                 display_message(screen, "Draw due to fivefold repetition!")
                                 running = False
                             
@@ -15,16 +15,20 @@ __version__ = "1.11.1"
 
 __title__ = "medieval_chess"
 
+import array
+import binascii
 import collections
-import copy
 import dataclasses
 import enum
 import math
+import os
 import re
 import itertools
+import struct
+import sys
 import typing
 
-from typing import ClassVar, Callable, Counter, Dict, Hashable, Iterable, Iterator, List, Literal, Mapping, Optional, SupportsInt, Tuple, Type, TypeVar, Union
+from typing import ClassVar, Callable, Counter, Dict, Hashable, Iterable, Iterator, List, Literal, Mapping, Optional, SupportsInt, TextIO, Tuple, Type, TypeVar, Union
 
 if typing.TYPE_CHECKING:
     from typing_extensions import Self, TypeAlias
@@ -516,15 +520,24 @@ def _sliding_attacks(square: Square, occupied: Bitboard, deltas: Iterable[int])
 def _step_attacks(square: Square, deltas: Iterable[int]) -> Bitboard:
     return _sliding_attacks(square, BB_ALL, deltas)
 
-# Add new diagonal jump attacks using existing _step_attacks function
-BB_1_DIAGONAL_JUMPER_ATTACKS: List[Bitboard] = [_step_attacks(sq, [7, 9, -7, -9]) for sq in SQUARES]
-BB_2_DIAGONAL_JUMPER_ATTACKS: List[Bitboard] = [_step_attacks(sq, [18, 14, -18, -14]) for sq in SQUARES]
-BB_3_DIAGONAL_JUMPER_ATTACKS: List[Bitboard] = [_step_attacks(sq, [27, 21, -21, -27]) for sq in SQUARES]
-BB_KNIGHT_ATTACKS: List[Bitboard] = [_step_attacks(sq, [17, 15, 10, 6, -17, -15, -10, -6]) for sq in SQUARES]
-BB_KING_ATTACKS: List[Bitboard] = [_step_attacks(sq, [9, 8, 7, 1, -9, -8, -7, -1]) for sq in SQUARES]
-BB_PAWN_ATTACKS: List[List[Bitboard]] = [[_step_attacks(sq, deltas) for sq in SQUARES] for deltas in [[-7, -9], [7, 9]]]
-BB_BISHOP_ATTACKS: List[Bitboard] = BB_2_DIAGONAL_JUMPER_ATTACKS
-BB_2_ORTHOGONAL_JUMPER_ATTACKS: List[Bitboard] = [_step_attacks(sq, [16, -16, 2, -2]) for sq in SQUARES]
+# Deltas of the step attack tables, which are built (or loaded) together
+# with the sliding attack tables below.
+_STEP_DELTAS: List[List[int]] = [
+    [7, 9, -7, -9],  # 1 diagonal jumper
+    [18, 14, -18, -14],  # 2 diagonal jumper
+    [27, 21, -21, -27],  # 3 diagonal jumper
+    [17, 15, 10, 6, -17, -15, -10, -6],  # knight
+    [9, 8, 7, 1, -9, -8, -7, -1],  # king
+    [-7, -9],  # black pawn
+    [7, 9],  # white pawn
+    [16, -16, 2, -2],  # 2 orthogonal jumper
+]
+
+# Deltas of the lines that rooks slide along, and of the diagonals, which
+# complete the rays.
+_RANK_DELTAS: List[int] = [-1, 1]
+_FILE_DELTAS: List[int] = [-8, 8]
+_DIAG_DELTAS: List[int] = [-9, -7, 7, 9]
 
 def _edges(square: Square) -> Bitboard:
     return (((BB_RANK_1 | BB_RANK_8) & ~BB_RANKS[square_rank(square)]) |
@@ -539,44 +552,228 @@ def _carry_rippler(mask: Bitboard) -> Iterator[Bitboard]:
         if not subset:
             break
 
-def _attack_table(deltas: List[int]) -> Tuple[List[Bitboard], List[Dict[Bitboard, Bitboard]]]:
+def _line_attacks(square: Square, deltas: List[int]) -> Tuple[Bitboard, List[Tuple[Bitboard, Bitboard]]]:
+    # The relevant occupancy of the line through square (without the edges,
+    # which never block anything behind them) and, for each of its subsets,
+    # the attacks found by walking the rays.
+    mask = _sliding_attacks(square, BB_EMPTY, deltas) & ~_edges(square)
+    return mask, [(subset, _sliding_attacks(square, subset, deltas)) for subset in _carry_rippler(mask)]
+
+# Magic multipliers for rook attacks, found by random trial, mapping the
+# relevant occupancy of each square to a collision free index.
+# https://www.chessprogramming.org/Magic_Bitboards
+BB_ROOK_MAGICS: List[int] = [
+    0x0080_0040_0020_8014, 0x1140_0010_0040_2002, 0x0200_2200_0880_4010, 0xb100_1000_6100_1994,
+    0x8600_0200_0410_8821, 0x8500_0213_0008_0400, 0x0280_0600_0100_0180, 0xc480_0031_0000_4080,
+    0x0052_8010_8040_0020, 0x8014_4005_2010_0140, 0x0220_8020_0080_1000, 0x2080_8010_0080_0800,
+    0x0202_0022_0010_0804, 0xb002_0010_0200_0408, 0xa069_8009_0080_2200, 0xa002_0000_8400_4102,
+    0x0400_8280_0040_0020, 0x3000_4440_0020_1002, 0x0320_0440_1001_c800, 0x0219_0100_0810_0020,
+    0x0214_0500_0801_0010, 0x2002_0080_8004_0002, 0x7440_c400_0108_1002, 0x0400_0200_0100_8064,
+    0x0a40_4008_8020_8000, 0x0020_5000_4000_2004, 0x1a71_3001_8020_0080, 0x8100_1000_8008_0080,
+    0x2000_0800_8004_0080, 0x2010_0200_8004_0080, 0x0008_8204_0090_0108, 0x1000_8522_0010_4284,
+    0x00c0_0840_8480_0022, 0x0000_4020_0140_1000, 0x8001_0020_0500_4010, 0x44c5_0010_0100_0820,
+    0x4000_0400_8080_0801, 0x11c8_1040_0801_0420, 0x0040_0108_0400_8210, 0x4004_0081_2200_1044,
+    0x1000_4000_8020_8003, 0x4000_2010_0044_4000, 0x0022_0020_8012_0040, 0x0009_0010_0021_0008,
+    0x0805_0010_0801_0004, 0x0000_0400_0200_8080, 0x8003_0002_0001_0004, 0x4021_0004_a041_000a,
+    0x0000_2080_0040_1080, 0x90c4_4000_9021_0100, 0x0404_2000_1000_8480, 0x0420_1000_8008_0280,
+    0x1000_0401_8008_0180, 0x0010_0200_0400_8080, 0x0020_1001_0802_0400, 0x0020_0444_00a5_0600,
+    0x1102_0080_2048_1102, 0x0004_4000_2104_1481, 0x4318_8010_4200_210a, 0x8e00_0500_2008_1001,
+    0x3012_0088_1020_0502, 0x1001_0002_0804_0001, 0x0010_5008_3208_910c, 0x0000_90c4_2509_8406,
+]
+
+def _rook_attack_table() -> Tuple[List[Bitboard], List[List[Bitboard]]]:
     mask_table: List[Bitboard] = []
-    attack_table: List[Dict[Bitboard, Bitboard]] = []
+    attack_table: List[List[Bitboard]] = []
 
     for square in SQUARES:
-        attacks = {}
-
-        mask = _sliding_attacks(square, 0, deltas) & ~_edges(square)
-        for subset in _carry_rippler(mask):
-            attacks[subset] = _sliding_attacks(square, subset, deltas)
+        rank_mask, rank_attacks = _line_attacks(square, _RANK_DELTAS)
+        file_mask, file_attacks = _line_attacks(square, _FILE_DELTAS)
+        mask = rank_mask | file_mask
+        shift = 64 - popcount(mask)
+        magic = BB_ROOK_MAGICS[square]
+
+        # Rays along the rank and the file are independent, so each slot
+        # combines one subset of either. Their occupancies are disjoint, so
+        # the product of the union with the magic is the sum of products.
+        file_products = [(subset * magic, attacks) for subset, attacks in file_attacks]
+        attacks = [BB_EMPTY] * (1 << (64 - shift))
+        for rank_subset, rank_attack in rank_attacks:
+            rank_product = rank_subset * magic
+            for file_product, file_attack in file_products:
+                attacks[((rank_product + file_product) & BB_ALL) >> shift] = rank_attack | file_attack
 
-        attack_table.append(attacks)
         mask_table.append(mask)
+        attack_table.append(attacks)
 
     return mask_table, attack_table
 
-BB_DIAG_MASKS, BB_DIAG_ATTACKS = _attack_table([-9, -7, 7, 9])
-BB_FILE_MASKS, BB_FILE_ATTACKS = _attack_table([-8, 8])
-BB_RANK_MASKS, BB_RANK_ATTACKS = _attack_table([-1, 1])
 
-
-def _rays() -> List[List[Bitboard]]:
+def _rays(rows: Iterable[Square] = SQUARES) -> List[List[Bitboard]]:
+    diag_attacks = [_sliding_attacks(square, BB_EMPTY, _DIAG_DELTAS) for square in SQUARES]
+    file_attacks = [_sliding_attacks(square, BB_EMPTY, _FILE_DELTAS) for square in SQUARES]
+    rank_attacks = [_sliding_attacks(square, BB_EMPTY, _RANK_DELTAS) for square in SQUARES]
     rays: List[List[Bitboard]] = []
-    for a, bb_a in enumerate(BB_SQUARES):
+    for a in rows:
+        bb_a = BB_SQUARES[a]
         rays_row: List[Bitboard] = []
         for b, bb_b in enumerate(BB_SQUARES):
-            if BB_DIAG_ATTACKS[a][0] & bb_b:
-                rays_row.append((BB_DIAG_ATTACKS[a][0] & BB_DIAG_ATTACKS[b][0]) | bb_a | bb_b)
-            elif BB_RANK_ATTACKS[a][0] & bb_b:
-                rays_row.append(BB_RANK_ATTACKS[a][0] | bb_a)
-            elif BB_FILE_ATTACKS[a][0] & bb_b:
-                rays_row.append(BB_FILE_ATTACKS[a][0] | bb_a)
+            if diag_attacks[a] & bb_b:
+                rays_row.append((diag_attacks[a] & diag_attacks[b]) | bb_a | bb_b)
+            elif rank_attacks[a] & bb_b:
+                rays_row.append(rank_attacks[a] | bb_a)
+            elif file_attacks[a] & bb_b:
+                rays_row.append(file_attacks[a] | bb_a)
             else:
                 rays_row.append(BB_EMPTY)
         rays.append(rays_row)
     return rays
 
-BB_RAYS = _rays()
+
+# The attack tables take tens of milliseconds to build in pure Python,
+# which dominates the import time. They are cached in a binary file in the
+# per-user cache directory, that is regenerated whenever it is missing,
+# corrupt or stale. Set MEDIEVAL_CHESS_CACHE_DIR to choose the directory,
+# or to an empty string to disable the cache. If the directory is not
+# writable, the tables are silently built on every import.
+_ATTACK_CACHE_VERSION = 3
+_ATTACK_CACHE_HEADER = struct.Struct("<8sIII")
+_ATTACK_CACHE_MAGIC = b"MCATTACK"
+
+_AttackTables = Tuple[List[Bitboard], List[List[Bitboard]], List[List[Bitboard]], List[List[Bitboard]]]
+
+def _attack_cache_path() -> Optional[str]:
+    cache_dir = os.environ.get("MEDIEVAL_CHESS_CACHE_DIR")
+    if cache_dir is None:
+        cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+        if not os.path.isabs(cache_home):
+            # No home directory to expand.
+            return None
+        cache_dir = os.path.join(cache_home, "medieval_chess")
+    elif not cache_dir:
+        return None
+    return os.path.join(cache_dir, f"attacks-v{_ATTACK_CACHE_VERSION}.bin")
+
+def _attack_cache_fingerprint() -> int:
+    # All inputs of _build_attack_tables().
+    return binascii.crc32(repr((_STEP_DELTAS, _RANK_DELTAS, _FILE_DELTAS, _DIAG_DELTAS, BB_ROOK_MAGICS)).encode("ascii"))
+
+def _check_attack_tables(tables: _AttackTables) -> bool:
+    # The fingerprint does not cover the code that builds the tables, so
+    # also compare a few entries with freshly computed values.
+    rook_masks, rook_table, step_tables, rays = tables
+    samples = [A1, E4, H8]
+    for square in samples:
+        mask = rook_masks[square]
+        if mask != _sliding_attacks(square, BB_EMPTY, _RANK_DELTAS + _FILE_DELTAS) & ~_edges(square):
+            return False
+        for subset in [BB_EMPTY, mask & BB_LIGHT_SQUARES, mask]:
+            index = (subset * BB_ROOK_MAGICS[square] & BB_ALL) >> (64 - popcount(mask))
+            if rook_table[square][index] != _sliding_attacks(square, subset, _RANK_DELTAS + _FILE_DELTAS):
+                return False
+        for step_table, deltas in zip(step_tables, _STEP_DELTAS):
+            if step_table[square] != _step_attacks(square, deltas):
+                return False
+    return [rays[square] for square in samples] == _rays(samples)
+
+def _build_attack_tables() -> _AttackTables:
+    rook_masks, rook_table = _rook_attack_table()
+    step_tables = [[_step_attacks(sq, deltas) for sq in SQUARES] for deltas in _STEP_DELTAS]
+    return rook_masks, rook_table, step_tables, _rays()
+
+def _dump_attack_tables(tables: _AttackTables) -> bytes:
+    rook_masks, rook_table, step_tables, rays = tables
+    payload = array.array("Q", rook_masks)
+    for row in itertools.chain(rook_table, step_tables, rays):
+        payload.extend(row)
+    if sys.byteorder != "little":
+        payload.byteswap()
+
+    data = payload.tobytes()
+    return _ATTACK_CACHE_HEADER.pack(_ATTACK_CACHE_MAGIC, _ATTACK_CACHE_VERSION, _attack_cache_fingerprint(), binascii.crc32(data)) + data
+
+def _load_attack_tables(data: bytes) -> Optional[_AttackTables]:
+    if len(data) < _ATTACK_CACHE_HEADER.size:
+        return None
+    magic, version, fingerprint, checksum = _ATTACK_CACHE_HEADER.unpack_from(data)
+    if magic != _ATTACK_CACHE_MAGIC or version != _ATTACK_CACHE_VERSION or fingerprint != _attack_cache_fingerprint():
+        return None
+    body = memoryview(data)[_ATTACK_CACHE_HEADER.size:]
+    if binascii.crc32(body) != checksum or len(body) % 8:
+        return None
+
+    payload = array.array("Q")
+    payload.frombytes(body)
+    if sys.byteorder != "little":
+        payload.byteswap()
+
+    rook_masks = payload[:64].tolist()
+    offset = 64
+    rook_table = []
+    for mask in rook_masks:
+        size = 1 << popcount(mask)
+        rook_table.append(payload[offset:offset + size].tolist())
+        offset += size
+
+    if len(rook_masks) != 64 or len(payload) - offset != (len(_STEP_DELTAS) + 64) * 64:
+        return None
+    step_tables = [payload[start:start + 64].tolist() for start in range(offset, offset + len(_STEP_DELTAS) * 64, 64)]
+    offset += len(_STEP_DELTAS) * 64
+    rays = [payload[start:start + 64].tolist() for start in range(offset, len(payload), 64)]
+    tables = rook_masks, rook_table, step_tables, rays
+    return tables if _check_attack_tables(tables) else None
+
+def _attack_tables() -> _AttackTables:
+    path = _attack_cache_path()
+    if path is None:
+        return _build_attack_tables()
+
+    try:
+        with open(path, "rb") as f:
+            tables = _load_attack_tables(f.read())
+    except OSError:
+        tables = None
+    if tables is not None:
+        return tables
+
+    import tempfile  # Only needed for a cold cache.
+    tables = _build_attack_tables()
+    tmp_path = None
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # A unique name in the target directory, so that concurrent writers
+        # (possibly on other hosts sharing the directory) cannot collide.
+        fd, tmp_path = tempfile.mkstemp(prefix=".attacks-", suffix=".tmp", dir=os.path.dirname(path))
+        with os.fdopen(fd, "wb") as f:
+            f.write(_dump_attack_tables(tables))
+        os.replace(tmp_path, path)
+    except OSError:
+        if tmp_path is not None:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+    return tables
+
+BB_ROOK_MASKS, BB_ROOK_ATTACKS, _STEP_TABLES, BB_RAYS = _attack_tables()
+
+BB_1_DIAGONAL_JUMPER_ATTACKS: List[Bitboard] = _STEP_TABLES[0]
+BB_2_DIAGONAL_JUMPER_ATTACKS: List[Bitboard] = _STEP_TABLES[1]
+BB_3_DIAGONAL_JUMPER_ATTACKS: List[Bitboard] = _STEP_TABLES[2]
+BB_KNIGHT_ATTACKS: List[Bitboard] = _STEP_TABLES[3]
+BB_KING_ATTACKS: List[Bitboard] = _STEP_TABLES[4]
+BB_PAWN_ATTACKS: List[List[Bitboard]] = _STEP_TABLES[5:7]
+BB_BISHOP_ATTACKS: List[Bitboard] = BB_2_DIAGONAL_JUMPER_ATTACKS
+BB_2_ORTHOGONAL_JUMPER_ATTACKS: List[Bitboard] = _STEP_TABLES[7]
+
+BB_ROOK_SHIFTS: List[int] = [64 - popcount(mask) for mask in BB_ROOK_MASKS]
+
+def rook_attacks(square: Square, occupied: Bitboard) -> Bitboard:
+    """
+    Gets the squares attacked by a rook on *square*, with *occupied*
+    blocking its rays, using a single lookup in the magic bitboard tables.
+    """
+    return BB_ROOK_ATTACKS[square][((occupied & BB_ROOK_MASKS[square]) * BB_ROOK_MAGICS[square] & BB_ALL) >> BB_ROOK_SHIFTS[square]]
+
 
 def ray(a: Square, b: Square) -> Bitboard:
     return BB_RAYS[a][b]
@@ -586,10 +783,132 @@ def between(a: Square, b: Square) -> Bitboard:
     return bb & (bb - 1)
 
 
+def _zobrist_keys(count: int, seed: int) -> List[int]:
+    # SplitMix64, so that keys are stable across Python versions and
+    # processes without depending on the random module.
+    keys: List[int] = []
+    state = seed
+    for _ in range(count):
+        state = (state + 0x9e37_79b9_7f4a_7c15) & BB_ALL
+        z = state
+        z = ((z ^ (z >> 30)) * 0xbf58_476d_1ce4_e5b9) & BB_ALL
+        z = ((z ^ (z >> 27)) * 0x94d0_49bb_1331_11eb) & BB_ALL
+        keys.append(z ^ (z >> 31))
+    return keys
+
+def _zobrist_tables() -> Tuple[List[List[List[int]]], List[int], List[int], int, int]:
+    keys = iter(_zobrist_keys(2 * len(PIECE_TYPES) * 64 + 64 + 8 + 2, 0x6d65_6469_6576_616c))
+    pieces = [[[0] * 64] + [[next(keys) for _ in SQUARES] for _ in PIECE_TYPES] for _ in COLORS]
+    castling = [next(keys) for _ in SQUARES]
+    ep = [next(keys) for _ in FILE_NAMES]
+    return pieces, castling, ep, next(keys), next(keys)
+
+# Indexed by [color][piece_type][square], by square of the castling rook, and
+# by file of the en passant square.
+ZOBRIST_PIECES, ZOBRIST_CASTLING, ZOBRIST_EP, ZOBRIST_TURN, ZOBRIST_CAPTURE_HAPPENED = _zobrist_tables()
+
+
 SAN_REGEX = re.compile(r"^([NBKRQ])?([a-h])?([1-8])?[\-x]?([a-h][1-8])(=?[nbrqkNBRQK])?[\+#]?\Z")
 
+# Maximum number of moves remembered by Board.parse_san() before the memo
+# is cleared.
+_SAN_MEMO_SIZE = 4096
+
+def _san_promotion(symbol: str) -> PieceType:
+    # Pawns promote to queens that may still make their grace jump.
+    piece_type = PIECE_SYMBOLS.index(symbol.lower())
+    return QUEEN_GRACE_JUMP if piece_type == QUEEN else piece_type
+
+# Lightweight reading of PGN mainlines, for bulk imports of medieval games
+# that bypass the game tree of medieval_chess.pgn.
+_PGN_TAG_REGEX = re.compile(r"^\[([A-Za-z0-9][A-Za-z0-9_+#=:-]*)\s+\"([^\r]*)\"\]\s*$")
+
+_PGN_MOVETEXT_TOKEN_REGEX = re.compile(r"\{[^}]*\}?|;[^\n]*|\(|\)|\$\d+|\d+\.+|[^\s(){};$]+")
+
+_PGN_RESULTS = ["1-0", "0-1", "1/2-1/2", "*"]
+
+def _read_pgn_games(handle: TextIO) -> Iterator[Tuple[Dict[str, str], List[str]]]:
+    headers: Dict[str, str] = {}
+    movetext: List[str] = []
+    in_comment = False
+
+    for line in handle:
+        if in_comment or not line.startswith(("[", "%")):
+            if movetext or not line.isspace():
+                movetext.append(line)
+            # Comments do not nest, so the last brace decides.
+            in_comment = line.rfind("{") > line.rfind("}") or in_comment and "}" not in line
+        elif line.startswith("["):
+            if movetext:
+                yield headers, movetext
+                headers, movetext = {}, []
+            tag_match = _PGN_TAG_REGEX.match(line)
+            if tag_match:
+                headers[tag_match.group(1)] = tag_match.group(2)
+
+    if headers or movetext:
+        yield headers, movetext
+
+def _pgn_mainline_sans(movetext: List[str]) -> Iterator[str]:
+    depth = 0
+    for token in _PGN_MOVETEXT_TOKEN_REGEX.findall("".join(movetext)):
+        if token == "(":
+            depth += 1
+        elif token == ")":
+            depth = max(depth - 1, 0)
+        elif depth or token[0] in "{;$" or token[0].isdigit() and token.endswith(".") or token in _PGN_RESULTS:
+            continue
+        else:
+            yield token.rstrip("?!")
+
 FEN_CASTLING_REGEX = re.compile(r"^(?:-|[KQABCDEFGH]{0,2}[kqabcdefgh]{0,2})\Z")
 
+FEN_MEDIEVAL_REGEX = re.compile(r"^(?:-|(?:[a-h][1-8])*x?)\Z")
+
+# Board parts of FENs without promoted pieces, up to the row sums.
+_FEN_BOARD_REGEX = re.compile("/".join([r"(?:[1-8]?[pnbrqkPNBRQK])*[1-8]?"] * 8) + r"\Z")
+
+# Expands the board part of a FEN to one character per square.
+_FEN_EXPAND = str.maketrans({str(n): "1" * n for n in range(1, 9)})
+
+# Translate the expanded board part to binary strings of piece masks.
+_FEN_WHITE = str.maketrans({symbol: "1" if symbol.isupper() else "0" for symbol in "1pnbrqkPNBRQK"})
+_FEN_PIECES = [(symbol, str.maketrans({other: "1" if other == symbol else "0" for other in "1pnbrqk"})) for symbol in "pnbrqk"]
+
+def _fen_rank_format(occupied: int) -> str:
+    builder: List[str] = []
+    empty = 0
+    for file_index in range(8):
+        if occupied & (1 << file_index):
+            if empty:
+                builder.append(str(empty))
+                empty = 0
+            builder.append(f"{{{file_index}}}")
+        else:
+            empty += 1
+    if empty:
+        builder.append(str(empty))
+    return "".join(builder)
+
+# Formats of a rank in the board part of a FEN, indexed by the occupancy
+# of the rank, with a positional field for each piece.
+_FEN_RANK_FORMATS = [_fen_rank_format(occupied) for occupied in range(256)]
+
+def _board_fen_masks(fen: str) -> Optional[List[Bitboard]]:
+    # The pawns, knights, bishops, rooks, queens, kings and white pieces of
+    # the board part of a FEN, or None if it is invalid or has promoted
+    # pieces.
+    expanded = fen.translate(_FEN_EXPAND)
+    if not _FEN_BOARD_REGEX.match(fen) or len(expanded) != 71 or expanded[8::9] != "///////":
+        return None
+
+    # Squares from h8 to a1, so that the binary strings read as masks.
+    squares = "".join(reversed(expanded[::-1].split("/")))
+    lower = squares.lower()
+    masks = [int(lower.translate(table), 2) if symbol in lower else BB_EMPTY for symbol, table in _FEN_PIECES]
+    masks.append(int(squares.translate(_FEN_WHITE), 2))
+    return masks
+
 
 @dataclasses.dataclass
 class Piece:
@@ -639,13 +958,19 @@ class Piece:
         return cls(PIECE_SYMBOLS.index(symbol.lower()), symbol.isupper())
 
 
-@dataclasses.dataclass(unsafe_hash=True)
+@dataclasses.dataclass(frozen=True)
 class Move:
     """
     Represents a move from a square to a square and possibly the promotion
     piece type.
 
     Drops and null moves are supported.
+
+    Moves are immutable. Move generation, :func:`~medieval_chess.Move.from_uci()`
+    and :func:`~medieval_chess.Move.from_packed()` return shared instances
+    from an interned move table, so assigning to a field raises
+    :exc:`dataclasses.FrozenInstanceError`. Use :func:`dataclasses.replace()`
+    to derive a modified move.
     """
 
     from_square: Square
@@ -682,12 +1007,27 @@ class Move:
     def xboard(self) -> str:
         return self.uci() if self else "@@@@"
 
+    def packed(self) -> int:
+        """
+        Gets a 16-bit integer encoding of the move: the source square in
+        bits 0-5, the target square in bits 6-11, the promotion (or drop)
+        piece type in bits 12-14 and a drop flag in bit 15.
+
+        The null move is encoded as ``0``.
+        """
+        if self.drop:
+            return self.to_square | self.to_square << 6 | self.drop << 12 | 1 << 15
+        return self.from_square | self.to_square << 6 | (self.promotion or 0) << 12
+
     def __bool__(self) -> bool:
         return bool(self.from_square or self.to_square or self.promotion or self.drop)
 
     def __repr__(self) -> str:
         return f"Move.from_uci({self.uci()!r})"
 
+    def __reduce__(self) -> Tuple[Callable[[int], Move], Tuple[int]]:
+        return Move.from_packed, (self.packed(), )
+
     def __str__(self) -> str:
         return self.uci()
 
@@ -698,15 +1038,20 @@ class Move:
 
         :raises: :exc:`InvalidMoveError` if the UCI string is invalid.
         """
+        try:
+            return _UCI_MOVES[uci]
+        except KeyError:
+            pass
+
         if uci == "0000":
-            return cls.null()
+            packed = 0
         elif len(uci) == 4 and "@" == uci[1]:
             try:
                 drop = PIECE_SYMBOLS.index(uci[0].lower())
                 square = SQUARE_NAMES.index(uci[2:])
             except ValueError:
                 raise InvalidMoveError(f"invalid uci: {uci!r}")
-            return cls(square, square, drop=drop)
+            packed = square | square << 6 | drop << 12 | 1 << 15
         elif 4 <= len(uci) <= 5:
             try:
                 from_square = SQUARE_NAMES.index(uci[0:2])
@@ -714,12 +1059,47 @@ class Move:
                 promotion = PIECE_SYMBOLS.index(uci[4]) if len(uci) == 5 else None
             except ValueError:
                 raise InvalidMoveError(f"invalid uci: {uci!r}")
-            if from_square == to_square and from_square != A1:
+            if from_square == to_square and (from_square != A1 or promotion):
                 raise InvalidMoveError(f"invalid uci (use 0000 for null moves): {uci!r}")
-            return cls(from_square, to_square, promotion=promotion)
+            packed = from_square | to_square << 6 | (promotion or 0) << 12
         else:
             raise InvalidMoveError(f"expected uci string to be of length 4 or 5: {uci!r}")
 
+        move = cls.from_packed(packed)
+        _UCI_MOVES[uci] = move
+        return move
+
+    @classmethod
+    def from_packed(cls, packed: int) -> Move:
+        """
+        Gets the move for an encoding obtained from
+        :func:`~medieval_chess.Move.packed()`.
+
+        :raises: :exc:`ValueError` if *packed* is not a 16-bit integer
+            or not a valid encoding of a move.
+        """
+        try:
+            return _PACKED_MOVES[packed]
+        except KeyError:
+            pass
+
+        if not 0 <= packed <= 0xffff:
+            raise ValueError(f"expected 16-bit packed move, got {packed!r}")
+
+        from_square = packed & 0x3f
+        to_square = (packed >> 6) & 0x3f
+        piece_type = (packed >> 12) & 0x7 or None
+        if packed >> 15:
+            if piece_type is None or from_square != to_square:
+                raise ValueError(f"invalid packed drop: {packed:#06x}")
+            move = cls(from_square, to_square, drop=piece_type)
+        elif from_square == to_square and packed:
+            raise ValueError(f"invalid packed move (use 0 for null moves): {packed:#06x}")
+        else:
+            move = cls(from_square, to_square, piece_type)
+
+        return _PACKED_MOVES.setdefault(packed, move)
+
     @classmethod
     def null(cls) -> Move:
         """
@@ -734,7 +1114,15 @@ class Move:
         >>> bool(medieval_chess.Move.null())
         False
         """
-        return cls(0, 0)
+        return cls.from_packed(0)
+
+
+# Interned moves without promotion, indexed by [from_square][to_square].
+_MOVES: List[List[Move]] = [[Move(from_square, to_square) for to_square in SQUARES] for from_square in SQUARES]
+
+_PACKED_MOVES: Dict[int, Move] = {move.packed(): move for moves in _MOVES for move in moves}
+
+_UCI_MOVES: Dict[str, Move] = {}
 
 
 BaseBoardT = TypeVar("BaseBoardT", bound="BaseBoard")
@@ -775,6 +1163,8 @@ class BaseBoard:
         self.occupied_co[BLACK] = BB_RANK_7 | BB_RANK_8
         self.occupied = BB_RANK_1 | BB_RANK_2 | BB_RANK_7 | BB_RANK_8
 
+        self._zobrist_board = self._zobrist_board_hash()
+
     def reset_board(self) -> None:
         """
         Resets pieces to the starting position.
@@ -800,6 +1190,8 @@ class BaseBoard:
         self.occupied_co[BLACK] = BB_EMPTY
         self.occupied = BB_EMPTY
 
+        self._zobrist_board = 0
+
     def clear_board(self) -> None:
         """
         Clears the board.
@@ -808,6 +1200,23 @@ class BaseBoard:
         """
         self._clear_board()
 
+    def _zobrist_board_hash(self) -> int:
+        # Full recomputation of the incrementally updated _zobrist_board,
+        # for code paths that set the bitboards directly.
+        zobrist_hash = 0
+        pieces = [(PAWN, self.pawns), (KNIGHT, self.knights), (BISHOP, self.bishops), (ROOK, self.rooks),
+                  (QUEEN, self.queens), (KING, self.kings), (QUEEN_GRACE_JUMP, self.queens_grace_jump)]
+        for color in COLORS:
+            mask = self.occupied_co[color]
+            for piece_type, bb in pieces:
+                table = ZOBRIST_PIECES[color][piece_type]
+                bb &= mask
+                while bb:
+                    r = bb & -bb
+                    zobrist_hash ^= table[r.bit_length() - 1]
+                    bb ^= r
+        return zobrist_hash
+
     def pieces_mask(self, piece_type: PieceType, color: Color) -> Bitboard:
         if piece_type == PAWN:
             bb = self.pawns
@@ -907,8 +1316,7 @@ class BaseBoard:
             if bb_square & self.queens_grace_jump:
                 attacks = BB_1_DIAGONAL_JUMPER_ATTACKS[square]
             if bb_square & self.rooks:
-                attacks |= (BB_RANK_ATTACKS[square][BB_RANK_MASKS[square] & self.occupied] |
-                        BB_FILE_ATTACKS[square][BB_FILE_MASKS[square] & self.occupied])
+                attacks |= rook_attacks(square, self.occupied)
             return attacks
 
     def generate_pseudo_legal_moves(self, from_mask: Bitboard = BB_ALL, to_mask: Bitboard = BB_ALL) -> Iterator[Move]:
@@ -918,9 +1326,9 @@ class BaseBoard:
         non_pawns = our_pieces & ~self.pawns & from_mask
         for from_square in scan_reversed(non_pawns):
             moves = self.attacks_mask(from_square) & ~our_pieces & to_mask
-            
+            from_moves = _MOVES[from_square]
             for to_square in scan_reversed(moves):
-                yield Move(from_square, to_square)
+                yield from_moves[to_square]
 
         # Generate castling moves.
         if from_mask & self.kings:
@@ -940,14 +1348,12 @@ class BaseBoard:
     def attackers_mask(self, color: Color, square: Square, occupied: Optional[Bitboard] = None) -> Bitboard:
         occupied = self.occupied if occupied is None else occupied
 
-        rank_pieces = BB_RANK_MASKS[square] & occupied
-        file_pieces = BB_FILE_MASKS[square] & occupied
+        rook_index = ((occupied & BB_ROOK_MASKS[square]) * BB_ROOK_MAGICS[square] & BB_ALL) >> BB_ROOK_SHIFTS[square]
 
         attackers = (
             (BB_KING_ATTACKS[square] & self.kings) |
             (BB_KNIGHT_ATTACKS[square] & self.knights) |
-            (BB_RANK_ATTACKS[square][rank_pieces] & self.rooks) |
-            (BB_FILE_ATTACKS[square][file_pieces] & self.rooks) |
+            (BB_ROOK_ATTACKS[square][rook_index] & self.rooks) |
             (BB_BISHOP_ATTACKS[square] & self.bishops) |
             (BB_PAWN_ATTACKS[not color][square] & self.pawns) |
             (BB_1_DIAGONAL_JUMPER_ATTACKS[square] & self.queens) |
@@ -996,17 +1402,13 @@ class BaseBoard:
 
         square_mask = BB_SQUARES[square]
 
-        for attacks, sliders in [(BB_FILE_ATTACKS, self.rooks | self.queens),
-                                 (BB_RANK_ATTACKS, self.rooks | self.queens),
-                                 (BB_DIAG_ATTACKS, self.bishops | self.queens)]:
-            rays = attacks[king][0]
-            if rays & square_mask:
-                snipers = rays & sliders & self.occupied_co[not color]
-                for sniper in scan_reversed(snipers):
-                    if between(sniper, king) & (self.occupied | square_mask) == square_mask:
-                        return ray(king, sniper)
-
-                break
+        rays = ray(king, square) & ~BB_SQUARES[king]
+        if rays:
+            sliders = self.rooks | self.queens if rook_attacks(king, BB_EMPTY) & square_mask else self.bishops | self.queens
+            snipers = rays & sliders & self.occupied_co[not color]
+            for sniper in scan_reversed(snipers):
+                if between(sniper, king) & (self.occupied | square_mask) == square_mask:
+                    return ray(king, sniper)
 
         return BB_ALL
 
@@ -1066,6 +1468,8 @@ class BaseBoard:
         else:
             return None
 
+        self._zobrist_board ^= ZOBRIST_PIECES[bool(self.occupied_co[WHITE] & mask)][piece_type][square]
+
         self.occupied ^= mask
         self.occupied_co[WHITE] &= ~mask
         self.occupied_co[BLACK] &= ~mask
@@ -1110,6 +1514,8 @@ class BaseBoard:
         self.occupied ^= mask
         self.occupied_co[color] ^= mask
 
+        self._zobrist_board ^= ZOBRIST_PIECES[color][piece_type][square]
+
         if promoted:
             self.promoted ^= mask
 
@@ -1132,35 +1538,51 @@ class BaseBoard:
         Gets the board FEN (e.g.,
         ``rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR``).
         """
-        builder: List[str] = []
-        empty = 0
-
-        for square in SQUARES_180:
-            piece = self.piece_at(square)
+        symbols = [""] * 64
+        white = self.occupied_co[WHITE]
+        black = self.occupied_co[BLACK]
+        for bb, upper, lower in [(self.pawns, "P", "p"), (self.knights, "N", "n"), (self.bishops, "B", "b"), (self.rooks, "R", "r"),
+                                 (self.queens | self.queens_grace_jump, "Q", "q"), (self.kings, "K", "k")]:
+            white_bb = bb & white
+            while white_bb:
+                r = white_bb & -white_bb
+                symbols[r.bit_length() - 1] = upper
+                white_bb ^= r
+            bb &= black
+            while bb:
+                r = bb & -bb
+                symbols[r.bit_length() - 1] = lower
+                bb ^= r
 
-            if not piece:
-                empty += 1
-            else:
-                if empty:
-                    builder.append(str(empty))
-                    empty = 0
-                builder.append(piece.symbol())
-                if promoted and BB_SQUARES[square] & self.promoted:
-                    builder.append("~")
-
-            if BB_SQUARES[square] & BB_FILE_H:
-                if empty:
-                    builder.append(str(empty))
-                    empty = 0
-
-                if square != H1:
-                    builder.append("/")
+        if promoted:
+            for square in scan_forward(self.promoted & self.occupied):
+                symbols[square] += "~"
 
-        return "".join(builder)
+        occupied = self.occupied
+        return "/".join([_FEN_RANK_FORMATS[occupied >> shift & 0xff].format(*symbols[shift:shift + 8]) for shift in range(56, -8, -8)])
 
     def _set_board_fen(self, fen: str) -> None:
         # Compatibility with set_fen().
         fen = fen.strip()
+
+        masks = _board_fen_masks(fen)
+        if masks is None:
+            self._set_board_fen_slow(fen)
+            return
+
+        self.pawns, self.knights, self.bishops, self.rooks, self.queens, self.kings, white = masks
+        self.queens_grace_jump = BB_EMPTY
+        self.promoted = BB_EMPTY
+
+        self.occupied = self.pawns | self.knights | self.bishops | self.rooks | self.queens | self.kings
+        self.occupied_co[WHITE] = white
+        self.occupied_co[BLACK] = self.occupied ^ white
+
+        self._zobrist_board = self._zobrist_board_hash()
+
+    def _set_board_fen_slow(self, fen: str) -> None:
+        # Character by character, with detailed errors and support for
+        # promoted pieces (~).
         if " " in fen:
             raise ValueError(f"expected position part of fen, got multiple parts: {fen!r}")
 
@@ -1309,6 +1731,8 @@ class BaseBoard:
         self.occupied = BB_RANK_1 | BB_RANK_2 | BB_RANK_7 | BB_RANK_8
         self.promoted = BB_EMPTY
 
+        self._zobrist_board = self._zobrist_board_hash()
+
     def set_chess960_pos(self, scharnagl: int) -> None:
         """
         Sets up a Chess960 starting position given its index between 0 and 959.
@@ -1497,6 +1921,8 @@ class BaseBoard:
         self.occupied = f(self.occupied)
         self.promoted = f(self.promoted)
 
+        self._zobrist_board = self._zobrist_board_hash()
+
     def transform(self, f: Callable[[Bitboard], Bitboard]) -> Self:
         """
         Returns a transformed copy of the board (without move stack)
@@ -1518,6 +1944,7 @@ class BaseBoard:
     def apply_mirror(self) -> None:
         self.apply_transform(flip_vertical)
         self.occupied_co[WHITE], self.occupied_co[BLACK] = self.occupied_co[BLACK], self.occupied_co[WHITE]
+        self._zobrist_board = self._zobrist_board_hash()
 
     def mirror(self) -> Self:
         """
@@ -1550,6 +1977,8 @@ class BaseBoard:
         board.occupied = self.occupied
         board.promoted = self.promoted
 
+        board._zobrist_board = self._zobrist_board
+
         return board
 
     def __copy__(self) -> Self:
@@ -1610,6 +2039,9 @@ class _BoardState:
 
         self.capture_happened = board.capture_happened
 
+        self.zobrist_board = board._zobrist_board
+        self.zobrist = board.zobrist()
+
     def restore(self, board: Board) -> None:
         board.pawns = self.pawns
         board.knights = self.knights
@@ -1633,6 +2065,425 @@ class _BoardState:
 
         board.capture_happened = self.capture_happened
 
+        board._zobrist_board = self.zobrist_board
+
+
+# Layout of a _CompactStack record: 10 bitboards, the Zobrist hashes and
+# two packed words. Castling rights are not recorded, because they are
+# always restored as empty (like _BoardState).
+_RECORD_ZOBRIST = 11
+_RECORD_INFO = 12
+_RECORD_COUNTERS = 13
+_RECORD_SIZE = 14
+
+# Layout of Board.to_bytes(): a header (version, flags and number of
+# moves), the current position and, if there are moves, the root position
+# followed by the packed moves. A position holds 11 bitboards (including
+# the grace-jump queens, promoted pieces and castling rights), a flags byte
+# (turn and capture state), the en passant square plus one and the move
+# counters.
+_BOARD_BYTES_VERSION = 1
+_BOARD_BYTES_HEADER = struct.Struct("<BBI")
+_BOARD_BYTES_POSITION = struct.Struct("<11QBBII")
+
+# Instance attributes of a Board that are restored by from_bytes(). Any
+# others are pickled alongside.
+_BOARD_BYTES_ATTRIBUTES = frozenset([
+    "pawns", "knights", "bishops", "rooks", "queens_grace_jump", "queens", "kings",
+    "occupied_co", "occupied", "promoted", "moved_queens", "castling_rights",
+    "turn", "capture_happened", "ep_square", "halfmove_clock", "fullmove_number",
+    "chess960", "_stack", "_zobrist_board", "_check_infos", "_legal_move_probe", "_san_memo",
+])
+
+class _CompactStack:
+    """
+    The move stack and board states of a board with *compact_stack*,
+    packed into fixed size records of 64-bit words.
+
+    The info word holds the packed move (bits 0-15), the turn (bit 16),
+    the capture flag (bit 17) and the en passant square plus one
+    (bits 18-24). The counters word holds the half-move clock in the low
+    and the full-move number in the high 32 bits.
+    """
+
+    def __init__(self, records: Optional[array.array[int]] = None) -> None:
+        self.records = array.array("Q") if records is None else records
+        self.moves = _CompactMoveStack(self)
+
+    def push(self, board: Board, move: Move) -> None:
+        ep_square = board.ep_square
+        self.records.extend((
+            board.pawns, board.knights, board.bishops, board.rooks,
+            board.queens_grace_jump, board.queens, board.kings,
+            board.occupied_co[WHITE], board.occupied_co[BLACK],
+            board.promoted,
+            board._zobrist_board,
+            board.zobrist(),
+            (move.packed() |
+             board.turn << 16 |
+             board.capture_happened << 17 |
+             (0 if ep_square is None else ep_square + 1) << 18),
+            board.halfmove_clock | board.fullmove_number << 32,
+        ))
+
+    def pop(self, board: Board) -> Move:
+        offset = len(self.records) - _RECORD_SIZE
+        if offset < 0:
+            raise IndexError("pop from empty move stack")
+        move = self.restore(board, offset)
+        del self.records[offset:]
+        return move
+
+    def restore(self, board: Board, offset: int) -> Move:
+        (board.pawns, board.knights, board.bishops, board.rooks,
+         board.queens_grace_jump, board.queens, board.kings,
+         occupied_w, occupied_b,
+         board.promoted,
+         board._zobrist_board,
+         _,
+         info,
+         counters) = self.records[offset:offset + _RECORD_SIZE]
+
+        board.occupied_co[WHITE] = occupied_w
+        board.occupied_co[BLACK] = occupied_b
+        board.occupied = occupied_w | occupied_b
+
+        board.turn = bool(info >> 16 & 1)
+        board.castling_rights = BB_EMPTY
+        ep_square = info >> 18 & 0x7f
+        board.ep_square = ep_square - 1 if ep_square else None
+        board.halfmove_clock = counters & 0xffff_ffff
+        board.fullmove_number = counters >> 32
+
+        board.capture_happened = bool(info >> 17 & 1)
+
+        return Move.from_packed(info & 0xffff)
+
+    def clear(self) -> None:
+        del self.records[:]
+
+    def copy(self, stack: int) -> _CompactStack:
+        return _CompactStack(self.records[len(self.records) - min(stack, len(self)) * _RECORD_SIZE:] if stack else None)
+
+    def __len__(self) -> int:
+        return len(self.records) // _RECORD_SIZE
+
+    def __getitem__(self, index: int) -> _CompactBoardState:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("board state index out of range")
+        return _CompactBoardState(self, index * _RECORD_SIZE)
+
+    def __iter__(self) -> Iterator[_CompactBoardState]:
+        for offset in range(0, len(self.records), _RECORD_SIZE):
+            yield _CompactBoardState(self, offset)
+
+    def __reversed__(self) -> Iterator[_CompactBoardState]:
+        for offset in range(len(self.records) - _RECORD_SIZE, -1, -_RECORD_SIZE):
+            yield _CompactBoardState(self, offset)
+
+    def reversible_zobrist_history(self, halfmove_clock: int) -> List[int]:
+        records = self.records
+        history = []
+        offset = len(records) - _RECORD_SIZE
+        while halfmove_clock and offset >= 0:
+            history.append(records[offset + _RECORD_ZOBRIST])
+            halfmove_clock = records[offset + _RECORD_COUNTERS] & 0xffff_ffff
+            offset -= _RECORD_SIZE
+        return history
+
+class _CompactBoardState:
+    """A view of a single record of a :class:`_CompactStack`."""
+
+    def __init__(self, stack: _CompactStack, offset: int) -> None:
+        self.stack = stack
+        self.offset = offset
+
+    @property
+    def zobrist(self) -> int:
+        return self.stack.records[self.offset + _RECORD_ZOBRIST]
+
+    @property
+    def halfmove_clock(self) -> int:
+        return self.stack.records[self.offset + _RECORD_COUNTERS] & 0xffff_ffff
+
+    def restore(self, board: Board) -> None:
+        self.stack.restore(board, self.offset)
+
+class _CompactMoveStack(typing.Sequence[Move]):
+    """
+    The :data:`~medieval_chess.Board.move_stack` of a board with
+    *compact_stack*. Moves are unpacked on access.
+    """
+
+    def __init__(self, stack: _CompactStack) -> None:
+        self._compact_stack = stack
+
+    def __len__(self) -> int:
+        return len(self._compact_stack)
+
+    @typing.overload
+    def __getitem__(self, index: int) -> Move: ...
+    @typing.overload
+    def __getitem__(self, index: slice) -> List[Move]: ...
+    def __getitem__(self, index: Union[int, slice]) -> Union[Move, List[Move]]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return Move.from_packed(self._compact_stack.records[self._compact_stack[index].offset + _RECORD_INFO] & 0xffff)
+
+    def __iter__(self) -> Iterator[Move]:
+        records = self._compact_stack.records
+        for offset in range(_RECORD_INFO, len(records), _RECORD_SIZE):
+            yield Move.from_packed(records[offset] & 0xffff)
+
+    def __eq__(self, other: object) -> bool:
+        try:
+            return list(self) == list(other)  # type: ignore
+        except TypeError:
+            return NotImplemented
+
+    def clear(self) -> None:
+        self._compact_stack.clear()
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+class _StackNode:
+    """
+    A board state and the move that was made from it. Nodes are immutable
+    and linked to the previous node, so that boards can share the common
+    part of their history.
+    """
+
+    __slots__ = ("parent", "state", "move", "length")
+
+    def __init__(self, parent: Optional[_StackNode], state: _BoardState, move: Move) -> None:
+        self.parent = parent
+        self.state = state
+        self.move = move
+        self.length: int = 1 if parent is None else parent.length + 1
+
+class _SharedStack:
+    """
+    The move stack and board states of a board, as a chain of
+    :class:`_StackNode` objects ending at *tip*.
+
+    Copies share the chain and diverge on push, so copying a board is O(1)
+    regardless of the length of the game. The *base* lowest nodes of the
+    chain are hidden, which allows copying a limited number of moves
+    without rebuilding the chain.
+    """
+
+    def __init__(self, tip: Optional[_StackNode] = None, base: int = 0) -> None:
+        self.tip = tip
+        self.base = base
+        self.moves = _SharedMoveStack(self)
+
+    def push(self, board: Board, move: Move) -> None:
+        self.tip = _StackNode(self.tip, _BoardState(board), move)
+
+    def pop(self, board: Board) -> Move:
+        tip = self.tip
+        if tip is None or tip.length <= self.base:
+            raise IndexError("pop from empty move stack")
+        self.tip = tip.parent
+        tip.state.restore(board)
+        return tip.move
+
+    def clear(self) -> None:
+        self.tip = None
+        self.base = 0
+
+    def copy(self, stack: int) -> _SharedStack:
+        if not stack or self.tip is None:
+            return _SharedStack()
+        return _SharedStack(self.tip, max(self.base, self.tip.length - stack))
+
+    def nodes(self) -> Iterator[_StackNode]:
+        # Most recent first.
+        node = self.tip
+        base = self.base
+        while node is not None and node.length > base:
+            yield node
+            node = node.parent
+
+    def node(self, index: int) -> _StackNode:
+        length = len(self)
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError("board state index out of range")
+        node = typing.cast(_StackNode, self.tip)
+        for _ in range(length - 1 - index):
+            node = typing.cast(_StackNode, node.parent)
+        return node
+
+    def __len__(self) -> int:
+        return 0 if self.tip is None else self.tip.length - self.base
+
+    def __getitem__(self, index: int) -> _BoardState:
+        return self.node(index).state
+
+    def __iter__(self) -> Iterator[_BoardState]:
+        return reversed([node.state for node in self.nodes()])
+
+    def __reversed__(self) -> Iterator[_BoardState]:
+        for node in self.nodes():
+            yield node.state
+
+    def reversible_zobrist_history(self, halfmove_clock: int) -> List[int]:
+        history = []
+        node = self.tip
+        base = self.base
+        while halfmove_clock and node is not None and node.length > base:
+            state = node.state
+            history.append(state.zobrist)
+            halfmove_clock = state.halfmove_clock
+            node = node.parent
+        return history
+
+    def __getstate__(self) -> List[Tuple[_BoardState, Move]]:
+        # Flat, so that pickling long games does not recurse along the chain.
+        return [(node.state, node.move) for node in reversed(list(self.nodes()))]
+
+    def __setstate__(self, history: List[Tuple[_BoardState, Move]]) -> None:
+        self.tip = None
+        self.base = 0
+        self.moves = _SharedMoveStack(self)
+        for state, move in history:
+            self.tip = _StackNode(self.tip, state, move)
+
+class _SharedMoveStack(typing.Sequence[Move]):
+    """
+    The :data:`~medieval_chess.Board.move_stack` of a board, a read-only
+    view of its :class:`_SharedStack`.
+    """
+
+    def __init__(self, stack: _SharedStack) -> None:
+        self._shared_stack = stack
+        self._cache_tip: Optional[_StackNode] = None
+        self._cache_base = 0
+        self._cache: Tuple[Move, ...] = ()
+
+    def _moves(self) -> Tuple[Move, ...]:
+        # Materialized once per tip, so that random access is O(1) until
+        # the next push or pop.
+        stack = self._shared_stack
+        if self._cache_tip is not stack.tip or self._cache_base != stack.base:
+            self._cache = tuple(reversed([node.move for node in stack.nodes()]))
+            self._cache_tip = stack.tip
+            self._cache_base = stack.base
+        return self._cache
+
+    def __len__(self) -> int:
+        return len(self._shared_stack)
+
+    @typing.overload
+    def __getitem__(self, index: int) -> Move: ...
+    @typing.overload
+    def __getitem__(self, index: slice) -> List[Move]: ...
+    def __getitem__(self, index: Union[int, slice]) -> Union[Move, List[Move]]:
+        if isinstance(index, slice):
+            return list(self._moves()[index])
+        stack = self._shared_stack
+        if -8 <= index < 0 and self._cache_tip is not stack.tip:
+            # Recent moves (peek) are cheaper to reach from the tip.
+            return stack.node(index).move
+        try:
+            return self._moves()[index]
+        except IndexError:
+            raise IndexError("move stack index out of range")
+
+    def __iter__(self) -> Iterator[Move]:
+        return iter(self._moves())
+
+    def __reversed__(self) -> Iterator[Move]:
+        for node in self._shared_stack.nodes():
+            yield node.move
+
+    def __eq__(self, other: object) -> bool:
+        try:
+            return list(self) == list(other)  # type: ignore
+        except TypeError:
+            return NotImplemented
+
+    def clear(self) -> None:
+        self._shared_stack.clear()
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+class _CheckInfo:
+    """
+    Check and pin information about the king of one side. Valid as long as
+    the piece placement (identified by *key*) does not change.
+    """
+
+    def __init__(self, key: Tuple[int, Bitboard], king: Optional[Square], checkers: Bitboard, blockers: Bitboard) -> None:
+        self.key = key
+        self.king = king
+        self.checkers = checkers
+        self.blockers = blockers
+
+        # Squares attacked by the other side, looking through the king.
+        # Computed on demand.
+        self.attacks: Optional[Bitboard] = None
+
+# Colorbound pieces never leave their class of squares: ferzes (and
+# grace-jump queens) keep the color of their square, and alfils keep the
+# parity of their file and of their rank.
+_BB_ODD_FILES = BB_FILE_B | BB_FILE_D | BB_FILE_F | BB_FILE_H
+_BB_ODD_RANKS = BB_RANK_2 | BB_RANK_4 | BB_RANK_6 | BB_RANK_8
+_FERZ_CLASSES = [BB_DARK_SQUARES, BB_LIGHT_SQUARES]
+_ALFIL_CLASSES = [
+    ~_BB_ODD_FILES & ~_BB_ODD_RANKS & BB_ALL,
+    _BB_ODD_FILES & ~_BB_ODD_RANKS,
+    ~_BB_ODD_FILES & _BB_ODD_RANKS,
+    _BB_ODD_FILES & _BB_ODD_RANKS,
+]
+_COLORBOUND_CLASSES = _FERZ_CLASSES + _ALFIL_CLASSES
+
+# Signature bit for pieces that can stand on any square.
+_UNBOUND = 1 << len(_COLORBOUND_CLASSES)
+
+def _colorbound_signature(ferzes: Bitboard, alfils: Bitboard) -> int:
+    # One bit for each class of _COLORBOUND_CLASSES that has pieces.
+    return (bool(ferzes & BB_DARK_SQUARES) | bool(ferzes & BB_LIGHT_SQUARES) << 1 |
+            bool(alfils & _ALFIL_CLASSES[0]) << 2 | bool(alfils & _ALFIL_CLASSES[1]) << 3 |
+            bool(alfils & _ALFIL_CLASSES[2]) << 4 | bool(alfils & _ALFIL_CLASSES[3]) << 5)
+
+def _colorbound_mate_possible(attackers: int, blockers: int) -> bool:
+    # Checks if a king and pieces of the attacker classes can checkmate a
+    # king with pieces of the blocker classes. Relaxed to any number of
+    # pieces per class, which are assumed to be protected, so that this
+    # errs on the side of a possible mate: The defending king must stand
+    # on a square of an attacker class to be in check, and the squares
+    # around it that are neither of an attacker class nor of a blocker
+    # class must be covered by the attacking king.
+    covered = blocked = BB_EMPTY
+    for i, mask in enumerate(_COLORBOUND_CLASSES):
+        if attackers & (1 << i):
+            covered |= mask
+        if blockers & (1 << i):
+            blocked |= mask
+    if blockers & _UNBOUND:
+        blocked = BB_ALL
+
+    for king in scan_reversed(covered):
+        kings = ~(BB_KING_ATTACKS[king] | BB_SQUARES[king]) & BB_ALL
+        for escape in scan_reversed(BB_KING_ATTACKS[king] & ~covered & ~blocked):
+            kings &= BB_KING_ATTACKS[escape]
+        if kings:
+            return True
+    return False
+
+# Material signatures (the classes of the attacking pieces, and the classes
+# of the defending pieces) that can not lead to checkmate. Filled on
+# demand, since only a few signatures occur in practice.
+_COLORBOUND_DEAD: Dict[Tuple[int, int], bool] = {}
+
+
 class Board(BaseBoard):
     """
     A :class:`~medieval_chess.BaseBoard`, additional information representing
@@ -1653,6 +2504,12 @@ class Board(BaseBoard):
     Use :func:`medieval_chess.Board.from_chess960_pos()` to create a board with one
     of the Chess960 starting positions.
 
+    Optionally supports a *compact_stack*, recording the move stack and the
+    information needed to undo moves in a flat array of 64-bit words
+    (112 bytes per move) instead of individual objects. This is intended for
+    keeping many long games in memory. Moves on the
+    :data:`~medieval_chess.Board.move_stack` are then unpacked on access.
+
     It's safe to set :data:`~Board.turn`, :data:`~Board.castling_rights`,
     :data:`~Board.ep_square`, :data:`~Board.halfmove_clock` and
     :data:`~Board.fullmove_number` directly.
@@ -1733,24 +2590,17 @@ class Board(BaseBoard):
     represented as king moves to the corresponding rook square.
     """
 
-    move_stack: List[Move]
-    """
-    The move stack. Use :func:`Board.push() <medieval_chess.Board.push()>`,
-    :func:`Board.pop() <medieval_chess.Board.pop()>`,
-    :func:`Board.peek() <medieval_chess.Board.peek()>` and
-    :func:`Board.clear_stack() <medieval_chess.Board.clear_stack()>` for
-    manipulation.
-    """
-
-    def __init__(self, fen: Optional[str] = STARTING_FEN, *, chess960: bool = False) -> None:
+    def __init__(self, fen: Optional[str] = STARTING_FEN, *, chess960: bool = False, compact_stack: bool = False) -> None:
         BaseBoard.__init__(self, None)
 
         self.chess960 = chess960
         self.capture_happened = False
+        self._check_infos: List[Optional[_CheckInfo]] = [None, None]
+        self._legal_move_probe: Optional[Tuple[Tuple[Bitboard, Bitboard, Color, Bitboard, Optional[Square], bool, bool], bool]] = None
+        self._san_memo: Dict[Tuple[Bitboard, Bitboard, Color, Bitboard, Optional[Square], bool, bool, str], Move] = {}
 
         self.ep_square = None
-        self.move_stack = []
-        self._stack: List[_BoardState] = []
+        self._stack: Union[_SharedStack, _CompactStack] = _CompactStack() if compact_stack else _SharedStack()
 
         if fen is None:
             self.clear()
@@ -1759,6 +2609,21 @@ class Board(BaseBoard):
         else:
             self.set_fen(fen)
 
+    @property
+    def move_stack(self) -> typing.Sequence[Move]:
+        """
+        The move stack, a read-only sequence of moves. Use
+        :func:`Board.push() <medieval_chess.Board.push()>`,
+        :func:`Board.pop() <medieval_chess.Board.pop()>`,
+        :func:`Board.peek() <medieval_chess.Board.peek()>` and
+        :func:`Board.clear_stack() <medieval_chess.Board.clear_stack()>` for
+        manipulation.
+
+        Unlike in python-chess, this is not a list: it cannot be assigned,
+        appended to or popped from directly.
+        """
+        return self._stack.moves
+
     @property
     def legal_moves(self) -> LegalMoveGenerator:
         """
@@ -1834,13 +2699,12 @@ class Board(BaseBoard):
 
     def clear_stack(self) -> None:
         """Clears the move stack."""
-        self.move_stack.clear()
         self._stack.clear()
 
     def root(self) -> Self:
         """Returns a copy of the root position."""
         if self._stack:
-            board = type(self)(None, chess960=self.chess960)
+            board = type(self)(None, chess960=self.chess960, compact_stack=isinstance(self._stack, _CompactStack))
             self._stack[0].restore(board)
             return board
         else:
@@ -1868,27 +2732,11 @@ class Board(BaseBoard):
         self.clear_stack()
 
     def generate_pseudo_legal_moves(self, from_mask: Bitboard = BB_ALL, to_mask: Bitboard = BB_ALL) -> Iterator[Move]:
-        our_pieces = self.occupied_co[self.turn]
-
         # Generate piece moves.
-        non_pawns = our_pieces & ~self.pawns & from_mask
-        for from_square in scan_reversed(non_pawns):
-            moves = self.attacks_mask(from_square) & ~our_pieces & to_mask
-            
-            # Add special jumper moves for QUEEN_GRACE_JUMP pieces
-            if self.piece_type_at(from_square) == QUEEN_GRACE_JUMP:
-                # Diagonal jumper moves (only to empty squares)
-                empty_squares = ~self.occupied  # All empty squares
-                diagonal_jumper_moves = BB_2_DIAGONAL_JUMPER_ATTACKS[from_square] & empty_squares & to_mask
-                
-                # Add 2-square horizontal/vertical jumper moves (only to empty squares)
-                orthogonal_jumper_moves = BB_2_ORTHOGONAL_JUMPER_ATTACKS[from_square] & empty_squares & to_mask
-                
-                # Combine both special move types
-                moves |= diagonal_jumper_moves | orthogonal_jumper_moves
-                
+        for from_square, moves in self._piece_move_masks(from_mask, to_mask):
+            from_moves = _MOVES[from_square]
             for to_square in scan_reversed(moves):
-                yield Move(from_square, to_square)
+                yield from_moves[to_square]
 
         # Generate castling moves.
         if from_mask & self.kings:
@@ -1908,9 +2756,9 @@ class Board(BaseBoard):
 
             for to_square in scan_reversed(targets):
                 if square_rank(to_square) in [0, 7]:
-                    yield Move(from_square, to_square, QUEEN_GRACE_JUMP)
+                    yield Move.from_packed(from_square | to_square << 6 | QUEEN_GRACE_JUMP << 12)
                 else:
-                    yield Move(from_square, to_square)
+                    yield _MOVES[from_square][to_square]
 
         # Prepare pawn advance generation.
         if self.turn == WHITE:
@@ -1936,14 +2784,39 @@ class Board(BaseBoard):
             from_square = to_square + (8 if self.turn == BLACK else -8)
 
             if square_rank(to_square) in [0, 7]:
-                yield Move(from_square, to_square, QUEEN_GRACE_JUMP)
+                yield Move.from_packed(from_square | to_square << 6 | QUEEN_GRACE_JUMP << 12)
             else:
-                yield Move(from_square, to_square)
+                yield _MOVES[from_square][to_square]
 
         # Generate double pawn moves.
         for to_square in scan_reversed(double_moves):
             from_square = to_square + (16 if self.turn == BLACK else -16)
-            yield Move(from_square, to_square)
+            yield _MOVES[from_square][to_square]
+
+    def _piece_move_masks(self, from_mask: Bitboard, to_mask: Bitboard) -> Iterator[Tuple[Square, Bitboard]]:
+        # Yields the origin square and the target squares of each piece
+        # (other than pawns) of the side to move, one piece type at a
+        # time, so that no square needs to be classified.
+        our_pieces = self.occupied_co[self.turn]
+        movers = our_pieces & from_mask
+        targets = ~our_pieces & to_mask
+
+        for pieces, attacks in [(self.knights, BB_KNIGHT_ATTACKS),
+                                (self.bishops, BB_BISHOP_ATTACKS),
+                                (self.queens, BB_1_DIAGONAL_JUMPER_ATTACKS),
+                                (self.kings, BB_KING_ATTACKS)]:
+            for from_square in scan_reversed(pieces & movers):
+                yield from_square, attacks[from_square] & targets
+
+        # The grace-jump queen moves like a ferz, and can also jump two
+        # squares diagonally or orthogonally to an empty square.
+        empty = ~self.occupied & to_mask
+        for from_square in scan_reversed(self.queens_grace_jump & movers):
+            yield from_square, (BB_1_DIAGONAL_JUMPER_ATTACKS[from_square] & targets |
+                                (BB_2_DIAGONAL_JUMPER_ATTACKS[from_square] | BB_2_ORTHOGONAL_JUMPER_ATTACKS[from_square]) & empty)
+
+        for from_square in scan_reversed(self.rooks & movers):
+            yield from_square, rook_attacks(from_square, self.occupied) & targets
 
     def generate_pseudo_legal_ep(self, from_mask: Bitboard = BB_ALL, to_mask: Bitboard = BB_ALL) -> Iterator[Move]:
         if not self.ep_square or not BB_SQUARES[self.ep_square] & to_mask:
@@ -1958,16 +2831,64 @@ class Board(BaseBoard):
             BB_RANKS[4 if self.turn else 3])
 
         for capturer in scan_reversed(capturers):
-            yield Move(capturer, self.ep_square)
+            yield _MOVES[capturer][self.ep_square]
 
     def generate_pseudo_legal_captures(self, from_mask: Bitboard = BB_ALL, to_mask: Bitboard = BB_ALL) -> Iterator[Move]:
         return itertools.chain(
             self.generate_pseudo_legal_moves(from_mask, to_mask & self.occupied_co[not self.turn]),
             self.generate_pseudo_legal_ep(from_mask, to_mask))
 
+    def _check_info(self, color: Color) -> _CheckInfo:
+        # Cached until the piece placement changes, so that legal move
+        # generation, check detection and status() share the work.
+        key = (self._zobrist_board, self.occupied)
+        info = self._check_infos[color]
+        if info is None or info.key != key:
+            king = self.king(color)
+            if king is None:
+                info = _CheckInfo(key, None, BB_EMPTY, BB_EMPTY)
+            else:
+                info = _CheckInfo(key, king, self.attackers_mask(not color, king), self._slider_blockers(king))
+            self._check_infos[color] = info
+        return info
+
+    def _safe_king_targets(self, info: _CheckInfo, color: Color, targets: Bitboard) -> Bitboard:
+        # Probing a few squares is cheaper than building the attack map.
+        if info.attacks is None and popcount(targets) <= 2:
+            assert info.king is not None
+            occupied = self.occupied & ~BB_SQUARES[info.king]
+            for square in scan_reversed(targets):
+                if self.attackers_mask(not color, square, occupied):
+                    targets &= ~BB_SQUARES[square]
+            return targets
+        return targets & ~self._king_danger(info, color)
+
+    def _king_danger(self, info: _CheckInfo, color: Color) -> Bitboard:
+        # Squares the king of the given color can not move to.
+        if info.attacks is None:
+            them = self.occupied_co[not color]
+            occupied = self.occupied & ~BB_SQUARES[info.king] if info.king is not None else self.occupied
+
+            pawns = self.pawns & them
+            if color == WHITE:
+                attacks = (pawns >> 9 & ~BB_FILE_H) | (pawns >> 7 & ~BB_FILE_A)
+            else:
+                attacks = (pawns << 7 & ~BB_FILE_H | pawns << 9 & ~BB_FILE_A) & BB_ALL
+
+            for pieces, table in [(self.knights, BB_KNIGHT_ATTACKS),
+                                  (self.bishops, BB_BISHOP_ATTACKS),
+                                  (self.queens | self.queens_grace_jump, BB_1_DIAGONAL_JUMPER_ATTACKS),
+                                  (self.kings, BB_KING_ATTACKS)]:
+                for square in scan_reversed(pieces & them):
+                    attacks |= table[square]
+            for square in scan_reversed(self.rooks & them):
+                attacks |= rook_attacks(square, occupied)
+
+            info.attacks = attacks
+        return info.attacks
+
     def checkers_mask(self) -> Bitboard:
-        king = self.king(self.turn)
-        return BB_EMPTY if king is None else self.attackers_mask(not self.turn, king)
+        return self._check_info(self.turn).checkers
 
     def checkers(self) -> SquareSet:
         """
@@ -1986,27 +2907,62 @@ class Board(BaseBoard):
         Probes if the given move would put the opponent in check. The move
         must be at least pseudo-legal.
         """
-        self.push(move)
-        try:
-            return self.is_check()
-        finally:
-            self.pop()
+        king = self.king(not self.turn)
+        if king is None:
+            return False
+
+        if self.is_castling(move):
+            self.push(move)
+            try:
+                return self.is_check()
+            finally:
+                self.pop()
+
+        from_bb = BB_SQUARES[move.from_square]
+        to_bb = BB_SQUARES[move.to_square]
+        piece_type = move.promotion or self.piece_type_at(move.from_square)
+
+        # Direct checks by jumpers. The grace-jump queen gives check like a
+        # ferz, both before and after its first move.
+        if piece_type == PAWN:
+            attacks = BB_PAWN_ATTACKS[self.turn][move.to_square]
+        elif piece_type == KNIGHT:
+            attacks = BB_KNIGHT_ATTACKS[move.to_square]
+        elif piece_type == BISHOP:
+            attacks = BB_BISHOP_ATTACKS[move.to_square]
+        elif piece_type == QUEEN or piece_type == QUEEN_GRACE_JUMP:
+            attacks = BB_1_DIAGONAL_JUMPER_ATTACKS[move.to_square]
+        elif piece_type == KING:
+            attacks = BB_KING_ATTACKS[move.to_square]
+        else:
+            attacks = BB_EMPTY
+        if attacks & BB_SQUARES[king]:
+            return True
+
+        # Direct and discovered checks by rooks, the only sliders.
+        occupied = self.occupied & ~from_bb | to_bb
+        if self.is_en_passant(move):
+            occupied &= ~BB_SQUARES[move.to_square ^ 8]
+        rooks = self.rooks & self.occupied_co[self.turn] & ~from_bb
+        if piece_type == ROOK:
+            rooks |= to_bb
+        return bool(rook_attacks(king, occupied) & rooks)
 
     def is_into_check(self, move: Move) -> bool:
-        king = self.king(self.turn)
+        info = self._check_info(self.turn)
+        king = info.king
         if king is None:
             return False
 
         # If already in check, look if it is an evasion.
-        checkers = self.attackers_mask(not self.turn, king)
+        checkers = info.checkers
         if checkers and move not in self._generate_evasions(king, checkers, BB_SQUARES[move.from_square], BB_SQUARES[move.to_square]):
             return True
 
-        return not self._is_safe(king, self._slider_blockers(king), move)
+        return not self._is_safe(king, info.blockers, move)
 
     def was_into_check(self) -> bool:
-        king = self.king(not self.turn)
-        return king is not None and self.is_attacked_by(self.turn, king)
+        return bool(self._check_info(not self.turn).checkers)
 
     def is_pseudo_legal(self, move: Move) -> bool:
         # Null moves are not pseudo-legal.
@@ -2054,6 +3010,12 @@ class Board(BaseBoard):
         if piece == PAWN:
             return move in self.generate_pseudo_legal_moves(from_mask, to_mask)
 
+        # The grace-jump queen can also jump to empty squares.
+        if piece == QUEEN_GRACE_JUMP:
+            jumps = BB_2_DIAGONAL_JUMPER_ATTACKS[move.from_square] | BB_2_ORTHOGONAL_JUMPER_ATTACKS[move.from_square]
+            if jumps & to_mask & ~self.occupied:
+                return True
+
         # Handle all other pieces.
         return bool(self.attacks_mask(move.from_square) & to_mask)
 
@@ -2120,6 +3082,11 @@ class Board(BaseBoard):
         :func:`threefold repetition <medieval_chess.Board.can_claim_threefold_repetition()>`,
         unless *claim_draw* is given. Note that checking the latter can be
         slow.
+
+        Whether there is any legal move is probed at most once per
+        position (and remembered until the position changes), and
+        repetitions are counted by comparing the hashes recorded on the
+        move stack, so this is cheap enough to call after every move.
         """
         # Variant support.
         if self.is_variant_loss():
@@ -2129,16 +3096,17 @@ class Board(BaseBoard):
         if self.is_variant_draw():
             return Outcome(Termination.VARIANT_DRAW, None)
 
-        # Normal game end.
-        if self.is_checkmate():
+        # Normal game end. The probe for legal moves is shared by all
+        # conditions.
+        if self.is_check() and not self._has_legal_move():
             return Outcome(Termination.CHECKMATE, not self.turn)
         if self.is_insufficient_material():
             return Outcome(Termination.INSUFFICIENT_MATERIAL, None)
-        if not any(self.generate_legal_moves()):
+        if not self._has_legal_move():
             return Outcome(Termination.STALEMATE, None)
 
         # Automatic draws.
-        if self.is_seventyfive_moves():
+        if self.halfmove_clock >= 150:
             return Outcome(Termination.SEVENTYFIVE_MOVES, None)
         if self.is_fivefold_repetition():
             return Outcome(Termination.FIVEFOLD_REPETITION, None)
@@ -2157,7 +3125,7 @@ class Board(BaseBoard):
         if not self.is_check():
             return False
 
-        return not any(self.generate_legal_moves())
+        return not self._has_legal_move()
 
     def is_stalemate(self) -> bool:
         """Checks if the current position is a stalemate."""
@@ -2167,7 +3135,38 @@ class Board(BaseBoard):
         if self.is_variant_end():
             return False
 
-        return not any(self.generate_legal_moves())
+        return not self._has_legal_move()
+
+    def _has_legal_move(self) -> bool:
+        # Remembered until the position changes, so that outcome(),
+        # is_checkmate(), is_stalemate() and the move rules share a
+        # single probe.
+        key = (self._zobrist_board, self.occupied, self.turn, self.castling_rights, self.ep_square, self.capture_happened, self.chess960)
+        probe = self._legal_move_probe
+        if probe is None or probe[0] != key:
+            probe = self._legal_move_probe = (key, self._probe_legal_move())
+        return probe[1]
+
+    def _probe_legal_move(self) -> bool:
+        info = self._check_info(self.turn)
+        king = info.king
+        if king is None or info.checkers or self.is_variant_end():
+            # Evasions are rare. Take the generic path.
+            return any(self.generate_legal_moves())
+
+        # Piece moves, looking only at target masks.
+        blockers = info.blockers
+        for from_square, moves in self._piece_move_masks(BB_ALL, BB_ALL):
+            if not moves:
+                continue
+            if from_square == king:
+                if self._safe_king_targets(info, self.turn, moves):
+                    return True
+            elif not BB_SQUARES[from_square] & blockers or moves & self._pin_segment(king, from_square):
+                return True
+
+        # Pawn moves.
+        return any(self._is_safe(king, blockers, move) for move in self.generate_pseudo_legal_moves(self.pawns))
 
     def is_insufficient_material(self) -> bool:
         """
@@ -2184,35 +3183,40 @@ class Board(BaseBoard):
         game.
 
         The converse does not necessarily hold:
-        The implementation only looks at the material, including the colors
-        of bishops, but not considering piece positions. So fortress
-        positions or positions with forced lines may return ``False``, even
-        though there is no possible winning line.
-        """
-        if self.occupied_co[color] & (self.pawns | self.rooks | self.queens):
+        The implementation only looks at the material, including the
+        classes of squares that the colorbound ferzes (queens) and alfils
+        (bishops) are confined to, but not considering piece positions. So
+        fortress positions or positions with forced lines may return
+        ``False``, even though there is no possible winning line.
+
+        Material signatures are looked up in a table, so this is cheap
+        enough to call after every move.
+        """
+        ours = self.occupied_co[color]
+        theirs = self.occupied_co[not color]
+        if ours & (self.pawns | self.rooks):
             return False
 
-        # Knights are only insufficient material if:
-        # (1) We do not have any other pieces, including more than one knight.
-        # (2) The opponent does not have pawns, knights, bishops or rooks.
-        #     These would allow selfmate.
-        if self.occupied_co[color] & self.knights:
-            return (popcount(self.occupied_co[color]) <= 2 and
-                    not (self.occupied_co[not color] & ~self.kings & ~self.queens))
-
-        # Bishops are only insufficient material if:
-        # (1) We do not have any other pieces, including bishops of the
-        #     opposite color.
-        # (2) The opponent does not have bishops of the opposite color,
-        #     pawns or knights. These would allow selfmate.
-        if self.occupied_co[color] & self.bishops:
-            same_color = (not self.bishops & BB_DARK_SQUARES) or (not self.bishops & BB_LIGHT_SQUARES)
-            return same_color and not self.pawns and not self.knights
-
-        return True
+        # A lone knight can only checkmate with the help of blocking
+        # pieces.
+        if ours & self.knights:
+            return popcount(ours) <= 2 and not theirs & ~self.kings
+
+        # Ferzes, grace-jump queens and alfils are colorbound. Captures only
+        # remove classes, and pawns can promote on squares of either color,
+        # so they may block anywhere.
+        signature = (
+            _colorbound_signature(ours & (self.queens | self.queens_grace_jump), ours & self.bishops),
+            _colorbound_signature(theirs & (self.queens | self.queens_grace_jump), theirs & self.bishops) |
+            (_UNBOUND if theirs & (self.pawns | self.knights | self.rooks) else 0))
+        try:
+            return _COLORBOUND_DEAD[signature]
+        except KeyError:
+            dead = _COLORBOUND_DEAD[signature] = not _colorbound_mate_possible(*signature)
+            return dead
 
     def _is_halfmoves(self, n: int) -> bool:
-        return self.halfmove_clock >= n and any(self.generate_legal_moves())
+        return self.halfmove_clock >= n and self._has_legal_move()
 
     def is_seventyfive_moves(self) -> bool:
         """
@@ -2280,37 +3284,27 @@ class Board(BaseBoard):
         board occurred for the third time or if such a repetition is reached
         with one of the possible legal moves.
 
-        Note that checking this can be slow: In the worst case
-        scenario, every legal move has to be tested and the entire game has to
-        be replayed because there is no incremental transposition table.
+        Positions are compared by their :func:`~medieval_chess.Board.zobrist()`
+        hashes, so only the legal moves have to be tested.
         """
-        transposition_key = self._transposition_key()
-        transpositions: Counter[Hashable] = collections.Counter()
-        transpositions.update((transposition_key, ))
-
-        # Count positions.
-        switchyard: List[Move] = []
-        while self.move_stack:
-            move = self.pop()
-            switchyard.append(move)
-
-            if self.is_irreversible(move):
-                break
-
-            transpositions.update((self._transposition_key(), ))
-
-        while switchyard:
-            self.push(switchyard.pop())
+        zobrist_hash = self.zobrist()
+        transpositions: Counter[int] = collections.Counter(self._reversible_zobrist_history())
+        transpositions[zobrist_hash] += 1
 
         # Threefold repetition occurred.
-        if transpositions[transposition_key] >= 3:
+        if transpositions[zobrist_hash] >= 3:
             return True
 
+        # Only positions that already occurred twice can be repeated for
+        # the third time with the next move.
+        if not any(count >= 2 for count in transpositions.values()):
+            return False
+
         # The next legal move is a threefold repetition.
         for move in self.generate_legal_moves():
             self.push(move)
             try:
-                if transpositions[self._transposition_key()] >= 2:
+                if transpositions[self.zobrist()] >= 2:
                     return True
             finally:
                 self.pop()
@@ -2326,45 +3320,51 @@ class Board(BaseBoard):
         this does not consider a repetition that can be played on the next
         move.
 
-        Note that checking this can be slow: In the worst case, the entire
-        game has to be replayed because there is no incremental transposition
-        table.
-        """
-        # Fast check, based on occupancy only.
-        maybe_repetitions = 1
-        for state in reversed(self._stack):
-            if state.occupied == self.occupied:
-                maybe_repetitions += 1
-                if maybe_repetitions >= count:
-                    break
-        if maybe_repetitions < count:
+        Positions are compared by their :func:`~medieval_chess.Board.zobrist()`
+        hashes, which are recorded on the move stack.
+        """
+        if count <= 1:
+            return True
+
+        # Returning to a position takes at least two reversible plies
+        # (or four without null moves).
+        if self.halfmove_clock < 2 * (count - 1):
             return False
 
-        # Check full replay.
-        transposition_key = self._transposition_key()
-        switchyard: List[Move] = []
+        # Only every other position has the same side to move.
+        return self._reversible_zobrist_history()[1::2].count(self.zobrist()) >= count - 1
 
-        try:
-            while True:
-                if count <= 1:
-                    return True
+    def _reversible_zobrist_history(self) -> List[int]:
+        # Hashes of the previous positions, most recent first, up to the
+        # last move that reset the half-move clock. Positions before a
+        # zeroing move can not repeat.
+        return self._stack.reversible_zobrist_history(self.halfmove_clock)
 
-                if len(self.move_stack) < count - 1:
-                    break
+    def zobrist(self) -> int:
+        """
+        Gets a 64-bit Zobrist hash of the position.
 
-                move = self.pop()
-                switchyard.append(move)
+        In addition to the piece placement (distinguishing queens that may
+        still make their grace jump), the hash covers the turn, castling
+        rights, a legal en passant square and whether a capture already
+        happened (disabling double pawn moves).
 
-                if self.is_irreversible(move):
-                    break
+        The piece placement part is updated incrementally when moves are
+        pushed and popped, so this is cheap to call.
+        """
+        zobrist_hash = self._zobrist_board
 
-                if self._transposition_key() == transposition_key:
-                    count -= 1
-        finally:
-            while switchyard:
-                self.push(switchyard.pop())
+        if self.turn == WHITE:
+            zobrist_hash ^= ZOBRIST_TURN
+        if self.capture_happened:
+            zobrist_hash ^= ZOBRIST_CAPTURE_HAPPENED
+        if self.castling_rights:
+            for square in scan_reversed(self.clean_castling_rights()):
+                zobrist_hash ^= ZOBRIST_CASTLING[square]
+        if self.ep_square is not None and self.has_legal_en_passant():
+            zobrist_hash ^= ZOBRIST_EP[square_file(self.ep_square)]
 
-        return False
+        return zobrist_hash
 
     def _push_capture(self, move: Move, capture_square: Square, piece_type: PieceType, was_promoted: bool) -> None:
         self.capture_happened = True
@@ -2394,10 +3394,10 @@ class Board(BaseBoard):
         """
         # Push move and remember board state.
         move = self._to_chess960(move)
-        board_state = _BoardState(self)
-        self.castling_rights = self.clean_castling_rights()  # Before pushing stack
-        self.move_stack.append(self._from_chess960(self.chess960, move.from_square, move.to_square, move.promotion, move.drop))
-        self._stack.append(board_state)
+        stack_move = self._from_chess960(self.chess960, move.from_square, move.to_square, move.promotion, move.drop)
+        castling_rights = self.clean_castling_rights()  # Before pushing stack
+        self._stack.push(self, stack_move)
+        self.castling_rights = castling_rights
 
         # Reset en passant square.
         ep_square = self.ep_square
@@ -2500,9 +3500,7 @@ class Board(BaseBoard):
 
         :raises: :exc:`IndexError` if the move stack is empty.
         """
-        move = self.move_stack.pop()
-        self._stack.pop().restore(self)
-        return move
+        return self._stack.pop(self)
 
     def peek(self) -> Move:
         """
@@ -2586,7 +3584,7 @@ class Board(BaseBoard):
         """Checks if there is a legal en passant capture."""
         return self.ep_square is not None and any(self.generate_legal_ep())
 
-    def fen(self, *, shredder: bool = False, en_passant: EnPassantSpec = "legal", promoted: Optional[bool] = None) -> str:
+    def fen(self, *, shredder: bool = False, en_passant: EnPassantSpec = "legal", promoted: Optional[bool] = None, medieval: bool = False) -> str:
         """
         Gets a FEN representation of the position.
 
@@ -2611,12 +3609,32 @@ class Board(BaseBoard):
             (:func:`~medieval_chess.Board.has_pseudo_legal_en_passant()`).
         :param promoted: Mark promoted pieces like ``Q~``. By default, this is
             only enabled in medieval_chess variants where this is relevant.
+        :param medieval: Append a field with the state that FENs do not
+            express: the squares of queens that may still make their grace
+            jump, followed by ``x`` if a capture already happened (so that
+            pawns may no longer move two squares), or ``-`` if neither.
+            :func:`~medieval_chess.Board.set_fen()` restores the position
+            exactly from such a FEN.
+
+        >>> import medieval_chess
+        >>>
+        >>> medieval_chess.Board().fen(medieval=True)
+        'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w - - 0 1 d1d8'
         """
-        return " ".join([
+        parts = [
             self.epd(shredder=shredder, en_passant=en_passant, promoted=promoted),
             str(self.halfmove_clock),
             str(self.fullmove_number)
-        ])
+        ]
+        if medieval:
+            parts.append(self._medieval_fen())
+        return " ".join(parts)
+
+    def _medieval_fen(self) -> str:
+        builder = [SQUARE_NAMES[square] for square in scan_forward(self.queens_grace_jump & self.occupied)]
+        if self.capture_happened:
+            builder.append("x")
+        return "".join(builder) or "-"
 
     def shredder_fen(self, *, en_passant: EnPassantSpec = "legal", promoted: Optional[bool] = None) -> str:
         return " ".join([
@@ -2629,6 +3647,10 @@ class Board(BaseBoard):
         """
         Parses a FEN and sets the position from it.
 
+        Queens are plain queens, and no capture has happened, unless
+        specified otherwise by a trailing medieval field
+        (see :func:`~medieval_chess.Board.fen()`).
+
         :raises: :exc:`ValueError` if syntactically invalid. Use
             :func:`~medieval_chess.Board.is_valid()` to detect invalid positions.
         """
@@ -2704,15 +3726,35 @@ class Board(BaseBoard):
 
             fullmove_number = max(fullmove_number, 1)
 
+        # Validate the medieval part.
+        try:
+            medieval_part = parts.pop(0)
+        except IndexError:
+            medieval_part = "-"
+        else:
+            if not FEN_MEDIEVAL_REGEX.match(medieval_part):
+                raise ValueError(f"invalid medieval part in fen: {fen!r}")
+
+        queens_grace_jump = BB_EMPTY
+        for index in range(0, len(medieval_part) - 1, 2):
+            queens_grace_jump |= BB_SQUARES[parse_square(medieval_part[index:index + 2])]
+
         # All parts should be consumed now.
         if parts:
             raise ValueError(f"fen string has more parts than expected: {fen!r}")
 
         # Validate the board part and set it.
         self._set_board_fen(board_part)
+        if queens_grace_jump:
+            if queens_grace_jump & ~self.queens:
+                raise ValueError(f"grace-jump queen square without a queen in fen: {fen!r}")
+            self.queens ^= queens_grace_jump
+            self.queens_grace_jump = queens_grace_jump
+            self._zobrist_board = self._zobrist_board_hash()
 
         # Apply.
         self.turn = turn
+        self.capture_happened = medieval_part.endswith("x")
         self._set_castling_fen(castling_part)
         self.ep_square = ep_square
         self.halfmove_clock = halfmove_clock
@@ -3069,10 +4111,11 @@ class Board(BaseBoard):
     def _algebraic_and_push(self, move: Move, *, long: bool = False) -> str:
         san = self._algebraic_without_suffix(move, long=long)
 
-        # Look ahead for check or checkmate.
+        # Look ahead for check or checkmate. Only probe for legal replies
+        # if the move gives check.
+        is_check = bool(move) and self.gives_check(move)
         self.push(move)
-        is_check = self.is_check()
-        is_checkmate = (is_check and self.is_checkmate()) or self.is_variant_loss() or self.is_variant_win()
+        is_checkmate = (is_check and not any(self.generate_legal_moves())) or self.is_variant_loss() or self.is_variant_win()
 
         # Add check or checkmate suffix.
         if is_checkmate and move:
@@ -3114,15 +4157,12 @@ class Board(BaseBoard):
         if long:
             san += SQUARE_NAMES[move.from_square]
         elif piece_type != PAWN:
-            # Get ambiguous move candidates.
-            # Relevant candidates: not exactly the current move,
-            # but to the same square.
+            # Get ambiguous move candidates: other pieces with the same
+            # symbol that can legally move to the same square.
             others = 0
-            from_mask = self.pieces_mask(piece_type, self.turn)
-            from_mask &= ~BB_SQUARES[move.from_square]
-            to_mask = BB_SQUARES[move.to_square]
-            for candidate in self.generate_legal_moves(from_mask, to_mask):
-                others |= BB_SQUARES[candidate.from_square]
+            for candidate in scan_reversed(self._san_candidates(piece_type, move.to_square) & ~BB_SQUARES[move.from_square]):
+                if self.is_legal(_MOVES[candidate][move.to_square]):
+                    others |= BB_SQUARES[candidate]
 
             # Disambiguate.
             if others:
@@ -3158,6 +4198,48 @@ class Board(BaseBoard):
 
         return san
 
+    def _san_candidates(self, piece_type: PieceType, to_square: Square) -> Bitboard:
+        # Pieces of the side to move that may be able to move to the
+        # square, among those written with the same symbol as the given
+        # piece type. Both kinds of queens are written as Q.
+        if piece_type == KNIGHT:
+            mask = self.knights & BB_KNIGHT_ATTACKS[to_square]
+        elif piece_type == BISHOP:
+            mask = self.bishops & BB_BISHOP_ATTACKS[to_square]
+        elif piece_type == ROOK:
+            mask = self.rooks & rook_attacks(to_square, self.occupied)
+        elif piece_type == QUEEN or piece_type == QUEEN_GRACE_JUMP:
+            mask = self.queens & BB_1_DIAGONAL_JUMPER_ATTACKS[to_square] | self.queens_grace_jump & (
+                BB_1_DIAGONAL_JUMPER_ATTACKS[to_square] | BB_2_DIAGONAL_JUMPER_ATTACKS[to_square] | BB_2_ORTHOGONAL_JUMPER_ATTACKS[to_square])
+        elif piece_type == KING:
+            mask = self.kings & BB_KING_ATTACKS[to_square]
+        else:
+            mask = BB_EMPTY
+        return mask & self.occupied_co[self.turn]
+
+    def variation_sans(self, variation: Iterable[Move]) -> List[str]:
+        """
+        Given a sequence of moves, returns the standard algebraic notation of
+        each move (e.g., ``["e4", "e5", "Nf3"]``).
+
+        Each move is only made once, disambiguation is derived from
+        the attacks to the target square and checkmate is only probed
+        after checks, so this is suited to writing many long variations.
+
+        The board will not be modified as a result of calling this.
+
+        :raises: :exc:`IllegalMoveError` if any moves in the sequence are illegal.
+        """
+        board = self.copy(stack=False)
+        sans: List[str] = []
+
+        for move in variation:
+            if not board.is_legal(move):
+                raise IllegalMoveError(f"illegal move {move} in position {board.fen()}")
+            sans.append(board.san_and_push(move))
+
+        return sans
+
     def variation_san(self, variation: Iterable[Move]) -> str:
         """
         Given a sequence of moves, returns a string representing the sequence
@@ -3193,8 +4275,16 @@ class Board(BaseBoard):
         algebraic notation) are accepted. Some common syntactical deviations
         are also accepted.
 
+        Both kinds of queens are written as ``Q``, and promotions to ``Q``
+        are promotions to queens that may still make their grace jump.
+
         The returned move is guaranteed to be either legal or a null move.
 
+        Parsed moves are remembered by position and SAN, and the memo is
+        shared with copies of the board, so that moves that repeat within a
+        game tree (or across games parsed with the same board) are only
+        parsed once.
+
         :raises:
             :exc:`ValueError` (specifically an exception specified below) if the SAN is invalid, illegal or ambiguous.
 
@@ -3202,6 +4292,19 @@ class Board(BaseBoard):
             - :exc:`IllegalMoveError` if the SAN is illegal.
             - :exc:`AmbiguousMoveError` if the SAN is ambiguous.
         """
+        key = (self._zobrist_board, self.occupied, self.turn, self.castling_rights, self.ep_square, self.capture_happened, self.chess960, san)
+        move = self._san_memo.get(key)
+        if move is not None:
+            return move
+
+        move = self._parse_san(san)
+
+        if len(self._san_memo) >= _SAN_MEMO_SIZE:
+            self._san_memo.clear()
+        self._san_memo[key] = move
+        return move
+
+    def _parse_san(self, san: str) -> Move:
         # Castling.
         try:
             if san in ["O-O", "O-O+", "O-O#", "0-0", "0-0+", "0-0#"]:
@@ -3222,29 +4325,101 @@ class Board(BaseBoard):
             else:
                 raise InvalidMoveError(f"invalid san: {san!r}")
 
-        # Get target square. Mask our own pieces to exclude castling moves.
-        to_square = SQUARE_NAMES.index(match.group(4))
-        to_mask = BB_SQUARES[to_square] & ~self.occupied_co[self.turn]
+        # Get target square.
+        piece_symbol, file_name, rank_name, to_name, p = match.groups()
+        to_square = SQUARE_NAMES.index(to_name)
 
         # Get the promotion piece type.
-        p = match.group(5)
-        promotion = PIECE_SYMBOLS.index(p[-1].lower()) if p else None
+        promotion = _san_promotion(p[-1]) if p else None
+
+        # Get the origin square filters.
+        from_file = FILE_NAMES.index(file_name) if file_name else None
+        from_rank = int(rank_name) - 1 if rank_name else None
+
+        if piece_symbol or from_file is None or from_rank is None:
+            move = self._parse_san_fast(san, PIECE_SYMBOLS.index(piece_symbol.lower()) if piece_symbol else PAWN, from_file, from_rank, to_square, promotion)
+            if move is not None:
+                return move
+
+        return self._parse_san_slow(san, piece_symbol, from_file, from_rank, to_square, promotion)
+
+    def _parse_san_fast(self, san: str, piece_type: PieceType, from_file: Optional[int], from_rank: Optional[int], to_square: Square, promotion: Optional[PieceType]) -> Optional[Move]:
+        # Finds the origin square from the pieces that attack the target
+        # square (or the squares behind it for pawn pushes) and tests only
+        # those. Returns None to leave evasions, en passant and illegal
+        # moves to the generic path.
+        info = self._check_info(self.turn)
+        king = info.king
+        if king is None or info.checkers or self.is_variant_end():
+            return None
+
+        our_pieces = self.occupied_co[self.turn]
+        to_mask = BB_SQUARES[to_square]
+        if to_mask & our_pieces:
+            return None
+
+        if piece_type != PAWN:
+            if promotion:
+                return None
+            from_mask = self._san_candidates(piece_type, to_square)
+            if piece_type == QUEEN and to_mask & self.occupied:
+                # Grace jumps only go to empty squares.
+                from_mask &= ~self.queens_grace_jump | BB_1_DIAGONAL_JUMPER_ATTACKS[to_square]
+        else:
+            if (promotion is not None) != bool(to_mask & (BB_RANK_1 | BB_RANK_8)) or promotion not in [None, QUEEN_GRACE_JUMP]:
+                return None
+
+            pawns = self.pawns & our_pieces
+            if from_file is not None and from_file != square_file(to_square):
+                # Captures (other than en passant).
+                if not to_mask & self.occupied_co[not self.turn]:
+                    return None
+                from_mask = pawns & BB_PAWN_ATTACKS[not self.turn][to_square]
+            else:
+                # Pushes.
+                if to_mask & self.occupied:
+                    return None
+                behind = to_square - 8 if self.turn == WHITE else to_square + 8
+                if not 0 <= behind < 64:
+                    return None
+                from_mask = pawns & BB_SQUARES[behind]
+                if not from_mask and not self.occupied & BB_SQUARES[behind] and not self.capture_happened and to_mask & (BB_RANK_3 | BB_RANK_4 if self.turn == WHITE else BB_RANK_6 | BB_RANK_5):
+                    from_mask = pawns & BB_SQUARES[behind - 8 if self.turn == WHITE else behind + 8]
+
+        if from_file is not None:
+            from_mask &= BB_FILES[from_file]
+        if from_rank is not None:
+            from_mask &= BB_RANKS[from_rank]
+
+        matched_move = None
+        for from_square in scan_reversed(from_mask):
+            move = _MOVES[from_square][to_square] if promotion is None else Move(from_square, to_square, promotion)
+            if self._is_safe(king, info.blockers, move):
+                if matched_move:
+                    raise AmbiguousMoveError(f"ambiguous san: {san!r} in {self.fen()}")
+                matched_move = move
+
+        return matched_move
+
+    def _parse_san_slow(self, san: str, piece_symbol: Optional[str], from_file: Optional[int], from_rank: Optional[int], to_square: Square, promotion: Optional[PieceType]) -> Move:
+        # Mask our own pieces to exclude castling moves.
+        to_mask = BB_SQUARES[to_square] & ~self.occupied_co[self.turn]
 
         # Filter by original square.
         from_mask = BB_ALL
-        from_file = None
-        from_rank = None
-        if match.group(2):
-            from_file = FILE_NAMES.index(match.group(2))
+        if from_file is not None:
             from_mask &= BB_FILES[from_file]
-        if match.group(3):
-            from_rank = int(match.group(3)) - 1
+        if from_rank is not None:
             from_mask &= BB_RANKS[from_rank]
 
         # Filter by piece type.
-        if match.group(1):
-            piece_type = PIECE_SYMBOLS.index(match.group(1).lower())
-            from_mask &= self.pieces_mask(piece_type, self.turn)
+        if piece_symbol:
+            piece_type = PIECE_SYMBOLS.index(piece_symbol.lower())
+            if piece_type == QUEEN:
+                # Both kinds of queens are written as Q.
+                from_mask &= (self.queens | self.queens_grace_jump) & self.occupied_co[self.turn]
+            else:
+                from_mask &= self.pieces_mask(piece_type, self.turn)
         elif from_file is not None and from_rank is not None:
             # Allow fully specified moves, even if they are not pawn moves,
             # including castling moves.
@@ -3658,50 +4833,51 @@ class Board(BaseBoard):
         occupancy = (self.occupied & ~BB_SQUARES[last_double] &
                      ~BB_SQUARES[capturer] | BB_SQUARES[self.ep_square])
 
-        # Horizontal attack on the fifth or fourth rank.
-        horizontal_attackers = self.occupied_co[not self.turn] & (self.rooks | self.queens)
-        if BB_RANK_ATTACKS[king][BB_RANK_MASKS[king] & occupancy] & horizontal_attackers:
-            return True
-
-        # Diagonal skewers. These are not actually possible in a real game,
-        # because if the latest double pawn move covers a diagonal attack,
-        # then the other side would have been in check already.
-        diagonal_attackers = self.occupied_co[not self.turn] & (self.bishops | self.queens)
-        if BB_DIAG_ATTACKS[king][BB_DIAG_MASKS[king] & occupancy] & diagonal_attackers:
-            return True
-
-        return False
+        # Horizontal attack on the fifth or fourth rank. Rooks are the only
+        # sliders, so there are no diagonal skewers.
+        horizontal_attackers = self.occupied_co[not self.turn] & self.rooks
+        return bool(rook_attacks(king, occupancy) & BB_RANKS[square_rank(king)] & horizontal_attackers)
 
     def _slider_blockers(self, king: Square) -> Bitboard:
-        snipers = ((BB_RANK_ATTACKS[king][0] & self.rooks) |
-                   (BB_FILE_ATTACKS[king][0] & self.rooks))
+        color = bool(self.occupied_co[WHITE] & BB_SQUARES[king])
+        snipers = rook_attacks(king, BB_EMPTY) & self.rooks
 
         blockers = 0
 
-        for sniper in scan_reversed(snipers & self.occupied_co[not self.turn]):
+        for sniper in scan_reversed(snipers & self.occupied_co[not color]):
             b = between(king, sniper) & self.occupied
 
             # Add to blockers if exactly one piece in-between.
             if b and BB_SQUARES[msb(b)] == b:
                 blockers |= b
 
-        return blockers & self.occupied_co[self.turn]
+        return blockers & self.occupied_co[color]
+
+    def _pin_segment(self, king: Square, blocker: Square) -> Bitboard:
+        # Squares a pinned piece can move to: between the king and the
+        # pinning rook, or onto the rook. Unlike sliders, jumpers could
+        # otherwise leave the line over the king or over the rook.
+        color = bool(self.occupied_co[WHITE] & BB_SQUARES[king])
+        pinner = rook_attacks(blocker, self.occupied) & ray(king, blocker) & self.rooks & self.occupied_co[not color]
+        return between(king, msb(pinner)) | pinner
 
     def _is_safe(self, king: Square, blockers: Bitboard, move: Move) -> bool:
         if move.from_square == king:
             if self.is_castling(move):
                 return True
             else:
-                return not self.is_attacked_by(not self.turn, move.to_square)
+                return bool(self._safe_king_targets(self._check_info(self.turn), self.turn, BB_SQUARES[move.to_square]))
         elif self.is_en_passant(move):
-            return bool(self.pin_mask(self.turn, move.from_square) & BB_SQUARES[move.to_square] and
+            return bool((not blockers & BB_SQUARES[move.from_square] or self._pin_segment(king, move.from_square) & BB_SQUARES[move.to_square]) and
                         not self._ep_skewered(king, move.from_square))
         else:
             return bool(not blockers & BB_SQUARES[move.from_square] or
-                        ray(move.from_square, move.to_square) & BB_SQUARES[king])
+                        self._pin_segment(king, move.from_square) & BB_SQUARES[move.to_square])
 
     def _generate_evasions(self, king: Square, checkers: Bitboard, from_mask: Bitboard = BB_ALL, to_mask: Bitboard = BB_ALL) -> Iterator[Move]:
-        sliders = checkers & (self.bishops | self.rooks | self.queens)
+        # Rooks are the only sliders. Alfils and ferzes are jumpers, so
+        # their checks can not be blocked and do not extend past the king.
+        sliders = checkers & self.rooks
 
         attacked = 0
         for checker in scan_reversed(sliders):
@@ -3709,12 +4885,12 @@ class Board(BaseBoard):
 
         if BB_SQUARES[king] & from_mask:
             for to_square in scan_reversed(BB_KING_ATTACKS[king] & ~self.occupied_co[self.turn] & ~attacked & to_mask):
-                yield Move(king, to_square)
+                yield _MOVES[king][to_square]
 
         checker = msb(checkers)
         if BB_SQUARES[checker] == checkers:
             # Capture or block a single checker.
-            target = between(king, checker) | checkers
+            target = between(king, checker) | checkers if sliders else checkers
 
             yield from self.generate_pseudo_legal_moves(~self.kings & from_mask, target & to_mask)
 
@@ -3729,11 +4905,11 @@ class Board(BaseBoard):
         if self.is_variant_end():
             return
 
-        king_mask = self.kings & self.occupied_co[self.turn]
-        if king_mask:
-            king = msb(king_mask)
-            blockers = self._slider_blockers(king)
-            checkers = self.attackers_mask(not self.turn, king)
+        info = self._check_info(self.turn)
+        king = info.king
+        if king is not None:
+            blockers = info.blockers
+            checkers = info.checkers
             if checkers:
                 for move in self._generate_evasions(king, checkers, from_mask, to_mask):
                     if self._is_safe(king, blockers, move):
@@ -3758,6 +4934,88 @@ class Board(BaseBoard):
             self.generate_legal_moves(from_mask, to_mask & self.occupied_co[not self.turn]),
             self.generate_legal_ep(from_mask, to_mask))
 
+    def legal_moves_array(self) -> array.array[int]:
+        """
+        Generates the legal moves as an ``array('H')`` of packed move codes
+        (see :func:`~medieval_chess.Move.packed()`), without going through
+        :class:`~medieval_chess.Move` objects.
+
+        Contains the same moves as :data:`~medieval_chess.Board.legal_moves`,
+        but in unspecified order. The array supports the buffer protocol,
+        so ``numpy.frombuffer(codes, dtype=numpy.uint16)`` wraps it without
+        copying.
+
+        Also see :func:`medieval_chess.legal_moves_arrays()` to generate
+        the moves of many positions into a single flat array.
+        """
+        codes = array.array("H")
+        self._extend_legal_moves_array(codes)
+        return codes
+
+    def _extend_legal_moves_array(self, codes: array.array[int]) -> None:
+        if self.is_variant_end():
+            return
+
+        our_pieces = self.occupied_co[self.turn]
+        info = self._check_info(self.turn)
+        king = info.king
+        if king is None:
+            codes.extend(move.packed() for move in self.generate_pseudo_legal_moves())
+            return
+
+        if info.checkers:
+            # Evasions are rare. Take the generic path.
+            codes.extend(move.packed() for move in self.generate_legal_moves())
+            return
+
+        blockers = info.blockers
+
+        # King moves. Castling is not part of the medieval rules.
+        targets = self._safe_king_targets(info, self.turn, BB_KING_ATTACKS[king] & ~our_pieces)
+        codes.extend(king | to_square << 6 for to_square in scan_reversed(targets))
+
+        # Piece moves. Pinned pieces stay between the king and the pinner.
+        for from_square, targets in self._piece_move_masks(~self.kings & BB_ALL, BB_ALL):
+            if BB_SQUARES[from_square] & blockers:
+                targets &= self._pin_segment(king, from_square)
+            codes.extend(from_square | to_square << 6 for to_square in scan_reversed(targets))
+
+        # Pawn moves, in bulk for all pawns that are not pinned.
+        pawns = self.pawns & our_pieces
+        self._extend_pawn_moves_array(codes, pawns & ~blockers, BB_ALL)
+        for from_square in scan_reversed(pawns & blockers):
+            self._extend_pawn_moves_array(codes, BB_SQUARES[from_square], self._pin_segment(king, from_square))
+
+    def _extend_pawn_moves_array(self, codes: array.array[int], pawns: Bitboard, to_mask: Bitboard) -> None:
+        if not pawns:
+            return
+
+        empty = ~self.occupied & BB_ALL
+        them = self.occupied_co[not self.turn]
+
+        if self.turn == WHITE:
+            shifted = [
+                (pawns << 7 & ~BB_FILE_H & them, 7),
+                (pawns << 9 & ~BB_FILE_A & them, 9),
+                (pawns << 8 & empty, 8),
+            ]
+            if not self.capture_happened:
+                shifted.append((shifted[2][0] << 8 & empty & (BB_RANK_3 | BB_RANK_4), 16))
+        else:
+            shifted = [
+                (pawns >> 9 & ~BB_FILE_H & them, -9),
+                (pawns >> 7 & ~BB_FILE_A & them, -7),
+                (pawns >> 8 & empty, -8),
+            ]
+            if not self.capture_happened:
+                shifted.append((shifted[2][0] >> 8 & empty & (BB_RANK_6 | BB_RANK_5), -16))
+
+        promotion = QUEEN_GRACE_JUMP << 12
+        for targets, delta in shifted:
+            targets &= to_mask
+            codes.extend(to_square - delta | to_square << 6 for to_square in scan_reversed(targets & ~BB_BACKRANKS))
+            codes.extend(to_square - delta | to_square << 6 | promotion for to_square in scan_reversed(targets & BB_BACKRANKS))
+
     def _attacked_for_king(self, path: Bitboard, occupied: Bitboard) -> bool:
         return any(self.attackers_mask(not self.turn, sq, occupied) for sq in scan_reversed(path))
 
@@ -3768,37 +5026,40 @@ class Board(BaseBoard):
         if not chess960 and promotion is None and drop is None:
             if from_square == E1 and self.kings & BB_E1:
                 if to_square == H1:
-                    return Move(E1, G1)
+                    return _MOVES[E1][G1]
                 elif to_square == A1:
-                    return Move(E1, C1)
+                    return _MOVES[E1][C1]
             elif from_square == E8 and self.kings & BB_E8:
                 if to_square == H8:
-                    return Move(E8, G8)
+                    return _MOVES[E8][G8]
                 elif to_square == A8:
-                    return Move(E8, C8)
+                    return _MOVES[E8][C8]
 
+        if promotion is None and drop is None:
+            return _MOVES[from_square][to_square]
         return Move(from_square, to_square, promotion, drop)
 
     def _to_chess960(self, move: Move) -> Move:
         if move.from_square == E1 and self.kings & BB_E1:
             if move.to_square == G1 and not self.rooks & BB_G1:
-                return Move(E1, H1)
+                return _MOVES[E1][H1]
             elif move.to_square == C1 and not self.rooks & BB_C1:
-                return Move(E1, A1)
+                return _MOVES[E1][A1]
         elif move.from_square == E8 and self.kings & BB_E8:
             if move.to_square == G8 and not self.rooks & BB_G8:
-                return Move(E8, H8)
+                return _MOVES[E8][H8]
             elif move.to_square == C8 and not self.rooks & BB_C8:
-                return Move(E8, A8)
+                return _MOVES[E8][A8]
 
         return move
 
     def _transposition_key(self) -> Hashable:
         return (self.pawns, self.knights, self.bishops, self.rooks,
-                self.queens, self.kings,
+                self.queens, self.queens_grace_jump, self.kings,
                 self.occupied_co[WHITE], self.occupied_co[BLACK],
                 self.turn, self.clean_castling_rights(),
-                self.ep_square if self.has_legal_en_passant() else None)
+                self.ep_square if self.has_legal_en_passant() else None,
+                self.capture_happened)
 
     def __repr__(self) -> str:
         if not self.chess960:
@@ -3814,6 +5075,14 @@ class Board(BaseBoard):
             lastmove=self.peek() if self.move_stack else None,
             check=self.king(self.turn) if self.is_check() else None)
 
+    def __reduce_ex__(self, protocol: typing.SupportsIndex) -> Union[str, Tuple[object, ...]]:
+        if type(self) is not Board:
+            # Subclasses may have state that to_bytes() does not capture,
+            # or a constructor that from_bytes() cannot call.
+            return super().__reduce_ex__(protocol)
+        extra = {key: value for key, value in self.__dict__.items() if key not in _BOARD_BYTES_ATTRIBUTES}
+        return Board.from_bytes, (self.to_bytes(), ), extra or None
+
     def __eq__(self, board: object) -> bool:
         if isinstance(board, Board):
             return (
@@ -3859,6 +5128,11 @@ class Board(BaseBoard):
 
         Defaults to copying the entire move stack. Alternatively, *stack* can
         be ``False``, or an integer to copy a limited number of moves.
+
+        The copy shares the history with the original board and they
+        diverge when moves are pushed or popped, so this takes constant
+        time regardless of the length of the game (unless the board has a
+        *compact_stack*).
         """
         board = super().copy()
 
@@ -3869,14 +5143,115 @@ class Board(BaseBoard):
         board.turn = self.turn
         board.fullmove_number = self.fullmove_number
         board.halfmove_clock = self.halfmove_clock
+        board.capture_happened = self.capture_happened
+        board._check_infos = self._check_infos[:]
+        board._legal_move_probe = self._legal_move_probe
+        board._san_memo = self._san_memo
+
+        board._stack = self._stack.copy(len(self._stack) if stack is True else stack)
+
+        return board
+
+    def to_bytes(self) -> bytes:
+        """
+        Serializes the board to a compact binary form: the bitboards
+        (including grace-jump queens), flags and move counters of the
+        current position, and the root position and the move stack as
+        :func:`packed <medieval_chess.Move.packed()>` 16-bit moves.
+
+        This is also how boards are pickled.
+
+        >>> import medieval_chess
+        >>>
+        >>> board = medieval_chess.Board()
+        >>> board.push_san("e4")
+        Move.from_uci('e2e4')
+        >>> len(board.to_bytes())
+        204
+        >>> medieval_chess.Board.from_bytes(board.to_bytes()).move_stack
+        [Move.from_uci('e2e4')]
+        """
+        moves = array.array("H", [move.packed() for move in self.move_stack])
+        if sys.byteorder == "big":
+            moves.byteswap()
+
+        flags = self.chess960 | isinstance(self._stack, _CompactStack) << 1
+        header = _BOARD_BYTES_HEADER.pack(_BOARD_BYTES_VERSION, flags, len(moves))
+        if not moves:
+            return header + self._pack_position()
+        return b"".join([header, self._pack_position(), self.root()._pack_position(), moves.tobytes()])
 
-        if stack:
-            stack = len(self.move_stack) if stack is True else stack
-            board.move_stack = [copy.copy(move) for move in self.move_stack[-stack:]]
-            board._stack = self._stack[-stack:]
+    @classmethod
+    def from_bytes(cls: Type[BoardT], data: bytes) -> BoardT:
+        """
+        Restores a board from :func:`~medieval_chess.Board.to_bytes()`.
+        The move stack is rebuilt by replaying the moves from the root
+        position.
 
+        :raises: :exc:`ValueError` if *data* is truncated, has an
+            unsupported version, an inconsistent position or moves that
+            are not pseudo-legal.
+        """
+        if len(data) < _BOARD_BYTES_HEADER.size:
+            raise ValueError(f"expected at least {_BOARD_BYTES_HEADER.size} bytes, got {len(data)}")
+        version, flags, length = _BOARD_BYTES_HEADER.unpack_from(data)
+        if version != _BOARD_BYTES_VERSION:
+            raise ValueError(f"unsupported board serialization version: {version}")
+
+        offset = _BOARD_BYTES_HEADER.size + _BOARD_BYTES_POSITION.size
+        expected = offset + (_BOARD_BYTES_POSITION.size + 2 * length if length else 0)
+        if len(data) != expected:
+            raise ValueError(f"expected {expected} bytes for a board with {length} moves, got {len(data)}")
+
+        board = cls(None, chess960=bool(flags & 1), compact_stack=bool(flags & 2))
+        if length:
+            board._unpack_position(data, offset)
+            moves = array.array("H", data[offset + _BOARD_BYTES_POSITION.size:])
+            if sys.byteorder == "big":
+                moves.byteswap()
+            for packed in moves:
+                move = Move.from_packed(packed)
+                if move and not board.is_pseudo_legal(move):
+                    raise ValueError(f"move {move.uci()} is not pseudo-legal in {board.fen()}")
+                board.push(move)
+
+        board._unpack_position(data, _BOARD_BYTES_HEADER.size)
         return board
 
+    def _pack_position(self) -> bytes:
+        return _BOARD_BYTES_POSITION.pack(
+            self.pawns, self.knights, self.bishops, self.rooks,
+            self.queens_grace_jump, self.queens, self.kings,
+            self.occupied_co[WHITE], self.occupied_co[BLACK],
+            self.promoted, self.castling_rights,
+            self.turn | self.capture_happened << 1,
+            0 if self.ep_square is None else self.ep_square + 1,
+            self.halfmove_clock, self.fullmove_number)
+
+    def _unpack_position(self, data: bytes, offset: int) -> None:
+        (self.pawns, self.knights, self.bishops, self.rooks,
+         self.queens_grace_jump, self.queens, self.kings,
+         occupied_w, occupied_b,
+         self.promoted, self.castling_rights,
+         flags, ep_square,
+         self.halfmove_clock, self.fullmove_number) = _BOARD_BYTES_POSITION.unpack_from(data, offset)
+
+        # Piece bitboards must partition the occupied squares.
+        occupied = occupied_w | occupied_b
+        pieces = [self.pawns, self.knights, self.bishops, self.rooks, self.queens_grace_jump, self.queens, self.kings]
+        if (occupied_w & occupied_b or any(bb & ~occupied for bb in pieces) or
+                sum(popcount(bb) for bb in pieces) != popcount(occupied) or ep_square > 64):
+            raise ValueError("inconsistent position in board serialization")
+
+        self.occupied_co[WHITE] = occupied_w
+        self.occupied_co[BLACK] = occupied_b
+        self.occupied = occupied_w | occupied_b
+        self._zobrist_board = self._zobrist_board_hash()
+
+        self.turn = bool(flags & 1)
+        self.capture_happened = bool(flags & 2)
+        self.ep_square = ep_square - 1 if ep_square else None
+
     @classmethod
     def empty(cls: Type[BoardT], *, chess960: bool = False) -> BoardT:
         """Creates a new empty board. Also see :func:`~medieval_chess.Board.clear()`."""
@@ -3900,6 +5275,87 @@ class Board(BaseBoard):
         return board
 
 
+class FenCache:
+    """
+    A bounded cache of parsed FENs, discarding the least recently used
+    positions when more than *maxsize* are cached.
+
+    Boards are returned as copies (without move stacks) of the cached
+    positions, which is much cheaper than parsing, so they can be modified
+    freely.
+
+    >>> import medieval_chess
+    >>>
+    >>> cache = medieval_chess.FenCache(maxsize=1000)
+    >>> board = cache.board(medieval_chess.STARTING_FEN)
+    >>> board = cache.board(medieval_chess.STARTING_FEN)
+    >>> cache.hits, cache.misses
+    (1, 1)
+    """
+
+    def __init__(self, maxsize: int = 1024) -> None:
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._boards: collections.OrderedDict[Tuple[str, bool], Board] = collections.OrderedDict()
+
+    def board(self, fen: str, *, chess960: bool = False) -> Board:
+        """
+        Gets a board for *fen*, like :class:`Board(fen, chess960=chess960) <medieval_chess.Board>`.
+
+        :raises: :exc:`ValueError` if *fen* is syntactically invalid.
+            Invalid FENs are not cached.
+        """
+        key = (fen, chess960)
+        try:
+            board = self._boards[key]
+        except KeyError:
+            self.misses += 1
+            board = Board(fen, chess960=chess960)
+            self._boards[key] = board
+            if len(self._boards) > self.maxsize:
+                self._boards.popitem(last=False)
+        else:
+            self.hits += 1
+            self._boards.move_to_end(key)
+        return board.copy(stack=False)
+
+    def clear(self) -> None:
+        """Empties the cache and resets the counters."""
+        self._boards.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._boards)
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} at {id(self):#x} ({len(self)}/{self.maxsize}, hits={self.hits}, misses={self.misses})>"
+
+
+def legal_moves_arrays(boards: Iterable[Board]) -> Tuple[array.array[int], array.array[int]]:
+    """
+    Generates the legal moves of many boards into a single flat array.
+
+    Returns an ``array('H')`` with the packed move codes of all boards
+    (see :func:`~medieval_chess.Board.legal_moves_array()`) and an
+    ``array('Q')`` of offsets, so that the moves of the *i*-th board are
+    ``codes[offsets[i]:offsets[i + 1]]``.
+
+    >>> import medieval_chess
+    >>>
+    >>> codes, offsets = medieval_chess.legal_moves_arrays([medieval_chess.Board()])
+    >>> len(codes), list(offsets)
+    (27, [0, 27])
+    """
+    codes = array.array("H")
+    offsets = array.array("Q", [0])
+    for board in boards:
+        board._extend_legal_moves_array(codes)
+        offsets.append(len(codes))
+    return codes, offsets
+
+
 class PseudoLegalMoveGenerator:
 
     def __init__(self, board: Board) -> None:
@@ -0,0 +1,248 @@
+"""
+Perft (performance test): counts the leaf nodes of the legal move tree to
+a given depth. Used to validate the move generator against known node
+counts and as a throughput benchmark.
+
+Run as a script to count nodes from the command line:
+
+.. code-block:: shell
+
+    python -m medieval_chess.perft 4
+    python -m medieval_chess.perft 3 --fen "4k3/8/8/8/8/8/4P3/4K3 w - - 0 1" --divide
+    python -m medieval_chess.perft 6 --processes 32 --split-depth 2
+"""
+
+from __future__ import annotations
+
+import argparse
+import concurrent.futures
+import sys
+import time
+
+import medieval_chess
+
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+PerftTable = Dict[int, Tuple[int, int, int]]
+"""
+Transposition table mapping slots (the low bits of the zobrist hash) to
+``(zobrist hash, depth, node count)``.
+"""
+
+TABLE_SIZE = 1 << 18
+"""
+Number of slots of a :data:`~medieval_chess.perft.PerftTable`, a power of
+two. Each slot holds the most recently counted subtree that maps to it, so
+that the table stays bounded on deep runs.
+"""
+
+Position = bytes
+"""
+A position as shipped to worker processes, serialized with
+:func:`~medieval_chess.Board.to_bytes()`.
+"""
+
+
+def perft(board: medieval_chess.Board, depth: int, *, table: Optional[PerftTable] = None) -> int:
+    """
+    Counts the leaf nodes of the legal move tree of *board* to the given
+    *depth*.
+
+    The moves at depth 1 are counted in bulk, without making them. If
+    a *table* (any dictionary) is given, it is used as a transposition
+    table keyed on the position hash
+    (see :func:`~medieval_chess.Board.zobrist()`), so that subtrees
+    reached by different move orders are counted only once. The table
+    holds at most :data:`~medieval_chess.perft.TABLE_SIZE` entries and can
+    be reused across calls.
+
+    The board is restored to its original state afterwards.
+
+    >>> import medieval_chess
+    >>> from medieval_chess.perft import perft
+    >>>
+    >>> perft(medieval_chess.Board(), 3)
+    19230
+    """
+    if depth < 1:
+        return 1
+    elif depth == 1:
+        return len(board.legal_moves_array())
+    elif table is None:
+        return _perft(board, depth)
+    else:
+        return _perft_table(board, depth, table, TABLE_SIZE - 1)
+
+
+def _perft(board: medieval_chess.Board, depth: int) -> int:
+    if depth == 1:
+        return len(board.legal_moves_array())
+
+    count = 0
+    for move in board.legal_moves:
+        board.push(move)
+        count += _perft(board, depth - 1)
+        board.pop()
+    return count
+
+
+def _perft_table(board: medieval_chess.Board, depth: int, table: PerftTable, mask: int) -> int:
+    if depth == 1:
+        return len(board.legal_moves_array())
+
+    zobrist = board.zobrist()
+    slot = zobrist & mask
+    entry = table.get(slot)
+    if entry is not None and entry[0] == zobrist and entry[1] == depth:
+        return entry[2]
+
+    count = 0
+    for move in board.legal_moves:
+        board.push(move)
+        count += _perft_table(board, depth - 1, table, mask)
+        board.pop()
+
+    # Always replace, so that the table stays bounded.
+    table[slot] = (zobrist, depth, count)
+    return count
+
+
+def divide(board: medieval_chess.Board, depth: int, *, table: Optional[PerftTable] = None) -> Dict[medieval_chess.Move, int]:
+    """
+    Counts the leaf nodes below each legal move of *board*, as in
+    :func:`~medieval_chess.perft.perft()` at ``depth - 1`` after the move.
+    Useful to pinpoint a move generator bug by comparing with a known
+    good implementation.
+
+    Returns a dictionary mapping the root moves to their node counts.
+    """
+    counts = {}
+    for move in board.legal_moves:
+        board.push(move)
+        counts[move] = perft(board, depth - 1, table=table)
+        board.pop()
+    return counts
+
+
+def _pack_position(board: medieval_chess.Board) -> Position:
+    return board.copy(stack=False).to_bytes()
+
+
+def _unpack_position(position: Position) -> medieval_chess.Board:
+    return medieval_chess.Board.from_bytes(position)
+
+
+def _split(board: medieval_chess.Board, split_depth: int) -> Iterator[Tuple[medieval_chess.Move, Position]]:
+    # Yields the positions split_depth plies below the root, in a fixed
+    # order, each labelled with the root move leading to it.
+    if split_depth == 0:
+        yield medieval_chess.Move.null(), _pack_position(board)
+        return
+
+    for move in sorted(board.legal_moves, key=lambda move: move.uci()):
+        board.push(move)
+        for _, position in _split(board, split_depth - 1):
+            yield move, position
+        board.pop()
+
+
+_worker_table: Optional[PerftTable] = None
+
+
+def _init_worker(table: bool) -> None:
+    global _worker_table
+    _worker_table = {} if table else None
+
+
+def _perft_worker(job: Tuple[Position, int]) -> int:
+    position, depth = job
+    return perft(_unpack_position(position), depth, table=_worker_table)
+
+
+def parallel_divide(board: medieval_chess.Board, depth: int, *, processes: Optional[int] = None, split_depth: int = 1, table: bool = True) -> Dict[medieval_chess.Move, int]:
+    """
+    Like :func:`~medieval_chess.perft.divide()`, but counts the subtrees
+    in a pool of *processes* worker processes (defaults to one per CPU).
+
+    The tree is split *split_depth* plies below the root: 1 ships one job
+    per root move, 2 one job per reply, which balances the load better on
+    many cores. Jobs are generated in a fixed order (sorted by UCI) and
+    handed out with a fixed chunk size, so that the work split and the
+    returned table are reproducible. Each worker keeps its own
+    transposition table across jobs, unless *table* is ``False``.
+
+    Positions are shipped to the workers in the compact binary form of
+    :func:`~medieval_chess.Board.to_bytes()`, without move stacks.
+    """
+    split_depth = max(1, min(split_depth, depth))
+    jobs = list(_split(board, split_depth))
+
+    # Root moves without positions at the split depth (mate or stalemate)
+    # still get an entry, as in divide().
+    counts = {move: 0 for move in sorted(board.legal_moves, key=lambda move: move.uci())}
+    with concurrent.futures.ProcessPoolExecutor(processes, initializer=_init_worker, initargs=(table, )) as executor:
+        results = executor.map(_perft_worker, [(position, depth - split_depth) for _, position in jobs], chunksize=1)
+        for (move, _), count in zip(jobs, results):
+            counts[move] += count
+    return counts
+
+
+def parallel_perft(board: medieval_chess.Board, depth: int, *, processes: Optional[int] = None, split_depth: int = 1, table: bool = True) -> int:
+    """
+    Like :func:`~medieval_chess.perft.perft()`, but distributes the work
+    over a pool of worker processes.
+    See :func:`~medieval_chess.perft.parallel_divide()`.
+    """
+    if depth <= 1:
+        return perft(board, depth)
+    return sum(parallel_divide(board, depth, processes=processes, split_depth=split_depth, table=table).values())
+
+
+def _sdiv(a: float, b: float) -> float:
+    try:
+        return a / b
+    except ZeroDivisionError:
+        return float("inf")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m medieval_chess.perft", description="Count the leaf nodes of the legal move tree.")
+    parser.add_argument("depth", type=int, help="search depth in plies")
+    parser.add_argument("--fen", default=medieval_chess.STARTING_FEN, help="root position (defaults to the starting position)")
+    parser.add_argument("--divide", action="store_true", help="print the node counts below each root move")
+    parser.add_argument("--no-table", action="store_true", help="do not use a transposition table")
+    parser.add_argument("-j", "--processes", type=int, default=1, help="number of worker processes, 0 for one per CPU (defaults to 1)")
+    parser.add_argument("--split-depth", type=int, default=1, help="plies below the root at which to split work between processes (defaults to 1)")
+    args = parser.parse_args(argv)
+
+    board = medieval_chess.Board(args.fen)
+
+    start_time = time.perf_counter()
+    if args.processes != 1 and args.depth > 1:
+        options = dict(processes=args.processes or None, split_depth=args.split_depth, table=not args.no_table)
+        if args.divide:
+            counts = parallel_divide(board, args.depth, **options)
+        else:
+            nodes = parallel_perft(board, args.depth, **options)
+    else:
+        table: Optional[PerftTable] = None if args.no_table else {}
+        if args.divide:
+            counts = divide(board, args.depth, table=table)
+        else:
+            nodes = perft(board, args.depth, table=table)
+
+    if args.divide:
+        for move, count in sorted(counts.items(), key=lambda item: item[0].uci()):
+            print(f"{move.uci()}: {count}")
+        print()
+        nodes = sum(counts.values())
+    elapsed = time.perf_counter() - start_time
+
+    print(f"Nodes searched: {nodes}")
+    print(f"Time: {elapsed:.3f}s ({_sdiv(nodes, elapsed):.0f} nps)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
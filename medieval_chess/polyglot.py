@@ -1,14 +1,41 @@
+"""
+Reading, building and maintaining Polyglot opening books, as well as
+medieval books that distinguish queens that may still make their grace
+jump.
+
+Run as a script to merge, filter and inspect books from the command line:
+
+.. code-block:: shell
+
+    python -m medieval_chess.polyglot merge nightly.bin games.bin -o book.bin
+    python -m medieval_chess.polyglot filter book.bin --min-weight 2 -o book.bin
+    python -m medieval_chess.polyglot stats book.bin
+"""
+
 from __future__ import annotations
 
-import chess
+import argparse
+import array
+import bisect
+import collections
+import heapq
+import itertools
+import operator
 import struct
 import os
 import mmap
 import random
+import sys
+import tempfile
 import typing
 
+import medieval_chess
+
 from types import TracebackType
-from typing import Callable, Container, Iterator, List, NamedTuple, Optional, Type, Union
+from typing import BinaryIO, Callable, Container, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Type, Union
+
+if typing.TYPE_CHECKING:
+    import numpy
 
 
 StrOrBytesPath = Union[str, bytes, "os.PathLike[str]", "os.PathLike[bytes]"]
@@ -16,6 +43,8 @@ StrOrBytesPath = Union[str, bytes, "os.PathLike[str]", "os.PathLike[bytes]"]
 
 ENTRY_STRUCT = struct.Struct(">QHHI")
 
+_KEY_STRUCT = struct.Struct(">Q")
+
 
 POLYGLOT_RANDOM_ARRAY = [
     0x9D39247E33776D41, 0x2AF7398005AAA5C7, 0x44DB015024623547, 0x9C15F73E62A76AE2,
@@ -216,62 +245,79 @@ POLYGLOT_RANDOM_ARRAY = [
     0xF8D626AAAF278509
 ]
 
+MEDIEVAL_RANDOM_ARRAY = POLYGLOT_RANDOM_ARRAY + medieval_chess._zobrist_keys(129, seed=0x6d65_6469_676c_6f74)
+"""
+The Polyglot array extended with values for queens that may still make
+their grace jump (black, then white, by square) and for whether a capture
+has happened, for 910 values in total. The values are fixed, so that
+medieval books remain valid across versions, and drawn from a different
+stream than :func:`~medieval_chess.Board.zobrist()`, so that book keys
+are independent of the board's own hashes.
+"""
+
 
 class ZobristHasher:
     def __init__(self, array: List[int]) -> None:
         assert len(array) >= 781
         self.array = array
 
-    def hash_board(self, board: chess.BaseBoard) -> int:
+    def piece_key_index(self, piece_type: medieval_chess.PieceType, pivot: int, square: medieval_chess.Square) -> int:
+        # Queens that may still make their grace jump look like any other
+        # queen in standard books.
+        if piece_type == medieval_chess.QUEEN_GRACE_JUMP:
+            piece_type = medieval_chess.QUEEN
+        return 64 * ((piece_type - 1) * 2 + pivot) + square
+
+    def hash_board(self, board: medieval_chess.BaseBoard) -> int:
         zobrist_hash = 0
 
         for pivot, squares in enumerate(board.occupied_co):
-            for square in chess.scan_reversed(squares):
-                piece_index = (typing.cast(chess.PieceType, board.piece_type_at(square)) - 1) * 2 + pivot
-                zobrist_hash ^= self.array[64 * piece_index + square]
+            for square in medieval_chess.scan_reversed(squares):
+                piece_type = typing.cast(medieval_chess.PieceType, board.piece_type_at(square))
+                zobrist_hash ^= self.array[self.piece_key_index(piece_type, pivot, square)]
 
         return zobrist_hash
 
-    def hash_castling(self, board: chess.Board) -> int:
+    def hash_castling(self, board: medieval_chess.Board) -> int:
         zobrist_hash = 0
 
         # Hash in the castling flags.
-        if board.has_kingside_castling_rights(chess.WHITE):
+        if board.has_kingside_castling_rights(medieval_chess.WHITE):
             zobrist_hash ^= self.array[768]
-        if board.has_queenside_castling_rights(chess.WHITE):
+        if board.has_queenside_castling_rights(medieval_chess.WHITE):
             zobrist_hash ^= self.array[768 + 1]
-        if board.has_kingside_castling_rights(chess.BLACK):
+        if board.has_kingside_castling_rights(medieval_chess.BLACK):
             zobrist_hash ^= self.array[768 + 2]
-        if board.has_queenside_castling_rights(chess.BLACK):
+        if board.has_queenside_castling_rights(medieval_chess.BLACK):
             zobrist_hash ^= self.array[768 + 3]
 
         return zobrist_hash
 
-    def hash_ep_square(self, board: chess.Board) -> int:
+    def hash_ep_square(self, board: medieval_chess.Board) -> int:
         # Hash in the en passant file.
         if board.ep_square:
             # But only if there's actually a pawn ready to capture it. Legality
             # of the potential capture is irrelevant.
-            if board.turn == chess.WHITE:
-                ep_mask = chess.shift_down(chess.BB_SQUARES[board.ep_square])
+            if board.turn == medieval_chess.WHITE:
+                ep_mask = medieval_chess.shift_down(medieval_chess.BB_SQUARES[board.ep_square])
             else:
-                ep_mask = chess.shift_up(chess.BB_SQUARES[board.ep_square])
-            ep_mask = chess.shift_left(ep_mask) | chess.shift_right(ep_mask)
+                ep_mask = medieval_chess.shift_up(medieval_chess.BB_SQUARES[board.ep_square])
+            ep_mask = medieval_chess.shift_left(ep_mask) | medieval_chess.shift_right(ep_mask)
 
             if ep_mask & board.pawns & board.occupied_co[board.turn]:
-                return self.array[772 + chess.square_file(board.ep_square)]
+                return self.array[772 + medieval_chess.square_file(board.ep_square)]
         return 0
 
-    def hash_turn(self, board: chess.Board) -> int:
+    def hash_turn(self, board: medieval_chess.Board) -> int:
         # Hash in the turn.
-        return self.array[780] if board.turn == chess.WHITE else 0
+        return self.array[780] if board.turn == medieval_chess.WHITE else 0
 
-    def __call__(self, board: chess.Board) -> int:
+    def __call__(self, board: medieval_chess.Board) -> int:
         return (self.hash_board(board) ^ self.hash_castling(board) ^
                 self.hash_ep_square(board) ^ self.hash_turn(board))
 
 
-def zobrist_hash(board: chess.Board, *, _hasher: Callable[[chess.Board], int] = ZobristHasher(POLYGLOT_RANDOM_ARRAY)) -> int:
+def zobrist_hash(board: medieval_chess.Board, *, _hasher: Callable[[medieval_chess.Board], int] = ZobristHasher(POLYGLOT_RANDOM_ARRAY)) -> int:
     """
     Calculates the Polyglot Zobrist hash of the position.
 
@@ -283,6 +329,36 @@ def zobrist_hash(board: chess.Board, *, _hasher: Callable[[chess.Board], int] =
     return _hasher(board)
 
 
+class MedievalZobristHasher(ZobristHasher):
+    def __init__(self, array: List[int]) -> None:
+        assert len(array) >= 910
+        self.array = array
+
+    def piece_key_index(self, piece_type: medieval_chess.PieceType, pivot: int, square: medieval_chess.Square) -> int:
+        if piece_type == medieval_chess.QUEEN_GRACE_JUMP:
+            return 781 + 64 * pivot + square
+        return super().piece_key_index(piece_type, pivot, square)
+
+    def hash_capture_happened(self, board: medieval_chess.Board) -> int:
+        # Hash in whether double pawn pushes are still allowed.
+        return self.array[909] if board.capture_happened else 0
+
+    def __call__(self, board: medieval_chess.Board) -> int:
+        return super().__call__(board) ^ self.hash_capture_happened(board)
+
+
+def medieval_zobrist_hash(board: medieval_chess.Board, *, _hasher: Callable[[medieval_chess.Board], int] = MedievalZobristHasher(MEDIEVAL_RANDOM_ARRAY)) -> int:
+    """
+    Calculates the Zobrist hash of the position for medieval opening books.
+
+    Unlike :func:`~medieval_chess.polyglot.zobrist_hash()`, queens that may
+    still make their grace jump are distinguished from other queens, and
+    whether a capture has happened is hashed in. Positions are otherwise
+    hashed like in Polyglot books.
+    """
+    return _hasher(board)
+
+
 class Entry(NamedTuple):
     """An entry from a Polyglot opening book."""
 
@@ -292,7 +368,7 @@ class Entry(NamedTuple):
     raw_move: int
     """
     The raw binary representation of the move. Use
-    :data:`~chess.polyglot.Entry.move` instead.
+    :data:`~medieval_chess.polyglot.Entry.move` instead.
     """
 
     weight: int
@@ -301,8 +377,32 @@ class Entry(NamedTuple):
     learn: int
     """Another integer value that can be used for extra information."""
 
-    move: chess.Move
-    """The :class:`~chess.Move`."""
+    move: medieval_chess.Move
+    """The :class:`~medieval_chess.Move`."""
+
+
+class BookStats(NamedTuple):
+    """Statistics of a Polyglot opening book."""
+
+    entries: int
+    """The number of entries."""
+
+    positions: int
+    """The number of distinct keys."""
+
+    total_weight: int
+    """The sum of the weights of all entries."""
+
+    max_weight: int
+    """The highest weight of an entry, or ``0`` if there are no entries."""
+
+    zero_weight: int
+    """The number of (deleted) entries with weight ``0``."""
+
+
+def _entry_dtype() -> numpy.dtype:
+    import numpy
+    return numpy.dtype([("key", ">u8"), ("raw_move", ">u2"), ("weight", ">u2"), ("learn", ">u4")])
 
 
 class _EmptyMmap(bytearray):
@@ -321,9 +421,35 @@ def _randint(rng: Optional[random.Random], a: int, b: int) -> int:
 
 
 class MemoryMappedReader:
-    """Maps a Polyglot opening book to memory."""
+    """
+    Maps a Polyglot opening book to memory.
+
+    Medieval books, for example written by
+    :func:`~medieval_chess.polyglot.build_book()`, share the format, but are
+    keyed by :func:`~medieval_chess.polyglot.medieval_zobrist_hash()`. Pass
+    *medieval* to look up positions in them.
+
+    Every *fence_stride*-th key is read when the book is opened, so that
+    seeking a position only searches a small range of entries (a single
+    page by default). The entries of the last *cache_size* positions that
+    were looked up are kept decoded in memory.
+    """
+
+    def __init__(self, filename: StrOrBytesPath, *, medieval: bool = False, cache_size: int = 1024, fence_stride: int = 256) -> None:
+        self.medieval = medieval
+        self.cache_size = cache_size
+        self.fence_stride = fence_stride
+
+        self.hits = 0
+        """The number of lookups answered from the cache."""
+
+        self.misses = 0
+        """The number of lookups that searched the book."""
+
+        self._cache: collections.OrderedDict[int, List[Entry]] = collections.OrderedDict()
+        self._zobrist_hash = medieval_zobrist_hash if medieval else zobrist_hash
+        self._array: Optional[numpy.ndarray] = None
 
-    def __init__(self, filename: StrOrBytesPath) -> None:
         fd = os.open(filename, os.O_RDONLY | getattr(os, "O_BINARY", 0))
         try:
             self.mmap: Union[mmap.mmap, _EmptyMmap] = mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
@@ -341,6 +467,9 @@ class MemoryMappedReader:
         except AttributeError:
             pass
 
+        unpack_key = _KEY_STRUCT.unpack_from
+        self._fences = array.array("Q", [unpack_key(self.mmap, index * ENTRY_STRUCT.size)[0] for index in range(0, len(self), fence_stride)])
+
     def __enter__(self) -> MemoryMappedReader:
         return self
 
@@ -374,7 +503,7 @@ class MemoryMappedReader:
             drop = None
 
         # Entry with move (not normalized).
-        move = chess.Move(from_square, to_square, promotion, drop)
+        move = medieval_chess.Move(from_square, to_square, promotion, drop)
         return Entry(key, raw_move, weight, learn, move)
 
     def __iter__(self) -> Iterator[Entry]:
@@ -382,12 +511,15 @@ class MemoryMappedReader:
             yield self[i]
 
     def bisect_key_left(self, key: int) -> int:
-        lo = 0
-        hi = len(self)
+        # Keys before the fence are smaller, and the key at the fence is not.
+        fence = bisect.bisect_left(self._fences, key)
+        lo = max(fence - 1, 0) * self.fence_stride + (fence > 0)
+        hi = min(fence * self.fence_stride, len(self))
 
+        unpack_key = _KEY_STRUCT.unpack_from
         while lo < hi:
             mid = (lo + hi) // 2
-            mid_key, _, _, _ = ENTRY_STRUCT.unpack_from(self.mmap, mid * ENTRY_STRUCT.size)
+            mid_key, = unpack_key(self.mmap, mid * ENTRY_STRUCT.size)
             if mid_key < key:
                 lo = mid + 1
             else:
@@ -395,28 +527,76 @@ class MemoryMappedReader:
 
         return lo
 
+    def array(self) -> numpy.ndarray:
+        """
+        Gets a read-only structured NumPy array of the entries, mapping the
+        book without copying. The fields ``key``, ``raw_move``, ``weight``
+        and ``learn`` are big-endian, like in the file.
+
+        Arrays obtained from the reader must be released before it is
+        closed.
+
+        Requires NumPy.
+        """
+        if self._array is None:
+            import numpy
+            self._array = numpy.frombuffer(self.mmap, dtype=_entry_dtype())
+        return self._array
+
+    def key_ranges(self, keys: Union[Iterable[int], numpy.ndarray]) -> Tuple[numpy.ndarray, numpy.ndarray]:
+        """
+        Seeks many Zobrist hashes at once. Returns arrays *start* and
+        *stop*, such that the entries for ``keys[i]`` are
+        ``reader.array()[start[i]:stop[i]]``, regardless of their weights.
+
+        Requires NumPy.
+        """
+        import numpy
+
+        # Big-endian keys sort like their bytes, so the key column can be
+        # searched in place, instead of converting it to native byte order.
+        column = self.array()["key"].view("S8")
+        probes = numpy.asarray(keys, dtype=numpy.uint64).astype(">u8").view("S8")
+        return numpy.searchsorted(column, probes, side="left"), numpy.searchsorted(column, probes, side="right")
+
+    def stats(self, *, chunk_size: int = 1 << 20) -> BookStats:
+        """
+        Computes statistics of the whole book, processing *chunk_size*
+        entries at a time.
+
+        Requires NumPy.
+        """
+        import numpy
+
+        entries = self.array()
+        keys = entries["key"].view("S8")
+        positions = total_weight = max_weight = zero_weight = 0
+
+        for start in range(0, len(entries), chunk_size):
+            weights = entries["weight"][start:start + chunk_size].astype(numpy.uint64)
+            total_weight += int(weights.sum())
+            max_weight = max(max_weight, int(weights.max()))
+            zero_weight += int(numpy.count_nonzero(weights == 0))
+
+            # Count key changes, including the one from the previous chunk.
+            chunk_keys = keys[max(start - 1, 0):start + chunk_size]
+            positions += int(numpy.count_nonzero(chunk_keys[1:] != chunk_keys[:-1])) + (start == 0)
+
+        return BookStats(len(entries), positions, total_weight, max_weight, zero_weight)
+
     def __contains__(self, entry: Entry) -> bool:
         return any(current == entry for current in self.find_all(entry.key, minimum_weight=entry.weight))
 
-    def find_all(self, board: Union[chess.Board, int], *, minimum_weight: int = 1, exclude_moves: Container[chess.Move] = []) -> Iterator[Entry]:
+    def find_all(self, board: Union[medieval_chess.Board, int], *, minimum_weight: int = 1, exclude_moves: Container[medieval_chess.Move] = []) -> Iterator[Entry]:
         """Seeks a specific position and yields corresponding entries."""
         try:
             key = int(board)  # type: ignore
-            context: Optional[chess.Board] = None
+            context: Optional[medieval_chess.Board] = None
         except (TypeError, ValueError):
-            context = typing.cast(chess.Board, board)
-            key = zobrist_hash(context)
-
-        i = self.bisect_key_left(key)
-        size = len(self)
-
-        while i < size:
-            entry = self[i]
-            i += 1
-
-            if entry.key != key:
-                break
+            context = typing.cast(medieval_chess.Board, board)
+            key = self._zobrist_hash(context)
 
+        for entry in self._entries(key):
             if entry.weight < minimum_weight:
                 continue
 
@@ -432,7 +612,42 @@ class MemoryMappedReader:
 
             yield entry
 
-    def find(self, board: Union[chess.Board, int], *, minimum_weight: int = 1, exclude_moves: Container[chess.Move] = []) -> Entry:
+    def _entries(self, key: int) -> List[Entry]:
+        try:
+            entries = self._cache[key]
+        except KeyError:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._cache.move_to_end(key)
+            return entries
+
+        entries = []
+        i = self.bisect_key_left(key)
+        size = len(self)
+
+        while i < size:
+            entry = self[i]
+            i += 1
+
+            if entry.key != key:
+                break
+
+            entries.append(entry)
+
+        if self.cache_size > 0:
+            self._cache[key] = entries
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return entries
+
+    def clear_cache(self) -> None:
+        """Empties the cache of decoded entries and resets the counters."""
+        self._cache.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def find(self, board: Union[medieval_chess.Board, int], *, minimum_weight: int = 1, exclude_moves: Container[medieval_chess.Move] = []) -> Entry:
         """
         Finds the main entry for the given position or Zobrist hash.
 
@@ -443,7 +658,7 @@ class MemoryMappedReader:
         *minimum_weight* ``0`` to select all entries.
 
         :raises: :exc:`IndexError` if no entries are found. Use
-            :func:`~chess.polyglot.MemoryMappedReader.get()` if you prefer to
+            :func:`~medieval_chess.polyglot.MemoryMappedReader.get()` if you prefer to
             get ``None`` instead of an exception.
         """
         try:
@@ -451,13 +666,13 @@ class MemoryMappedReader:
         except ValueError:
             raise IndexError()
 
-    def get(self, board: Union[chess.Board, int], default: Optional[Entry] = None, *, minimum_weight: int = 1, exclude_moves: Container[chess.Move] = []) -> Optional[Entry]:
+    def get(self, board: Union[medieval_chess.Board, int], default: Optional[Entry] = None, *, minimum_weight: int = 1, exclude_moves: Container[medieval_chess.Move] = []) -> Optional[Entry]:
         try:
             return self.find(board, minimum_weight=minimum_weight, exclude_moves=exclude_moves)
         except IndexError:
             return default
 
-    def choice(self, board: Union[chess.Board, int], *, minimum_weight: int = 1, exclude_moves: Container[chess.Move] = [], random: Optional[random.Random] = None) -> Entry:
+    def choice(self, board: Union[medieval_chess.Board, int], *, minimum_weight: int = 1, exclude_moves: Container[medieval_chess.Move] = [], random: Optional[random.Random] = None) -> Entry:
         """
         Uniformly selects a random entry for the given position.
 
@@ -474,7 +689,7 @@ class MemoryMappedReader:
 
         return chosen_entry
 
-    def weighted_choice(self, board: Union[chess.Board, int], *, exclude_moves: Container[chess.Move] = [], random: Optional[random.Random] = None) -> Entry:
+    def weighted_choice(self, board: Union[medieval_chess.Board, int], *, exclude_moves: Container[medieval_chess.Move] = [], random: Optional[random.Random] = None) -> Entry:
         """
         Selects a random entry for the given position, distributed by the
         weights of the entries.
@@ -497,26 +712,250 @@ class MemoryMappedReader:
 
     def close(self) -> None:
         """Closes the reader."""
+        self._array = None
         self.mmap.close()
 
 
-def open_reader(path: StrOrBytesPath) -> MemoryMappedReader:
+def open_reader(path: StrOrBytesPath, *, medieval: bool = False) -> MemoryMappedReader:
     """
-    Creates a reader for the file at the given path.
+    Creates a reader for the file at the given path. Pass *medieval* for
+    books written by :func:`~medieval_chess.polyglot.build_book()`.
 
-    The following example opens a book to find all entries for the start
-    position:
+    The following example opens a standard book to find all entries for
+    the standard start position, by its Zobrist hash (medieval positions
+    have no castling rights):
 
-    >>> import chess
-    >>> import chess.polyglot
+    >>> import medieval_chess.polyglot
     >>>
-    >>> board = chess.Board()
-    >>>
-    >>> with chess.polyglot.open_reader("data/polyglot/performance.bin") as reader:
-    ...    for entry in reader.find_all(board):
-    ...        print(entry.move, entry.weight, entry.learn)
-    e2e4 1 0
-    d2d4 1 0
-    c2c4 1 0
+    >>> with medieval_chess.polyglot.open_reader("data/polyglot/performance.bin") as reader:
+    ...    for entry in reader.find_all(0x463b96181691fc9c):
+    ...        print(entry.move, entry.weight)
+    e2e4 1
+    d2d4 1
+    c2c4 1
+    """
+    return MemoryMappedReader(path, medieval=medieval)
+
+
+DEFAULT_RUN_SIZE = 1 << 20
+"""
+Default number of distinct entries aggregated in memory by
+:func:`~medieval_chess.polyglot.build_book()`.
+"""
+
+# Number of entries read or written at once when sorting books.
+_BUFFERED_ENTRIES = 4096
+
+
+def _raw_move(move: medieval_chess.Move) -> int:
+    raw_move = move.to_square | move.from_square << 6
+    if move.promotion:
+        raw_move |= (move.promotion - 1) << 12
+    return raw_move
+
+
+def _write_run(entries: Dict[Tuple[int, int], int], f: BinaryIO) -> None:
+    pack = ENTRY_STRUCT.pack
+    f.write(b"".join(pack(key, raw_move, min(weight, 0xffff), 0) for (key, raw_move), weight in sorted(entries.items())))
+    f.seek(0)
+
+
+def _read_run(f: BinaryIO) -> Iterator[Tuple[int, int, int, int]]:
+    while True:
+        data = f.read(_BUFFERED_ENTRIES * ENTRY_STRUCT.size)
+        if not data:
+            break
+        yield from ENTRY_STRUCT.iter_unpack(data)
+
+
+def _read_book(path: StrOrBytesPath) -> Iterator[Tuple[int, int, int, int]]:
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return  # Can not map empty files.
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    with data:
+        try:
+            # Unix
+            data.madvise(mmap.MADV_SEQUENTIAL)
+        except AttributeError:
+            pass
+
+        step = _BUFFERED_ENTRIES * ENTRY_STRUCT.size
+        for offset in range(0, len(data), step):
+            yield from ENTRY_STRUCT.iter_unpack(data[offset:offset + step])
+
+
+def _write_merged(runs: List[Iterator[Tuple[int, int, int, int]]], f: BinaryIO, *, combine: Callable[[int, int], int] = operator.add, minimum_weight: int = 0) -> int:
+    # Combines the weights of equal moves of the runs, which are sorted by
+    # key, and writes the entries of each position by descending weight,
+    # like Polyglot. The first learn value is kept.
+    pack = ENTRY_STRUCT.pack
+    buffer: List[bytes] = []
+    count = 0
+
+    for key, group in itertools.groupby(heapq.merge(*runs, key=operator.itemgetter(0)), key=operator.itemgetter(0)):
+        moves: Dict[int, Tuple[int, int]] = {}
+        for _, raw_move, weight, learn in group:
+            try:
+                previous_weight, learn = moves[raw_move]
+            except KeyError:
+                moves[raw_move] = weight, learn
+            else:
+                moves[raw_move] = combine(previous_weight, weight), learn
+        for raw_move, (weight, learn) in sorted(moves.items(), key=lambda item: -item[1][0]):
+            if weight >= minimum_weight:
+                buffer.append(pack(key, raw_move, min(weight, 0xffff), learn))
+
+        if len(buffer) >= _BUFFERED_ENTRIES:
+            f.write(b"".join(buffer))
+            count += len(buffer)
+            buffer.clear()
+
+    f.write(b"".join(buffer))
+    return count + len(buffer)
+
+
+def build_book(pgn_paths: Iterable[StrOrBytesPath], path: StrOrBytesPath, *, max_ply: int = 30, run_size: int = DEFAULT_RUN_SIZE) -> int:
     """
-    return MemoryMappedReader(path)
+    Builds a medieval opening book at *path* from the mainlines of the
+    games in the PGN files at *pgn_paths*.
+
+    The first *max_ply* moves of every game are added to the book, keyed by
+    :func:`~medieval_chess.polyglot.medieval_zobrist_hash()`. The weight of
+    an entry is the number of times its move was played in its position,
+    saturating at ``0xffff``. Learn values are ``0``.
+
+    At most *run_size* distinct entries are aggregated in memory. Beyond
+    that, sorted runs are spilled to temporary files and merged at the end,
+    so that memory use does not grow with the number of games.
+
+    Returns the number of entries written. Open the book with
+    :func:`~medieval_chess.polyglot.open_reader()` and *medieval* set.
+
+    :raises: :exc:`ValueError` if a game contains an invalid or illegal move.
+    """
+    board = medieval_chess.Board()
+    entries: Dict[Tuple[int, int], int] = {}
+    spilled: List[BinaryIO] = []
+
+    try:
+        for pgn_path in pgn_paths:
+            with open(pgn_path, encoding="utf-8-sig") as pgn:
+                for headers, movetext in medieval_chess._read_pgn_games(pgn):
+                    if "FEN" in headers:
+                        board.set_fen(headers["FEN"])
+                    else:
+                        board.reset()
+
+                    for _, san in zip(range(max_ply), medieval_chess._pgn_mainline_sans(movetext)):
+                        move = board.parse_san(san)
+                        if not move:
+                            break  # Null moves can not be stored.
+                        entry = medieval_zobrist_hash(board), _raw_move(move)
+                        entries[entry] = entries.get(entry, 0) + 1
+                        board.push(move)
+
+                    if len(entries) >= run_size:
+                        spilled.append(typing.cast(BinaryIO, tempfile.TemporaryFile()))
+                        _write_run(entries, spilled[-1])
+                        entries.clear()
+
+        runs = [_read_run(f) for f in spilled]
+        runs.append(iter(sorted((key, raw_move, weight, 0) for (key, raw_move), weight in entries.items())))
+        entries.clear()
+
+        return _write_book(path, lambda f: _write_merged(runs, f))
+    finally:
+        for f in spilled:
+            f.close()
+
+
+def _write_book(path: StrOrBytesPath, write: Callable[[BinaryIO], int]) -> int:
+    # Writes next to the destination and then moves the book into place, so
+    # that it can replace one of the books being read.
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(os.fsdecode(path))), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            count = write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return count
+
+
+def merge_books(paths: Iterable[StrOrBytesPath], path: StrOrBytesPath, *, combine: str = "sum", minimum_weight: int = 0) -> int:
+    """
+    Merges the opening books at *paths* into a new book at *path*.
+
+    The books must be sorted by key, like all Polyglot books (and the
+    books written by :func:`~medieval_chess.polyglot.build_book()`). They
+    are streamed through memory maps, so that memory use is constant.
+
+    The weights of entries with the same key and move are summed
+    (*combine* ``"sum"``, saturating at ``0xffff``), or the highest is kept
+    (``"max"``). Then entries with a weight below *minimum_weight* are
+    dropped. Merging a single book with a *minimum_weight* compacts it.
+
+    *path* may be one of the merged books: the book is written to a
+    temporary file first.
+
+    Returns the number of entries written.
+
+    :raises: :exc:`IOError` if a file is not a valid opening book, and
+        :exc:`ValueError` if *combine* is invalid.
+    """
+    combiners: Dict[str, Callable[[int, int], int]] = {"sum": operator.add, "max": max}
+    try:
+        combine_weights = combiners[combine]
+    except KeyError:
+        raise ValueError(f"expected combine 'sum' or 'max', got {combine!r}")
+
+    paths = list(paths)
+    for book_path in paths:
+        if os.path.getsize(book_path) % ENTRY_STRUCT.size != 0:
+            raise IOError(f"invalid file size: ensure {book_path!r} is a valid polyglot opening book")
+
+    return _write_book(path, lambda f: _write_merged([_read_book(book_path) for book_path in paths], f, combine=combine_weights, minimum_weight=minimum_weight))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m medieval_chess.polyglot", description="Merge, filter and inspect opening books.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    merge_parser = subparsers.add_parser("merge", help="merge sorted books")
+    merge_parser.add_argument("books", nargs="+", help="input books")
+    merge_parser.add_argument("-o", "--output", required=True, help="output book (may be one of the input books)")
+    merge_parser.add_argument("--max", action="store_true", help="keep the highest weight of duplicate entries instead of their sum")
+    merge_parser.add_argument("--min-weight", type=int, default=0, help="drop entries with lower weights (defaults to 0)")
+
+    filter_parser = subparsers.add_parser("filter", help="drop entries with low weights")
+    filter_parser.add_argument("book", help="input book")
+    filter_parser.add_argument("-o", "--output", required=True, help="output book (may be the input book)")
+    filter_parser.add_argument("--min-weight", type=int, default=1, help="drop entries with lower weights (defaults to 1)")
+
+    stats_parser = subparsers.add_parser("stats", help="print statistics of books (requires NumPy)")
+    stats_parser.add_argument("books", nargs="+", help="input books")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "stats":
+        for book_path in args.books:
+            with MemoryMappedReader(book_path) as reader:
+                stats = reader.stats()
+            print(f"{book_path}:")
+            for name, value in zip(stats._fields, stats):
+                print(f"  {name}: {value}")
+        return 0
+
+    if args.command == "merge":
+        count = merge_books(args.books, args.output, combine="max" if args.max else "sum", minimum_weight=args.min_weight)
+    else:
+        count = merge_books([args.book], args.output, minimum_weight=args.min_weight)
+    print(f"Wrote {count} entries to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
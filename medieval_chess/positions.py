@@ -0,0 +1,278 @@
+"""
+Streams positions from EPD (or FEN) files into columnar arrays, for
+example to load large position corpora.
+
+>>> import medieval_chess.positions
+>>>
+>>> positions = medieval_chess.positions.read("data/endgame.epd")
+>>> len(positions)
+200
+>>> positions.board(0)
+Board('8/2K5/8/8/8/8/3p4/1k2N3 b - - 0 1')
+>>> positions.operations(0)
+{'wdl_table': 2, 'wdl': 2, 'dtz': 1}
+
+Every attribute of the positions is a column: an :class:`array.array`
+indexed by position, with bitboards as unsigned 64-bit integers. Columns
+can be wrapped without copying, for example with ``numpy.frombuffer()``.
+EPD operations are kept as raw text and parsed only on demand.
+
+Files are memory-mapped and can be split into chunks at line boundaries,
+which are loaded independently, for example in a process pool:
+
+.. code-block:: python
+
+    import concurrent.futures
+    import functools
+
+    spans = medieval_chess.positions.split(path)
+    with concurrent.futures.ProcessPoolExecutor() as executor:
+        for positions in executor.map(functools.partial(medieval_chess.positions.read, path), spans):
+            ...
+"""
+
+from __future__ import annotations
+
+import array
+import mmap
+import os
+
+import medieval_chess
+
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+
+DEFAULT_CHUNK_SIZE = 16 * 1024 * 1024
+"""Default size of chunks in bytes."""
+
+Span = Tuple[int, int]
+"""A range of bytes of a file, starting and ending at line boundaries."""
+
+_SQUARES = {name: square for square, name in enumerate(medieval_chess.SQUARE_NAMES)}
+
+
+class Positions:
+    """
+    Positions in columnar arrays. The *i*-th position consists of the
+    *i*-th entry of each column.
+    """
+
+    def __init__(self) -> None:
+        self.pawns = array.array("Q")
+        self.knights = array.array("Q")
+        self.bishops = array.array("Q")
+        self.rooks = array.array("Q")
+        self.queens = array.array("Q")
+        self.queens_grace_jump = array.array("Q")
+        self.kings = array.array("Q")
+        self.occupied_w = array.array("Q")
+        self.occupied_b = array.array("Q")
+        self.promoted = array.array("Q")
+        self.castling_rights = array.array("Q")
+
+        self.turn = array.array("B")
+        """``1`` if white is to move, else ``0``."""
+
+        self.ep_square = array.array("b")
+        """The en passant square, or ``-1``."""
+
+        self.capture_happened = array.array("B")
+        self.halfmove_clock = array.array("I")
+        self.fullmove_number = array.array("I")
+
+        self.offsets = array.array("Q")
+        """The byte offset of the line of each position in the file."""
+
+        self._operations = bytearray()
+        self._operation_offsets = array.array("Q", [0])
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def board(self, index: int) -> medieval_chess.Board:
+        """Creates a :class:`~medieval_chess.Board` for the position at *index*."""
+        board = medieval_chess.Board(None)
+        board.pawns = self.pawns[index]
+        board.knights = self.knights[index]
+        board.bishops = self.bishops[index]
+        board.rooks = self.rooks[index]
+        board.queens = self.queens[index]
+        board.queens_grace_jump = self.queens_grace_jump[index]
+        board.kings = self.kings[index]
+        board.occupied_co[medieval_chess.WHITE] = self.occupied_w[index]
+        board.occupied_co[medieval_chess.BLACK] = self.occupied_b[index]
+        board.occupied = self.occupied_w[index] | self.occupied_b[index]
+        board.promoted = self.promoted[index]
+        board._zobrist_board = board._zobrist_board_hash()
+
+        board.turn = bool(self.turn[index])
+        board.castling_rights = self.castling_rights[index]
+        board.ep_square = None if self.ep_square[index] < 0 else self.ep_square[index]
+        board.capture_happened = bool(self.capture_happened[index])
+        board.halfmove_clock = self.halfmove_clock[index]
+        board.fullmove_number = self.fullmove_number[index]
+        return board
+
+    def operations(self, index: int) -> Dict[str, Union[None, str, int, float, medieval_chess.Move, List[medieval_chess.Move]]]:
+        """
+        Parses the EPD operations of the position at *index*, like
+        :func:`~medieval_chess.Board.set_epd()`.
+
+        :raises: :exc:`ValueError` if the operations are invalid.
+        """
+        index = range(len(self))[index]
+        text = self._operations[self._operation_offsets[index]:self._operation_offsets[index + 1]].decode("utf-8")
+        if not text:
+            return {}
+        board = self.board(index)
+        board.halfmove_clock = 0
+        board.fullmove_number = 1
+        return board._parse_epd_ops(text, lambda: board.copy(stack=False))
+
+    def _append(self, line: str, offset: int, scratch: medieval_chess.Board) -> None:
+        parts = line.rstrip(";").split(None, 4)
+        rest = parts[4] if len(parts) > 4 else ""
+        counters = rest[:1].isdigit() or rest[:1] == "-"
+        operations = "" if counters else rest
+
+        if operations and ("hmvc" in operations or "fmvn" in operations):
+            # The operations set the move counters.
+            scratch.set_epd(line)
+            self._append_board(scratch, offset, operations)
+            return
+
+        counter_parts = rest.split() if counters else []
+        simple = (len(parts) >= 4 and parts[1] in ["w", "b"] and parts[2] == "-" and (parts[3] == "-" or parts[3] in _SQUARES) and
+                  (not counters or len(counter_parts) == 2 and counter_parts[0].isdigit() and counter_parts[1].isdigit()))
+        masks = medieval_chess._board_fen_masks(parts[0]) if simple else None
+        if masks is None:
+            # Castling rights, promoted pieces, the medieval part or errors.
+            scratch.set_fen(" ".join(parts if counters or not rest else parts[:4]))
+            self._append_board(scratch, offset, operations)
+            return
+
+        halfmove_clock, fullmove_number = (int(counter_parts[0]), max(int(counter_parts[1]), 1)) if counters else (0, 1)
+
+        pawns, knights, bishops, rooks, queens, kings, white = masks
+        self.pawns.append(pawns)
+        self.knights.append(knights)
+        self.bishops.append(bishops)
+        self.rooks.append(rooks)
+        self.queens.append(queens)
+        self.queens_grace_jump.append(medieval_chess.BB_EMPTY)
+        self.kings.append(kings)
+        self.occupied_w.append(white)
+        self.occupied_b.append((pawns | knights | bishops | rooks | queens | kings) ^ white)
+        self.promoted.append(medieval_chess.BB_EMPTY)
+        self.castling_rights.append(medieval_chess.BB_EMPTY)
+        self.turn.append(parts[1] == "w")
+        self.ep_square.append(-1 if parts[3] == "-" else _SQUARES[parts[3]])
+        self.capture_happened.append(False)
+        self.halfmove_clock.append(halfmove_clock)
+        self.fullmove_number.append(fullmove_number)
+        self._append_operations(offset, operations)
+
+    def _append_board(self, board: medieval_chess.Board, offset: int, operations: str) -> None:
+        self.pawns.append(board.pawns)
+        self.knights.append(board.knights)
+        self.bishops.append(board.bishops)
+        self.rooks.append(board.rooks)
+        self.queens.append(board.queens)
+        self.queens_grace_jump.append(board.queens_grace_jump)
+        self.kings.append(board.kings)
+        self.occupied_w.append(board.occupied_co[medieval_chess.WHITE])
+        self.occupied_b.append(board.occupied_co[medieval_chess.BLACK])
+        self.promoted.append(board.promoted)
+        self.castling_rights.append(board.castling_rights)
+        self.turn.append(board.turn)
+        self.ep_square.append(-1 if board.ep_square is None else board.ep_square)
+        self.capture_happened.append(board.capture_happened)
+        self.halfmove_clock.append(board.halfmove_clock)
+        self.fullmove_number.append(board.fullmove_number)
+        self._append_operations(offset, operations)
+
+    def _append_operations(self, offset: int, operations: str) -> None:
+        self.offsets.append(offset)
+        self._operations += operations.encode("utf-8")
+        self._operation_offsets.append(len(self._operations))
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} at {id(self):#x} ({len(self)} positions)>"
+
+
+def _spans(data: mmap.mmap, chunk_size: int) -> Iterator[Span]:
+    start = 0
+    while start < len(data):
+        newline = data.find(b"\n", start + max(chunk_size, 1) - 1)
+        end = len(data) if newline == -1 else newline + 1
+        yield start, end
+        start = end
+
+
+def _parse(data: mmap.mmap, span: Span) -> Positions:
+    positions = Positions()
+    scratch = medieval_chess.Board(None)
+
+    offset, end = span
+    for raw_line in data[offset:end].split(b"\n"):
+        line = raw_line.decode("utf-8").strip()
+        if line and not line.startswith("#"):
+            try:
+                positions._append(line, offset, scratch)
+            except ValueError as err:
+                raise ValueError(f"invalid position at byte {offset}: {err}") from err
+        offset += len(raw_line) + 1
+
+    return positions
+
+
+def _open(path: Union[str, bytes, os.PathLike[str], os.PathLike[bytes]]) -> Optional[mmap.mmap]:
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return None  # Can not map empty files.
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def split(path: Union[str, bytes, os.PathLike[str], os.PathLike[bytes]], *, chunk_size: int = DEFAULT_CHUNK_SIZE) -> List[Span]:
+    """
+    Splits the file at *path* into spans of about *chunk_size* bytes,
+    ending at line boundaries.
+    """
+    data = _open(path)
+    if data is None:
+        return []
+    with data:
+        return list(_spans(data, chunk_size))
+
+
+def read(path: Union[str, bytes, os.PathLike[str], os.PathLike[bytes]], span: Optional[Span] = None) -> Positions:
+    """
+    Reads the positions of the file at *path*, or of a *span* of it
+    obtained from :func:`~medieval_chess.positions.split()`.
+
+    Lines can be EPDs or FENs (including the medieval field, see
+    :func:`medieval_chess.Board.fen()`). Empty lines and comments starting
+    with ``#`` are skipped.
+
+    :raises: :exc:`ValueError` if a line is invalid.
+    """
+    data = _open(path)
+    if data is None:
+        return Positions()
+    with data:
+        return _parse(data, (0, len(data)) if span is None else span)
+
+
+def chunks(path: Union[str, bytes, os.PathLike[str], os.PathLike[bytes]], *, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Positions]:
+    """
+    Streams the positions of the file at *path* in chunks of about
+    *chunk_size* bytes.
+
+    :raises: :exc:`ValueError` if a line is invalid.
+    """
+    data = _open(path)
+    if data is None:
+        return
+    with data:
+        for span in _spans(data, chunk_size):
+            yield _parse(data, span)
@@ -0,0 +1,465 @@
+"""
+A native alpha-beta search for the medieval rules, running in process. It
+takes the same limits and reports the same results as engines driven by
+:mod:`medieval_chess.engine`.
+
+>>> import medieval_chess
+>>> import medieval_chess.engine
+>>> import medieval_chess.search
+>>>
+>>> board = medieval_chess.Board("6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1")
+>>> result = medieval_chess.search.play(board, medieval_chess.engine.Limit(depth=3))
+>>> result.move
+Move.from_uci('a1a8')
+
+The search is an iterative deepening principal variation search with a
+transposition table (keyed by :func:`~medieval_chess.Board.zobrist()`),
+quiescence search on captures and promotions, and move ordering by the
+transposition table move, MVV-LVA, killer moves and history scores.
+"""
+
+from __future__ import annotations
+
+import itertools
+import time
+
+import medieval_chess
+import medieval_chess.engine
+
+from typing import Dict, List, Optional, Tuple
+
+
+DEFAULT_HASH_SIZE = 1 << 18
+"""Default number of positions in the transposition table."""
+
+MAX_PLY = 64
+"""Maximum depth of the search tree, including quiescence search."""
+
+MATE_SCORE = 100_000
+"""The score of a checkmate at the root. Mates in *n* plies score ``MATE_SCORE - n``."""
+
+PIECE_VALUES = [0, 100, 300, 150, 500, 180, 0, 200]
+"""
+Material values in centipawns, indexed by piece type. The alfil (bishop)
+and the ferz (queen) are weak short-range pieces, and a queen that may
+still make its grace jump is worth slightly more than a ferz.
+"""
+
+_MATE_BOUND = MATE_SCORE - MAX_PLY
+_INFINITY = MATE_SCORE + 1
+
+# Flags of transposition table entries.
+_EXACT = 0
+_LOWER = 1
+_UPPER = 2
+
+# Checks the clock after this many nodes.
+_CHECK_INTERVAL = 1024
+
+# Bonuses for pawns and short-range pieces near the center.
+_CENTER_RING = 0x0000_3c3c_3c3c_0000
+_CENTER_BONUS = 12
+_CENTER_RING_BONUS = 6
+
+# Bonuses for pawns by rank, from the point of view of white.
+_PAWN_ADVANCE = [0, 0, 0, 4, 12, 28, 55, 0]
+
+# Moves in quiescence search also include pawns pushing to promote.
+_PROMOTION_MASK = medieval_chess.BB_BACKRANKS
+
+
+class _Stop(Exception):
+    pass
+
+
+def evaluate(board: medieval_chess.Board) -> int:
+    """
+    Statically evaluates the position in centipawns, from the point of
+    view of the side to move.
+
+    The evaluation counts material, centralization of pawns, knights and
+    ferzes, and the advancement of pawns towards promotion.
+    """
+    popcount = medieval_chess.popcount
+    pawns = board.pawns
+    central = pawns | board.knights | board.queens | board.queens_grace_jump
+
+    score = 0
+    for color in medieval_chess.COLORS:
+        ours = board.occupied_co[color]
+        value = (popcount(pawns & ours) * PIECE_VALUES[medieval_chess.PAWN] +
+                 popcount(board.knights & ours) * PIECE_VALUES[medieval_chess.KNIGHT] +
+                 popcount(board.bishops & ours) * PIECE_VALUES[medieval_chess.BISHOP] +
+                 popcount(board.rooks & ours) * PIECE_VALUES[medieval_chess.ROOK] +
+                 popcount(board.queens & ours) * PIECE_VALUES[medieval_chess.QUEEN] +
+                 popcount(board.queens_grace_jump & ours) * PIECE_VALUES[medieval_chess.QUEEN_GRACE_JUMP])
+
+        value += (popcount(central & ours & medieval_chess.BB_CENTER) * _CENTER_BONUS +
+                  popcount(central & ours & _CENTER_RING) * _CENTER_RING_BONUS)
+
+        our_pawns = pawns & ours
+        if our_pawns:
+            for rank in range(2, 7):
+                value += popcount(our_pawns & medieval_chess.BB_RANKS[rank if color else 7 - rank]) * _PAWN_ADVANCE[rank]
+
+        score += value if color == board.turn else -value
+
+    return score
+
+
+def _pov_score(score: int, turn: medieval_chess.Color) -> medieval_chess.engine.PovScore:
+    if score >= _MATE_BOUND:
+        return medieval_chess.engine.PovScore(medieval_chess.engine.Mate((MATE_SCORE - score + 1) // 2), turn)
+    elif score <= -_MATE_BOUND:
+        return medieval_chess.engine.PovScore(medieval_chess.engine.Mate(-((MATE_SCORE + score) // 2)), turn)
+    return medieval_chess.engine.PovScore(medieval_chess.engine.Cp(score), turn)
+
+
+def _deadlines(limit: medieval_chess.engine.Limit, turn: medieval_chess.Color) -> Tuple[Optional[float], Optional[float]]:
+    # Returns how long to keep starting new iterations and when to abort
+    # the search, in seconds.
+    if limit.time is not None:
+        return limit.time, limit.time
+
+    clock = limit.white_clock if turn == medieval_chess.WHITE else limit.black_clock
+    if clock is None:
+        return None, None
+
+    increment = (limit.white_inc if turn == medieval_chess.WHITE else limit.black_inc) or 0.0
+    available = max(clock - min(1.0, clock * 0.05), 0.01)
+    target = min(available / (limit.remaining_moves or 30) + increment, available)
+    return target / 2, min(target * 2, available)
+
+
+class Searcher:
+    """
+    Searches positions with the medieval rules.
+
+    Like an engine process, a searcher keeps its transposition table of
+    at most *hash_size* positions, killer moves and history scores between
+    searches, until :func:`~medieval_chess.search.Searcher.clear()`.
+    """
+
+    def __init__(self, *, hash_size: int = DEFAULT_HASH_SIZE) -> None:
+        self.hash_size = hash_size
+        self._table: Dict[int, Tuple[int, int, int, Optional[medieval_chess.Move]]] = {}
+        self._killers: List[List[Optional[medieval_chess.Move]]] = [[None, None] for _ in range(MAX_PLY + 1)]
+        self._history = [0] * (2 * 64 * 64)
+
+        self.nodes = 0
+        self.seldepth = 0
+        self._pv: List[List[medieval_chess.Move]] = [[] for _ in range(MAX_PLY + 2)]
+        self._keys: List[int] = []
+        self._start_time = 0.0
+        self._hard_deadline: Optional[float] = None
+        self._max_nodes: Optional[int] = None
+        self._next_check = 0
+
+    def clear(self) -> None:
+        """Forgets everything learned in previous searches."""
+        self._table.clear()
+        for killers in self._killers:
+            killers[0] = killers[1] = None
+        self._history = [0] * (2 * 64 * 64)
+
+    def analyse(self, board: medieval_chess.Board, limit: medieval_chess.engine.Limit, *, info: medieval_chess.engine.Info = medieval_chess.engine.INFO_ALL) -> medieval_chess.engine.InfoDict:
+        """
+        Analyses a position and returns an information dictionary like
+        :func:`medieval_chess.engine.Protocol.analyse()`, selected by
+        *info*: the ``depth``, ``seldepth``, ``nodes``, ``time``, ``nps``
+        and ``hashfull`` (basic), the ``score`` and the ``pv``.
+
+        The search stops at the *limit*. Clocks are shared out over the
+        *remaining_moves* (or about 30 moves). At least one iteration is
+        always completed.
+
+        The board is not modified.
+
+        :raises: :exc:`ValueError` if *limit* is unbounded.
+        """
+        return self._search_root(board, limit)[1].get_info(info)
+
+    def play(self, board: medieval_chess.Board, limit: medieval_chess.engine.Limit, *, info: medieval_chess.engine.Info = medieval_chess.engine.INFO_NONE) -> medieval_chess.engine.PlayResult:
+        """
+        Finds the best move like :func:`medieval_chess.engine.Protocol.play()`.
+        See :func:`~medieval_chess.search.Searcher.analyse()`.
+
+        The move is ``None`` if the game is over.
+
+        :raises: :exc:`ValueError` if *limit* is unbounded.
+        """
+        pv, result = self._search_root(board, limit)
+        return medieval_chess.engine.PlayResult(pv[0] if pv else None, pv[1] if len(pv) > 1 else None, result.get_info(info))
+
+    def _search_root(self, board: medieval_chess.Board, limit: medieval_chess.engine.Limit) -> Tuple[List[medieval_chess.Move], _Result]:
+        if limit.depth is None and limit.nodes is None and limit.mate is None and limit.time is None and limit.white_clock is None and limit.black_clock is None:
+            raise ValueError(f"search limit is unbounded: {limit!r}")
+
+        board = board.copy()
+        root_keys = board._reversible_zobrist_history()[::-1]
+
+        max_depth = MAX_PLY // 2 if limit.depth is None else max(1, min(limit.depth, MAX_PLY // 2))
+        if limit.mate is not None:
+            max_depth = min(max_depth, max(1, 2 * limit.mate - 1))
+        soft_deadline, hard_deadline = _deadlines(limit, board.turn)
+
+        self.nodes = 0
+        self.seldepth = 0
+        self._start_time = time.perf_counter()
+        self._hard_deadline = None
+        self._max_nodes = None
+        self._next_check = _CHECK_INTERVAL
+
+        result = _Result(board.turn)
+        pv: List[medieval_chess.Move] = []
+
+        for depth in range(1, max_depth + 1):
+            self._keys = root_keys[:]
+            try:
+                score = self._search(board, depth, -_INFINITY, _INFINITY, 0, True)
+            except _Stop:
+                break
+            finally:
+                # Only the first iteration always completes.
+                self._hard_deadline = hard_deadline
+                self._max_nodes = limit.nodes
+                self._next_check = self.nodes + 1
+
+            pv = self._pv[0][:]
+            result.update(self, depth, score, pv)
+
+            if not pv or abs(score) >= _MATE_BOUND and MATE_SCORE - abs(score) <= depth:
+                break  # Game over or forced mate found.
+            if limit.mate is not None and score >= _MATE_BOUND and (MATE_SCORE - score + 1) // 2 <= limit.mate:
+                break
+            if soft_deadline is not None and time.perf_counter() - self._start_time >= soft_deadline:
+                break
+            if limit.nodes is not None and self.nodes >= limit.nodes:
+                break
+
+        return pv, result
+
+    def _check_limits(self) -> None:
+        self._next_check = self.nodes + _CHECK_INTERVAL
+        if self._max_nodes is not None:
+            if self.nodes >= self._max_nodes:
+                raise _Stop()
+            self._next_check = min(self._next_check, self._max_nodes)
+        if self._hard_deadline is not None and time.perf_counter() - self._start_time >= self._hard_deadline:
+            raise _Stop()
+
+    def _search(self, board: medieval_chess.Board, depth: int, alpha: int, beta: int, ply: int, pv_node: bool) -> int:
+        self.nodes += 1
+        if self.nodes >= self._next_check:
+            self._check_limits()
+
+        self._pv[ply].clear()
+        key = board.zobrist()
+
+        if ply:
+            # Draws by the fifty-move rule, repetition or insufficient material.
+            halfmove_clock = board.halfmove_clock
+            if halfmove_clock >= 100 or halfmove_clock >= 4 and key in self._keys[-halfmove_clock:]:
+                return 0
+            if not (board.pawns | board.rooks) and board.is_insufficient_material():
+                return 0
+            if ply >= MAX_PLY:
+                return evaluate(board)
+
+        entry = self._table.get(key)
+        table_move = None
+        if entry is not None:
+            entry_depth, flag, score, table_move = entry
+            if ply and not pv_node and entry_depth >= depth:
+                if score >= _MATE_BOUND:
+                    score -= ply
+                elif score <= -_MATE_BOUND:
+                    score += ply
+                if flag == _EXACT or flag == _LOWER and score >= beta or flag == _UPPER and score <= alpha:
+                    return score
+
+        in_check = board.is_check()
+        if in_check:
+            depth += 1
+        if depth <= 0:
+            return self._quiescence(board, alpha, beta, ply)
+
+        moves = list(board.legal_moves)
+        if not moves:
+            return -MATE_SCORE + ply if in_check else 0
+        self._order(board, moves, table_move, ply)
+
+        original_alpha = alpha
+        best_score = -_INFINITY
+        best_move = None
+        them = board.occupied_co[not board.turn]
+        self._keys.append(key)
+
+        for index, move in enumerate(moves):
+            board.push(move)
+            if index == 0:
+                score = -self._search(board, depth - 1, -beta, -alpha, ply + 1, pv_node)
+            else:
+                score = -self._search(board, depth - 1, -alpha - 1, -alpha, ply + 1, False)
+                if alpha < score < beta:
+                    score = -self._search(board, depth - 1, -beta, -alpha, ply + 1, True)
+            board.pop()
+
+            if score > best_score:
+                best_score = score
+                best_move = move
+                if score > alpha:
+                    alpha = score
+                    pv = self._pv[ply]
+                    pv.clear()
+                    pv.append(move)
+                    pv.extend(self._pv[ply + 1])
+                    if score >= beta:
+                        if not medieval_chess.BB_SQUARES[move.to_square] & them and not move.promotion:
+                            killers = self._killers[ply]
+                            if killers[0] != move:
+                                killers[1] = killers[0]
+                                killers[0] = move
+                            self._history[board.turn * 4096 + move.from_square * 64 + move.to_square] += depth * depth
+                        break
+
+        self._keys.pop()
+
+        if best_score >= beta:
+            flag = _LOWER
+        elif best_score > original_alpha:
+            flag = _EXACT
+        else:
+            flag = _UPPER
+
+        if len(self._table) >= self.hash_size:
+            self._table.clear()
+        if best_score >= _MATE_BOUND:
+            self._table[key] = (depth, flag, best_score + ply, best_move)
+        elif best_score <= -_MATE_BOUND:
+            self._table[key] = (depth, flag, best_score - ply, best_move)
+        else:
+            self._table[key] = (depth, flag, best_score, best_move)
+
+        return best_score
+
+    def _quiescence(self, board: medieval_chess.Board, alpha: int, beta: int, ply: int) -> int:
+        self.nodes += 1
+        if self.nodes >= self._next_check:
+            self._check_limits()
+
+        self._pv[ply].clear()
+        if ply > self.seldepth:
+            self.seldepth = ply
+        if ply >= MAX_PLY:
+            return evaluate(board)
+
+        if board.is_check():
+            moves = list(board.legal_moves)
+            if not moves:
+                return -MATE_SCORE + ply
+            best_score = -_INFINITY
+        else:
+            best_score = evaluate(board)
+            if best_score >= beta:
+                return best_score
+            if best_score > alpha:
+                alpha = best_score
+            moves = list(itertools.chain(
+                board.generate_legal_captures(),
+                board.generate_legal_moves(board.pawns, _PROMOTION_MASK & ~board.occupied)))
+            if not moves:
+                return best_score
+
+        self._order(board, moves, None, ply)
+
+        for move in moves:
+            board.push(move)
+            score = -self._quiescence(board, -beta, -alpha, ply + 1)
+            board.pop()
+
+            if score > best_score:
+                best_score = score
+                if score > alpha:
+                    alpha = score
+                    if score >= beta:
+                        break
+
+        return best_score
+
+    def _order(self, board: medieval_chess.Board, moves: List[medieval_chess.Move], table_move: Optional[medieval_chess.Move], ply: int) -> None:
+        # Sorts the moves in place: the move from the transposition table,
+        # captures by most valuable victim and least valuable attacker,
+        # promotions, killer moves, then quiet moves by history.
+        piece_type_at = board.piece_type_at
+        them = board.occupied_co[not board.turn]
+        killer, second_killer = self._killers[ply]
+        history = self._history
+        offset = board.turn * 4096
+        bb_squares = medieval_chess.BB_SQUARES
+
+        def key(move: medieval_chess.Move) -> int:
+            if move == table_move:
+                return 1 << 40
+            to_square = move.to_square
+            if bb_squares[to_square] & them:
+                return (1 << 32) + PIECE_VALUES[piece_type_at(to_square) or 0] * 16 - PIECE_VALUES[piece_type_at(move.from_square) or 0] // 16
+            if move.promotion:
+                return 1 << 31
+            if move == killer:
+                return (1 << 30) + 1
+            if move == second_killer:
+                return 1 << 30
+            return history[offset + move.from_square * 64 + to_square]
+
+        moves.sort(key=key, reverse=True)
+
+
+class _Result:
+    # The information of the last completed iteration.
+
+    def __init__(self, turn: medieval_chess.Color) -> None:
+        self.turn = turn
+        self.info: medieval_chess.engine.InfoDict = {}
+
+    def update(self, searcher: Searcher, depth: int, score: int, pv: List[medieval_chess.Move]) -> None:
+        elapsed = time.perf_counter() - searcher._start_time
+        self.info = {
+            "depth": depth,
+            "seldepth": max(searcher.seldepth, depth),
+            "nodes": searcher.nodes,
+            "time": elapsed,
+            "nps": int(searcher.nodes / elapsed) if elapsed > 0 else 0,
+            "hashfull": len(searcher._table) * 1000 // max(searcher.hash_size, 1),
+            "score": _pov_score(score, self.turn),
+            "pv": pv,
+        }
+
+    def get_info(self, selector: medieval_chess.engine.Info) -> medieval_chess.engine.InfoDict:
+        info: medieval_chess.engine.InfoDict = {}
+        for name, value in self.info.items():
+            if name == "score":
+                if selector & medieval_chess.engine.INFO_SCORE:
+                    info["score"] = value  # type: ignore
+            elif name == "pv":
+                if selector & medieval_chess.engine.INFO_PV:
+                    info["pv"] = value  # type: ignore
+            elif selector & medieval_chess.engine.INFO_BASIC:
+                info[name] = value  # type: ignore
+        return info
+
+
+def analyse(board: medieval_chess.Board, limit: medieval_chess.engine.Limit, *, info: medieval_chess.engine.Info = medieval_chess.engine.INFO_ALL) -> medieval_chess.engine.InfoDict:
+    """
+    Analyses a position with a new :class:`~medieval_chess.search.Searcher`.
+    See :func:`~medieval_chess.search.Searcher.analyse()`.
+    """
+    return Searcher().analyse(board, limit, info=info)
+
+
+def play(board: medieval_chess.Board, limit: medieval_chess.engine.Limit, *, info: medieval_chess.engine.Info = medieval_chess.engine.INFO_NONE) -> medieval_chess.engine.PlayResult:
+    """
+    Finds the best move with a new :class:`~medieval_chess.search.Searcher`.
+    See :func:`~medieval_chess.search.Searcher.play()`.
+    """
+    return Searcher().play(board, limit, info=info)
@@ -0,0 +1,130 @@
+"""
+Encodes boards as stacks of 8x8 bit planes in NumPy arrays, for example
+as input features for neural networks.
+
+Requires NumPy.
+
+>>> import medieval_chess
+>>> import medieval_chess.tensor
+>>>
+>>> planes = medieval_chess.tensor.encode(medieval_chess.Board())
+>>> planes.shape
+(17, 8, 8)
+>>> planes[medieval_chess.tensor.piece_plane(medieval_chess.QUEEN_GRACE_JUMP, medieval_chess.WHITE)].nonzero()
+(array([0]), array([3]))
+
+Planes are indexed by ``[plane, rank, file]``, so that ``[plane, 0, 0]``
+is a1 and ``[plane, 7, 7]`` is h8.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+
+import medieval_chess
+
+from typing import Iterable, List, Optional, TextIO
+
+
+PIECE_PLANES = 14
+"""
+Number of piece planes: pawns, knights, bishops, rooks, queens, kings and
+grace-jump queens of white, followed by the same for black.
+"""
+
+TURN_PLANE = 14
+"""All ones if it is white's turn, else all zeros."""
+
+CAPTURE_HAPPENED_PLANE = 15
+"""All ones if a capture already happened in the game, disabling double pawn pushes."""
+
+CASTLING_PLANE = 16
+"""The rooks with castling rights."""
+
+PLANES = 17
+"""Total number of planes."""
+
+
+def piece_plane(piece_type: medieval_chess.PieceType, color: medieval_chess.Color) -> int:
+    """Gets the index of the plane for pieces of the given type and color."""
+    return piece_type - 1 + (0 if color == medieval_chess.WHITE else 7)
+
+
+def _masks(board: medieval_chess.Board) -> List[int]:
+    white, black = board.occupied_co[medieval_chess.WHITE], board.occupied_co[medieval_chess.BLACK]
+    pieces = [board.pawns, board.knights, board.bishops, board.rooks, board.queens, board.kings, board.queens_grace_jump]
+    return [bb & white for bb in pieces] + [bb & black for bb in pieces] + [
+        medieval_chess.BB_ALL if board.turn == medieval_chess.WHITE else medieval_chess.BB_EMPTY,
+        medieval_chess.BB_ALL if board.capture_happened else medieval_chess.BB_EMPTY,
+        board.castling_rights,
+    ]
+
+
+def _unpack(masks: np.ndarray) -> np.ndarray:
+    # Each 64-bit mask becomes 8 bytes (one per rank, starting with the
+    # first rank), and each byte becomes 8 bits (one per file, starting
+    # with the a-file).
+    bits = np.unpackbits(masks.astype("<u8").view(np.uint8), axis=-1, bitorder="little")
+    return bits.reshape(masks.shape + (8, 8))
+
+
+def encode(board: medieval_chess.Board) -> np.ndarray:
+    """
+    Encodes a single board as a ``(PLANES, 8, 8)`` array of ``uint8``.
+    """
+    return _unpack(np.array(_masks(board), dtype=np.uint64))
+
+
+def encode_batch(boards: Iterable[medieval_chess.Board], out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Encodes many boards as a ``(N, PLANES, 8, 8)`` array of ``uint8``.
+
+    If *out* is given, the boards are written into it (and it must be large
+    enough), otherwise a new array is allocated.
+    """
+    masks = np.array([_masks(board) for board in boards], dtype=np.uint64).reshape(-1, PLANES)
+    if out is None:
+        return _unpack(masks)
+    out[:len(masks)] = _unpack(masks)
+    return out[:len(masks)]
+
+
+def fill_from_pgn(handle: TextIO, out: np.ndarray) -> int:
+    """
+    Reads games from a PGN stream and writes every position of their
+    mainlines, starting with the initial position, into the preallocated
+    ``(N, PLANES, 8, 8)`` array *out*.
+
+    A single board is replayed in place, and moves are parsed with
+    :func:`medieval_chess.Board.parse_san()`. Comments, NAGs and
+    variations are skipped. Reading stops at the end of the stream or when
+    *out* is full, in which case the last game may be cut short.
+
+    Returns the number of positions written.
+
+    :raises: :exc:`ValueError` if a game contains an invalid or illegal move.
+    """
+    capacity = len(out)
+    count = 0
+    board = medieval_chess.Board()
+
+    for headers, movetext in medieval_chess._read_pgn_games(handle):
+        if count >= capacity:
+            break
+
+        if "FEN" in headers:
+            board.set_fen(headers["FEN"])
+        else:
+            board.reset()
+
+        masks = [_masks(board)]
+        for san in medieval_chess._pgn_mainline_sans(movetext):
+            if count + len(masks) >= capacity:
+                break
+            board.push(board.parse_san(san))
+            masks.append(_masks(board))
+
+        out[count:count + len(masks)] = _unpack(np.array(masks, dtype=np.uint64))
+        count += len(masks)
+
+    return count
@@ -71,6 +71,9 @@ setuptools.setup(
         "medieval_chess": ["py.typed"],
     },
     python_requires=">=3.8",
+    extras_require={
+        "tensor": ["numpy"],
+    },
     classifiers=[
         "Development Status :: 5 - Production/Stable",
         "Intended Audience :: Developers",
@@ -1,15 +1,23 @@
 #!/usr/bin/env python3
 
 import asyncio
+import bisect
+import contextlib
 import copy
+import dataclasses
 import logging
 import os
 import os.path
+import pickle
 import platform
+import random
+import struct
 import sys
 import tempfile
 import textwrap
+import time
 import unittest
+import unittest.mock
 import io
 
 import chess
@@ -21,6 +29,19 @@ import chess.svg
 import chess.syzygy
 import chess.variant
 
+import medieval_chess
+import medieval_chess.engine
+import medieval_chess.perft
+import medieval_chess.polyglot
+import medieval_chess.positions
+import medieval_chess.search
+
+try:
+    import numpy
+    import medieval_chess.tensor
+except ImportError:
+    numpy = None
+
 
 class RaiseLogHandler(logging.StreamHandler):
     def handle(self, record):
@@ -4927,6 +4948,1240 @@ class GiveawayTestCase(unittest.TestCase):
             self.assertEqual(game.end().board().fen(), "8/6k1/3K4/8/8/3k4/8/8 w - - 4 33")
 
 
+class MedievalZobristTestCase(unittest.TestCase):
+
+    def test_incremental(self):
+        board = medieval_chess.Board()
+        for uci in ["e2e4", "d7d5", "e4d5", "g8f6", "d1e2", "f6d5"]:
+            board.push_uci(uci)
+            self.assertEqual(board._zobrist_board, board._zobrist_board_hash())
+        while board.move_stack:
+            board.pop()
+            self.assertEqual(board._zobrist_board, board._zobrist_board_hash())
+        self.assertEqual(board.zobrist(), medieval_chess.Board().zobrist())
+
+    def test_medieval_state(self):
+        board = medieval_chess.Board()
+        other = medieval_chess.Board()
+        for uci in ["e2e4", "e7e5", "d1e2", "g8f6", "e2d1", "f6g8"]:
+            board.push_uci(uci)
+        for uci in ["e2e4", "e7e5", "g1f3", "g8f6", "f3g1", "f6g8"]:
+            other.push_uci(uci)
+        self.assertEqual(board.board_fen(), other.board_fen())
+        self.assertNotEqual(board.zobrist(), other.zobrist())
+
+        board = medieval_chess.Board()
+        other = board.copy()
+        other.capture_happened = True
+        self.assertNotEqual(board.zobrist(), other.zobrist())
+
+    def test_repetition(self):
+        board = medieval_chess.Board()
+        for _ in range(2):
+            for san in ["Nf3", "Nf6", "Ng1", "Ng8"]:
+                self.assertFalse(board.is_repetition())
+                board.push_san(san)
+        self.assertTrue(board.is_repetition())
+        self.assertFalse(board.is_repetition(4))
+        self.assertTrue(board.can_claim_threefold_repetition())
+
+        board.pop()
+        self.assertFalse(board.is_repetition())
+        self.assertTrue(board.can_claim_threefold_repetition())
+
+
+class MedievalCompactStackTestCase(unittest.TestCase):
+
+    def test_push_pop(self):
+        board = medieval_chess.Board()
+        compact = medieval_chess.Board(compact_stack=True)
+        for uci in ["e2e4", "d7d5", "e4d5", "g8f6", "d1e2", "f6d5", "e2d3", "d5f4"]:
+            board.push_uci(uci)
+            compact.push_uci(uci)
+            self.assertEqual(board.fen(), compact.fen())
+            self.assertEqual(board.zobrist(), compact.zobrist())
+
+        self.assertEqual(compact.move_stack, board.move_stack)
+        self.assertEqual(compact.move_stack[-2:], board.move_stack[-2:])
+        self.assertEqual(compact.peek(), medieval_chess.Move.from_uci("d5f4"))
+        self.assertEqual(compact.root(), board.root())
+        self.assertEqual(compact.copy(stack=3).root(), board.copy(stack=3).root())
+
+        while board.move_stack:
+            self.assertEqual(board.pop(), compact.pop())
+            self.assertEqual(board.fen(), compact.fen())
+            self.assertTrue(compact.capture_happened == board.capture_happened)
+
+        with self.assertRaises(IndexError):
+            compact.pop()
+
+    def test_repetition(self):
+        board = medieval_chess.Board(compact_stack=True)
+        for _ in range(2):
+            for san in ["Nf3", "Nf6", "Ng1", "Ng8"]:
+                board.push_san(san)
+        self.assertTrue(board.is_repetition())
+        board.clear_stack()
+        self.assertFalse(board.move_stack)
+        self.assertFalse(board.is_repetition())
+
+
+class MedievalSharedStackTestCase(unittest.TestCase):
+
+    def test_copy_diverges(self):
+        board = medieval_chess.Board()
+        for uci in ["e2e4", "d7d5", "e4d5", "g8f6"]:
+            board.push_uci(uci)
+
+        left = board.copy()
+        right = board.copy()
+        left.push_uci("d1e2")
+        right.push_uci("g1f3")
+        right.push_uci("f6d5")
+
+        self.assertEqual(len(board.move_stack), 4)
+        self.assertEqual(left.peek(), medieval_chess.Move.from_uci("d1e2"))
+        self.assertEqual(right.move_stack[3:], [medieval_chess.Move.from_uci("g8f6"), medieval_chess.Move.from_uci("g1f3"), medieval_chess.Move.from_uci("f6d5")])
+
+        board.pop()
+        self.assertEqual(left.move_stack[:4], right.move_stack[:4])
+        self.assertEqual(left.pop(), medieval_chess.Move.from_uci("d1e2"))
+        self.assertEqual(left.pop(), medieval_chess.Move.from_uci("g8f6"))
+        self.assertEqual(left, board)
+        self.assertEqual(right.root(), medieval_chess.Board())
+
+    def test_limited_copy(self):
+        board = medieval_chess.Board()
+        for san in ["Nf3", "Nf6", "Ng1", "Ng8", "Nf3", "Nf6"]:
+            board.push_san(san)
+
+        limited = board.copy(stack=2)
+        self.assertEqual(list(limited.move_stack), board.move_stack[-2:])
+        self.assertEqual(limited.root().fen(), "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w - - 4 3")
+        limited.pop()
+        limited.pop()
+        self.assertEqual(limited, limited.root())
+        with self.assertRaises(IndexError):
+            limited.pop()
+        self.assertFalse(limited.move_stack)
+        self.assertEqual(len(board.move_stack), 6)
+        self.assertFalse(board.copy(stack=False).move_stack)
+
+    def test_repetition(self):
+        board = medieval_chess.Board()
+        for _ in range(2):
+            for san in ["Nf3", "Nf6", "Ng1", "Ng8"]:
+                board.push_san(san)
+        self.assertTrue(board.copy().is_repetition())
+        self.assertFalse(board.copy(stack=4).is_repetition())
+
+    def test_long_game(self):
+        board = medieval_chess.Board()
+        for _ in range(1000):
+            for san in ["Nf3", "Nf6", "Ng1", "Ng8"]:
+                board.push_san(san)
+
+        for other in [copy.deepcopy(board), board.copy()]:
+            self.assertEqual(other.move_stack, board.move_stack)
+            self.assertEqual(other.root(), board.root())
+
+    def test_move_stack_view(self):
+        for compact_stack in [False, True]:
+            board = medieval_chess.Board(compact_stack=compact_stack)
+            for san in ["e4", "d5", "exd5"]:
+                board.push_san(san)
+
+            moves = board.move_stack
+            self.assertEqual([moves[i] for i in range(len(moves))], list(moves))
+            self.assertEqual(moves[0], medieval_chess.Move.from_uci("e2e4"))
+            self.assertEqual(moves[-1], medieval_chess.Move.from_uci("e4d5"))
+            with self.assertRaises(IndexError):
+                moves[3]
+
+            board.pop()
+            self.assertEqual(moves[-1], medieval_chess.Move.from_uci("d7d5"))
+            self.assertEqual(len(moves), 2)
+
+            with self.assertRaises(AttributeError):
+                board.move_stack = []
+            with self.assertRaises(AttributeError):
+                board.move_stack.append(medieval_chess.Move.from_uci("g1f3"))  # type: ignore
+
+
+class MedievalFenTestCase(unittest.TestCase):
+
+    def test_board_fen(self):
+        for fen in ["rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR", "8/8/8/8/8/8/8/8", "r3k2r/1p4p1/8/3Pp3/8/8/PPP2PPP/R3K2R", "4k3/8/8/8/8/8/8/q3K2Q"]:
+            board = medieval_chess.BaseBoard(fen)
+            self.assertEqual(board.board_fen(), fen)
+            self.assertEqual(board._zobrist_board, board._zobrist_board_hash())
+            self.assertEqual(board, medieval_chess.BaseBoard(board.board_fen()))
+
+        board = medieval_chess.Board()
+        self.assertEqual(board.board_fen(), medieval_chess.STARTING_BOARD_FEN)
+
+    def test_promoted(self):
+        board = medieval_chess.BaseBoard("4k3/8/8/8/8/8/8/Q~3K3")
+        self.assertEqual(board.promoted, medieval_chess.BB_A1)
+        self.assertEqual(board.board_fen(promoted=True), "4k3/8/8/8/8/8/8/Q~3K3")
+        self.assertEqual(board.board_fen(), "4k3/8/8/8/8/8/8/Q3K3")
+
+    def test_medieval_field(self):
+        board = medieval_chess.Board()
+        for uci in ["e2e4", "d7d5", "e4d5", "d8d6"]:
+            board.push_uci(uci)
+        fen = board.fen(medieval=True)
+        self.assertTrue(fen.endswith(" d1x"))
+
+        restored = medieval_chess.Board(fen)
+        self.assertEqual(restored.queens_grace_jump, medieval_chess.BB_D1)
+        self.assertEqual(restored.queens, medieval_chess.BB_D6)
+        self.assertTrue(restored.capture_happened)
+        self.assertEqual(restored.zobrist(), board.zobrist())
+        self.assertEqual(restored.fen(medieval=True), fen)
+
+        self.assertEqual(medieval_chess.Board().fen(medieval=True).split()[-1], "d1d8")
+        self.assertEqual(medieval_chess.Board("4k3/8/8/8/8/8/8/4K3 w - - 0 1 -").fen(medieval=True).split()[-1], "-")
+
+    def test_set_fen_resets_state(self):
+        board = medieval_chess.Board()
+        board.push_uci("e2e4")
+        board.push_uci("d7d5")
+        board.push_uci("e4d5")
+        board.set_fen("4k3/8/8/8/8/8/4P3/4K3 w - - 0 1")
+        self.assertFalse(board.capture_happened)
+        self.assertIn(medieval_chess.Move.from_uci("e2e4"), board.legal_moves)
+
+    def test_invalid(self):
+        for fen in ["4k3/8/8/8/8/8/8/4K3 w - - 0 1 d1", "4k3/8/8/8/8/8/8/3QK3 w - - 0 1 d9", "4k3/8/8/8/8/8/8/3QK3 w - - 0 1 xd1", "4k3/8/8/8/8/8/8/3QK3 w - - 0 1 d1 -",
+                    "4k3/8/8/8/8/8/8/3QK4", "4k3/8/8/8/8/8/8/3QK2", "4k3/8/8/8/8/8/3QK3", "4k3/8/8/8/8/8/8/3QK3/8", "4k3/8/8/8/8/8/8/3QKx2", "4k3/8/8/8/8/8/8/~3QK3"]:
+            with self.assertRaises(ValueError):
+                medieval_chess.Board(fen)
+
+    def test_fen_cache(self):
+        cache = medieval_chess.FenCache(maxsize=2)
+        fens = [medieval_chess.STARTING_FEN, "4k3/8/8/8/8/8/4P3/4K3 w - - 0 1", "4k3/8/8/8/8/8/8/3QK3 w - - 0 1 d1x"]
+
+        board = cache.board(fens[0])
+        self.assertEqual(board.queens_grace_jump, medieval_chess.BB_D1 | medieval_chess.BB_D8)
+        board.push_uci("e2e4")
+        self.assertEqual(cache.board(fens[0]), medieval_chess.Board())
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+        cache.board(fens[1])
+        cache.board(fens[2])
+        self.assertEqual(len(cache), 2)
+        self.assertTrue(cache.board(fens[2]).capture_happened)
+        cache.board(fens[0])
+        self.assertEqual((cache.hits, cache.misses), (2, 4))
+
+        with self.assertRaises(ValueError):
+            cache.board("invalid")
+        self.assertEqual(len(cache), 2)
+
+
+class MedievalMoveTestCase(unittest.TestCase):
+
+    def test_packed(self):
+        for uci in ["0000", "e2e4", "a7a8q", "h2h1n", "P@e4", "Q@h8"]:
+            move = medieval_chess.Move.from_uci(uci)
+            self.assertEqual(medieval_chess.Move.from_packed(move.packed()), move)
+            self.assertLess(move.packed(), 1 << 16)
+        self.assertEqual(medieval_chess.Move.null().packed(), 0)
+
+        with self.assertRaises(ValueError):
+            medieval_chess.Move.from_packed(1 << 16)
+
+    def test_interned(self):
+        board = medieval_chess.Board()
+        for move in board.legal_moves:
+            self.assertIs(move, medieval_chess.Move.from_uci(move.uci()))
+            self.assertIs(move, medieval_chess.Move.from_packed(move.packed()))
+
+        move = medieval_chess.Move.from_uci("b7b8q")
+        self.assertIs(move, medieval_chess.Move.from_uci("b7b8q"))
+        with self.assertRaises(dataclasses.FrozenInstanceError):
+            move.promotion = None  # type: ignore
+
+    def test_pickle(self):
+        for uci in ["0000", "e2e4", "a7a8q", "P@e4"]:
+            move = medieval_chess.Move.from_uci(uci)
+            self.assertIs(pickle.loads(pickle.dumps(move)), move)
+
+
+class TaggedMedievalBoard(medieval_chess.Board):
+    def __init__(self, fen=medieval_chess.STARTING_FEN, *, tag=""):
+        super().__init__(fen)
+        self.tag = tag
+
+
+class MedievalSerializationTestCase(unittest.TestCase):
+
+    def test_round_trip(self):
+        for compact_stack in [False, True]:
+            board = medieval_chess.Board(compact_stack=compact_stack)
+            for uci in ["e2e4", "d7d5", "e4d5", "g8f6", "d1e2", "f6d5"]:
+                board.push_uci(uci)
+            board.halfmove_clock = 17
+
+            restored = medieval_chess.Board.from_bytes(board.to_bytes())
+            self.assertEqual(restored, board)
+            self.assertEqual(restored.queens_grace_jump, board.queens_grace_jump)
+            self.assertTrue(restored.capture_happened)
+            self.assertEqual(restored.move_stack, board.move_stack)
+            self.assertEqual(restored.root().queens_grace_jump, medieval_chess.BB_D1 | medieval_chess.BB_D8)
+            self.assertEqual(isinstance(restored._stack, medieval_chess._CompactStack), compact_stack)
+
+            while board.move_stack:
+                self.assertEqual(restored.pop(), board.pop())
+                self.assertEqual(restored.zobrist(), board.zobrist())
+
+    def test_pickle(self):
+        board = medieval_chess.Board("4k3/8/8/3pP3/8/8/8/4K3 w - d6 0 1", chess960=True)
+        board.push_uci("e1e2")
+        for restored in [pickle.loads(pickle.dumps(board)), copy.deepcopy(board)]:
+            self.assertEqual(restored.fen(), board.fen())
+            self.assertTrue(restored.chess960)
+            self.assertEqual(restored.root().ep_square, medieval_chess.D6)
+            self.assertEqual(restored.peek(), board.peek())
+
+        self.assertLess(len(pickle.dumps(board)), 300)
+
+    def test_invalid(self):
+        data = medieval_chess.Board().to_bytes()
+        with self.assertRaises(ValueError):
+            medieval_chess.Board.from_bytes(data[:-1])
+        with self.assertRaises(ValueError):
+            medieval_chess.Board.from_bytes(b"\x00" + data[1:])
+
+        board = medieval_chess.Board()
+        board.push_uci("e2e4")
+        data = board.to_bytes()
+        for packed in [medieval_chess.Move.from_uci("e2e5").packed(), medieval_chess.Move.from_uci("e2e4").packed() | 1 << 15, 0xffff]:
+            with self.assertRaises(ValueError):
+                medieval_chess.Board.from_bytes(data[:-2] + struct.pack("<H", packed))
+
+        position = medieval_chess._BOARD_BYTES_HEADER.size
+        with self.assertRaises(ValueError):
+            medieval_chess.Board.from_bytes(data[:position] + b"\xff" * 8 + data[position + 8:])
+
+    def test_pickle_extra_state(self):
+        board = medieval_chess.Board()
+        board.push_uci("e2e4")
+        board.comment = "opening"  # type: ignore
+        restored = pickle.loads(pickle.dumps(board))
+        self.assertEqual(restored.comment, "opening")
+        self.assertEqual(restored.move_stack, board.move_stack)
+
+        self.assertTrue(set(vars(medieval_chess.Board())) <= medieval_chess._BOARD_BYTES_ATTRIBUTES)
+
+    def test_pickle_subclass(self):
+        board = TaggedMedievalBoard(tag="x")
+        board.push_uci("g1f3")
+        restored = pickle.loads(pickle.dumps(board))
+        self.assertIs(type(restored), TaggedMedievalBoard)
+        self.assertEqual(restored.tag, "x")
+        self.assertEqual(restored.move_stack, board.move_stack)
+
+
+class MedievalMoveGenerationTestCase(unittest.TestCase):
+
+    def test_piece_moves(self):
+        board = medieval_chess.Board("4k3/8/8/8/3Q4/1b3n2/8/R3K2B w - - 0 1")
+        board.set_piece_at(medieval_chess.D4, medieval_chess.Piece(medieval_chess.QUEEN_GRACE_JUMP, medieval_chess.WHITE))
+        moves = {move.uci() for move in board.generate_pseudo_legal_moves(~board.kings & ~board.rooks)}
+        self.assertEqual(moves, {
+            # Grace-jump queen: ferz steps and jumps to empty squares.
+            "d4c5", "d4e5", "d4c3", "d4e3",
+            "d4b6", "d4f6", "d4f2", "d4b2",
+            "d4d6", "d4d2", "d4b4", "d4f4",
+            # Alfil.
+            "h1f3",
+        })
+        rook_moves = {move.uci() for move in board.generate_pseudo_legal_moves(board.rooks)}
+        self.assertEqual(rook_moves, {"a1b1", "a1c1", "a1d1"} | {f"a1a{rank}" for rank in range(2, 9)})
+
+
+class MedievalRookAttacksTestCase(unittest.TestCase):
+
+    def test_rook_attacks(self):
+        rng = random.Random(8)
+        for square in medieval_chess.SQUARES:
+            for _ in range(20):
+                occupied = rng.getrandbits(64) & rng.getrandbits(64)
+                self.assertEqual(
+                    medieval_chess.rook_attacks(square, occupied),
+                    medieval_chess._sliding_attacks(square, occupied, [-8, -1, 1, 8]))
+
+    def test_attackers(self):
+        board = medieval_chess.Board("4k3/8/8/1r1R4/8/8/3r4/4K3 w - - 0 1")
+        self.assertEqual(board.attackers_mask(medieval_chess.BLACK, medieval_chess.D5), medieval_chess.BB_B5 | medieval_chess.BB_D2)
+        self.assertEqual(board.attackers_mask(medieval_chess.WHITE, medieval_chess.D2), medieval_chess.BB_D5 | medieval_chess.BB_E1)
+
+
+class MedievalAttackCacheTestCase(unittest.TestCase):
+
+    def test_roundtrip(self):
+        tables = medieval_chess._build_attack_tables()
+        data = medieval_chess._dump_attack_tables(tables)
+        self.assertEqual(medieval_chess._load_attack_tables(data), tables)
+        self.assertEqual(tables[0], medieval_chess.BB_ROOK_MASKS)
+        self.assertEqual(tables[1], medieval_chess.BB_ROOK_ATTACKS)
+        self.assertEqual(tables[2][3], medieval_chess.BB_KNIGHT_ATTACKS)
+        self.assertEqual(tables[2][5:7], medieval_chess.BB_PAWN_ATTACKS)
+        self.assertEqual(tables[3], medieval_chess.BB_RAYS)
+
+    def test_stale(self):
+        data = medieval_chess._dump_attack_tables(medieval_chess._build_attack_tables())
+        self.assertIsNone(medieval_chess._load_attack_tables(data[:-8]))
+        self.assertIsNone(medieval_chess._load_attack_tables(data[:-1] + bytes([data[-1] ^ 1])))
+        self.assertIsNone(medieval_chess._load_attack_tables(data[:8] + b"\xff" + data[9:]))
+        self.assertIsNone(medieval_chess._load_attack_tables(b""))
+
+    def test_regenerate(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            with unittest.mock.patch.dict(os.environ, {"MEDIEVAL_CHESS_CACHE_DIR": cache_dir}):
+                path = medieval_chess._attack_cache_path()
+                with open(path, "wb") as f:
+                    f.write(b"garbage")
+                self.assertEqual(medieval_chess._attack_tables()[1], medieval_chess.BB_ROOK_ATTACKS)
+                with open(path, "rb") as f:
+                    self.assertIsNotNone(medieval_chess._load_attack_tables(f.read()))
+                self.assertEqual(os.listdir(cache_dir), [os.path.basename(path)])
+
+    def test_stale_code(self):
+        # Tables built by different code, with matching inputs and checksum.
+        for table, square in [(2, medieval_chess.A1), (1, medieval_chess.H8), (3, medieval_chess.E4)]:
+            tables = copy.deepcopy(medieval_chess._build_attack_tables())
+            tables[table][square][0] ^= medieval_chess.BB_D5
+            self.assertIsNone(medieval_chess._load_attack_tables(medieval_chess._dump_attack_tables(tables)))
+
+    def test_path(self):
+        with tempfile.TemporaryDirectory() as cache_home:
+            with unittest.mock.patch.dict(os.environ, {"XDG_CACHE_HOME": cache_home}):
+                os.environ.pop("MEDIEVAL_CHESS_CACHE_DIR", None)
+                self.assertEqual(os.path.dirname(medieval_chess._attack_cache_path()), os.path.join(cache_home, "medieval_chess"))
+                os.environ["MEDIEVAL_CHESS_CACHE_DIR"] = ""
+                self.assertIsNone(medieval_chess._attack_cache_path())
+
+    def test_not_writable(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            blocker = os.path.join(tmpdir, "file")
+            with open(blocker, "wb"):
+                pass
+            with unittest.mock.patch.dict(os.environ, {"MEDIEVAL_CHESS_CACHE_DIR": os.path.join(blocker, "cache")}):
+                self.assertEqual(medieval_chess._attack_tables()[1], medieval_chess.BB_ROOK_ATTACKS)
+            self.assertEqual(os.listdir(tmpdir), ["file"])
+
+
+class MedievalCheckInfoTestCase(unittest.TestCase):
+
+    def test_invalidation(self):
+        board = medieval_chess.Board("4k3/8/8/8/8/8/8/R3K3 w - - 0 1")
+        self.assertFalse(board.is_check())
+
+        board.push_uci("a1a8")
+        self.assertTrue(board.is_check())
+        self.assertEqual(board.checkers_mask(), medieval_chess.BB_A8)
+        self.assertNotIn(medieval_chess.Move.from_uci("e8f8"), board.legal_moves)
+        self.assertNotIn(medieval_chess.Move.from_uci("e8f8"), board.copy().legal_moves)
+
+        board.pop()
+        self.assertFalse(board.is_check())
+        self.assertFalse(board.was_into_check())
+
+        board.set_piece_at(medieval_chess.E4, medieval_chess.Piece(medieval_chess.ROOK, medieval_chess.BLACK))
+        self.assertTrue(board.is_check())
+        board.remove_piece_at(medieval_chess.E4)
+        self.assertFalse(board.is_check())
+
+        board.set_fen("4k3/8/8/8/8/8/8/4K2r w - - 0 1")
+        self.assertTrue(board.is_check())
+        board.turn = medieval_chess.BLACK
+        self.assertFalse(board.is_check())
+        self.assertTrue(board.was_into_check())
+        self.assertEqual(board.status() & medieval_chess.STATUS_OPPOSITE_CHECK, medieval_chess.STATUS_OPPOSITE_CHECK)
+
+    def test_pinned(self):
+        board = medieval_chess.Board("4k3/4r3/8/8/8/8/4N3/4K3 w - - 0 1")
+        self.assertFalse(any(move.from_square == medieval_chess.E2 for move in board.legal_moves))
+        self.assertTrue(board.is_into_check(medieval_chess.Move.from_uci("e2c3")))
+        self.assertFalse(board.is_into_check(medieval_chess.Move.from_uci("e1d1")))
+        self.assertFalse(board.is_into_check(medieval_chess.Move.from_uci("e1f2")))
+
+
+class MedievalGivesCheckTestCase(unittest.TestCase):
+
+    def test_gives_check(self):
+        board = medieval_chess.Board("4k3/1P6/8/8/2B5/8/3Q4/R3K2R w - - 0 1")
+        for move in board.legal_moves:
+            board.push(move)
+            is_check = board.is_check()
+            board.pop()
+            self.assertEqual(board.gives_check(move), is_check, move)
+        self.assertTrue(board.gives_check(medieval_chess.Move.from_uci("a1a8")))
+        self.assertFalse(board.gives_check(medieval_chess.Move.from_uci("c4e6")))
+
+    def test_jumper_checks(self):
+        board = medieval_chess.Board("8/8/8/2k5/8/2Q5/8/2B1K3 w - - 0 1")
+        self.assertTrue(board.gives_check(medieval_chess.Move.from_uci("c1a3")))
+        self.assertTrue(board.gives_check(medieval_chess.Move.from_uci("c1e3")))
+        self.assertTrue(board.gives_check(medieval_chess.Move.from_uci("c3b4")))
+        self.assertFalse(board.gives_check(medieval_chess.Move.from_uci("c3d2")))
+
+    def test_promotion_check(self):
+        board = medieval_chess.Board("8/1kP5/8/8/8/8/8/4K3 w - - 0 1")
+        promotion = next(move for move in board.legal_moves if move.promotion)
+        self.assertEqual(promotion.promotion, medieval_chess.QUEEN_GRACE_JUMP)
+        self.assertTrue(board.gives_check(promotion))
+
+    def test_discovered_check(self):
+        board = medieval_chess.Board("4k3/8/8/8/4N3/8/8/4R1K1 w - - 0 1")
+        for move in board.legal_moves:
+            if move.from_square == medieval_chess.E4:
+                self.assertTrue(board.gives_check(move), move)
+
+    def test_pinned_jumper(self):
+        # The grace-jump queen can not jump over its king to leave a pin.
+        board = medieval_chess.Board("4k3/8/8/8/8/8/8/r2QK3 w - - 0 1")
+        board.set_piece_at(medieval_chess.D1, medieval_chess.Piece(medieval_chess.QUEEN_GRACE_JUMP, medieval_chess.WHITE))
+        self.assertTrue(board.is_pseudo_legal(medieval_chess.Move.from_uci("d1f1")))
+        self.assertTrue(board.is_into_check(medieval_chess.Move.from_uci("d1f1")))
+        self.assertFalse(board.is_legal(medieval_chess.Move.from_uci("d1f1")))
+        self.assertTrue(board.is_legal(medieval_chess.Move.from_uci("d1b1")))
+        self.assertEqual(
+            {move.uci() for move in board.legal_moves if move.from_square == medieval_chess.D1},
+            {"d1b1"})
+
+
+class MedievalSanTestCase(unittest.TestCase):
+
+    def test_variation_sans(self):
+        rng = random.Random(17)
+        for _ in range(20):
+            board = medieval_chess.Board()
+            variation = []
+            for _ in range(rng.randint(1, 60)):
+                moves = list(board.legal_moves)
+                if not moves:
+                    break
+                move = rng.choice(moves)
+                variation.append(move)
+                board.push(move)
+
+            board = medieval_chess.Board()
+            sans = board.variation_sans(variation)
+            self.assertEqual(board, medieval_chess.Board())
+            self.assertEqual(len(sans), len(variation))
+            for move, san in zip(variation, sans):
+                self.assertEqual(board.san(move), san)
+                board.push(move)
+
+    def test_disambiguate_queens(self):
+        # Both kinds of queens are written as Q.
+        board = medieval_chess.Board("4k3/8/8/8/8/8/1Q6/4K3 w - - 0 1")
+        board.set_piece_at(medieval_chess.A1, medieval_chess.Piece(medieval_chess.QUEEN_GRACE_JUMP, medieval_chess.WHITE))
+        self.assertEqual(board.san(medieval_chess.Move.from_uci("b2c3")), "Qbc3")
+        self.assertEqual(board.san(medieval_chess.Move.from_uci("a1c3")), "Qac3")
+        board.remove_piece_at(medieval_chess.A1)
+        self.assertEqual(board.san(medieval_chess.Move.from_uci("b2c3")), "Qc3")
+
+    def test_disambiguate_pinned(self):
+        board = medieval_chess.Board("k3r3/8/8/8/8/8/2N1N3/4K3 w - - 0 1")
+        self.assertEqual(board.san(medieval_chess.Move.from_uci("c2d4")), "Nd4")
+        board = medieval_chess.Board("k7/8/8/8/8/8/2N1N3/4K3 w - - 0 1")
+        self.assertEqual(board.san(medieval_chess.Move.from_uci("c2d4")), "Ncd4")
+
+    def test_checkmate_suffix(self):
+        board = medieval_chess.Board("k7/8/1K6/8/8/8/8/7R w - - 0 1")
+        self.assertEqual(board.variation_sans([medieval_chess.Move.from_uci("h1h8")]), ["Rh8#"])
+        self.assertEqual(board.variation_sans([medieval_chess.Move.from_uci("h1h7")]), ["Rh7"])
+
+    def test_illegal_variation(self):
+        board = medieval_chess.Board()
+        with self.assertRaises(medieval_chess.IllegalMoveError):
+            board.variation_sans([medieval_chess.Move.from_uci("e2e4"), medieval_chess.Move.from_uci("e2e4")])
+        self.assertEqual(board, medieval_chess.Board())
+
+    def test_parse_san_round_trip(self):
+        rng = random.Random(18)
+        for _ in range(20):
+            board = medieval_chess.Board()
+            for _ in range(rng.randint(1, 80)):
+                moves = list(board.legal_moves)
+                if not moves:
+                    break
+                for move in moves:
+                    self.assertEqual(board.parse_san(board.san(move)), move)
+                board.push(rng.choice(moves))
+
+    def test_parse_san_queens(self):
+        board = medieval_chess.Board()
+        self.assertEqual(board.parse_san("Qd3"), medieval_chess.Move.from_uci("d1d3"))
+        self.assertEqual(board.parse_san("Qdd3"), medieval_chess.Move.from_uci("d1d3"))
+        with self.assertRaises(medieval_chess.IllegalMoveError):
+            board.parse_san("Qd2")
+
+        board = medieval_chess.Board("4k3/8/8/8/8/8/1Q6/4K3 w - - 0 1")
+        board.set_piece_at(medieval_chess.A1, medieval_chess.Piece(medieval_chess.QUEEN_GRACE_JUMP, medieval_chess.WHITE))
+        with self.assertRaises(medieval_chess.AmbiguousMoveError):
+            board.parse_san("Qc3")
+        self.assertEqual(board.parse_san("Qac3"), medieval_chess.Move.from_uci("a1c3"))
+        self.assertEqual(board.parse_san("Qbc3"), medieval_chess.Move.from_uci("b2c3"))
+
+    def test_parse_san_promotion(self):
+        board = medieval_chess.Board("8/1kP5/8/8/8/8/8/4K3 w - - 0 1")
+        move = board.parse_san("c8=Q")
+        self.assertEqual(move.promotion, medieval_chess.QUEEN_GRACE_JUMP)
+        self.assertEqual(board.parse_san("c8Q+"), move)
+        with self.assertRaises(medieval_chess.IllegalMoveError):
+            board.parse_san("c8")
+        with self.assertRaises(medieval_chess.IllegalMoveError):
+            board.parse_san("c8=N")
+
+    def test_parse_san_pinned(self):
+        board = medieval_chess.Board("k3r3/8/8/8/8/8/2N1N3/4K3 w - - 0 1")
+        self.assertEqual(board.parse_san("Nd4"), medieval_chess.Move.from_uci("c2d4"))
+        with self.assertRaises(medieval_chess.IllegalMoveError):
+            board.parse_san("Ned4")
+
+    def test_parse_san_evasion(self):
+        board = medieval_chess.Board("4k3/8/8/8/8/8/3N4/r3K3 w - - 0 1")
+        self.assertEqual(board.parse_san("Nb1"), medieval_chess.Move.from_uci("d2b1"))
+        with self.assertRaises(medieval_chess.IllegalMoveError):
+            board.parse_san("Nf3")
+
+    def test_parse_san_memo(self):
+        board = medieval_chess.Board()
+        move = board.parse_san("Nf3")
+        self.assertEqual(len(board._san_memo), 1)
+        self.assertIs(board.parse_san("Nf3"), move)
+
+        # The memo is shared with copies and kept across games.
+        copy = board.copy()
+        self.assertIs(copy._san_memo, board._san_memo)
+        board.push(move)
+        board.reset()
+        self.assertIs(board.parse_san("Nf3"), move)
+
+        # Errors are not remembered.
+        with self.assertRaises(medieval_chess.IllegalMoveError):
+            board.parse_san("Nf4")
+        with self.assertRaises(medieval_chess.IllegalMoveError):
+            board.parse_san("Nf4")
+        self.assertEqual(len(board._san_memo), 1)
+
+
+class MedievalOutcomeTestCase(unittest.TestCase):
+
+    def test_legal_move_probe(self):
+        rng = random.Random(19)
+        for _ in range(200):
+            board = medieval_chess.Board(None)
+            for color in medieval_chess.COLORS:
+                board.set_piece_at(rng.choice(medieval_chess.SQUARES), medieval_chess.Piece(medieval_chess.KING, color))
+            for _ in range(rng.randint(0, 6)):
+                board.set_piece_at(rng.choice(medieval_chess.SQUARES), medieval_chess.Piece(rng.choice([medieval_chess.KNIGHT, medieval_chess.BISHOP, medieval_chess.ROOK, medieval_chess.QUEEN, medieval_chess.QUEEN_GRACE_JUMP]), rng.choice(medieval_chess.COLORS)))
+            board.turn = rng.choice(medieval_chess.COLORS)
+            self.assertEqual(board._has_legal_move(), any(board.generate_legal_moves()), board.fen())
+
+    def test_pinned_moves(self):
+        # Only the pinned rook can move, along the pin.
+        board = medieval_chess.Board("rr5k/8/8/8/R7/2n5/8/K7 w - - 0 1")
+        self.assertEqual({move.from_square for move in board.legal_moves}, {medieval_chess.A4})
+        self.assertTrue(board._has_legal_move())
+        self.assertIsNone(board.outcome())
+
+        board = medieval_chess.Board("rr5k/8/8/8/N7/2n5/8/K7 w - - 0 1")
+        self.assertFalse(board._has_legal_move())
+        self.assertEqual(board.outcome().termination, medieval_chess.Termination.STALEMATE)
+
+    def test_outcomes(self):
+        rng = random.Random(20)
+        for _ in range(20):
+            board = medieval_chess.Board()
+            while True:
+                outcome = board.outcome()
+                if board.is_checkmate():
+                    self.assertEqual(outcome.termination, medieval_chess.Termination.CHECKMATE)
+                    self.assertEqual(outcome.winner, not board.turn)
+                elif board.is_insufficient_material():
+                    self.assertEqual(outcome.termination, medieval_chess.Termination.INSUFFICIENT_MATERIAL)
+                elif board.is_stalemate():
+                    self.assertEqual(outcome.termination, medieval_chess.Termination.STALEMATE)
+                elif board.is_seventyfive_moves():
+                    self.assertEqual(outcome.termination, medieval_chess.Termination.SEVENTYFIVE_MOVES)
+                elif board.is_fivefold_repetition():
+                    self.assertEqual(outcome.termination, medieval_chess.Termination.FIVEFOLD_REPETITION)
+                else:
+                    self.assertIsNone(outcome)
+                if outcome is not None:
+                    break
+                board.push(rng.choice(list(board.legal_moves)))
+
+    def test_fivefold_repetition(self):
+        for compact_stack in [False, True]:
+            board = medieval_chess.Board(compact_stack=compact_stack)
+            for _ in range(4):
+                self.assertIsNone(board.outcome())
+                for san in ["Nf3", "Nf6", "Ng1", "Ng8"]:
+                    board.push_san(san)
+            self.assertTrue(board.is_repetition(5))
+            self.assertFalse(board.is_repetition(6))
+            self.assertEqual(board.outcome().termination, medieval_chess.Termination.FIVEFOLD_REPETITION)
+
+    def test_null_move_repetition(self):
+        board = medieval_chess.Board()
+        board.push(medieval_chess.Move.null())
+        board.push(medieval_chess.Move.null())
+        self.assertTrue(board.is_repetition(2))
+        self.assertFalse(board.is_repetition(3))
+
+    def test_probe_follows_position(self):
+        board = medieval_chess.Board("k7/8/1K6/8/8/8/8/7R w - - 0 1")
+        self.assertIsNone(board.outcome())
+        board.push_san("Rh8")
+        self.assertEqual(board.outcome().termination, medieval_chess.Termination.CHECKMATE)
+        copy = board.copy()
+        board.pop()
+        self.assertIsNone(board.outcome())
+        self.assertTrue(copy.is_checkmate())
+
+
+class MedievalInsufficientMaterialTestCase(unittest.TestCase):
+
+    def _check(self, fen, white, black):
+        board = medieval_chess.Board(fen)
+        self.assertEqual(board.has_insufficient_material(medieval_chess.WHITE), white, fen)
+        self.assertEqual(board.has_insufficient_material(medieval_chess.BLACK), black, fen)
+        self.assertEqual(board.is_insufficient_material(), white and black, fen)
+
+    def test_bare_kings(self):
+        self._check("8/8/8/3k4/8/8/4K3/8 w - - 0 1", True, True)
+        self._check("8/8/8/3k4/8/8/3NK3/8 w - - 0 1", True, True)
+        self._check("8/8/8/3k4/8/8/3PK3/8 w - - 0 1", False, True)
+        self._check("8/8/8/3k4/8/8/3RK3/8 w - - 0 1", False, True)
+
+    def test_colorbound(self):
+        # Ferzes of a single color.
+        self._check("8/8/8/3k4/8/8/3QK3/8 w - - 0 1", True, True)
+        self._check("8/8/8/3k4/8/8/1Q1QK3/8 w - - 0 1", True, True)
+        self._check("8/8/8/3k4/8/8/2QQK3/8 w - - 0 1", False, True)
+
+        # The grace-jump queen is also colorbound.
+        board = medieval_chess.Board("8/8/8/3k4/8/8/4K3/8 w - - 0 1")
+        board.set_piece_at(medieval_chess.D1, medieval_chess.Piece(medieval_chess.QUEEN_GRACE_JUMP, medieval_chess.WHITE))
+        self.assertTrue(board.is_insufficient_material())
+        board.set_piece_at(medieval_chess.C1, medieval_chess.Piece(medieval_chess.QUEEN, medieval_chess.WHITE))
+        self.assertFalse(board.is_insufficient_material())
+
+        # Alfils.
+        self._check("8/8/8/3k4/8/8/3BK3/8 w - - 0 1", True, True)
+        self._check("8/8/8/3k4/8/8/BB2K3/8 w - - 0 1", False, True)
+
+    def test_blockers(self):
+        # Pieces of the defending side may block the escape squares.
+        self._check("8/8/8/3kq3/8/8/3QK3/8 w - - 0 1", True, True)
+        self._check("8/8/8/3k1q2/8/8/3QK3/8 w - - 0 1", False, False)
+        self._check("8/8/8/3kn3/8/8/3QK3/8 w - - 0 1", False, False)
+        self._check("8/8/8/3kq3/8/8/3NK3/8 w - - 0 1", False, False)
+        self._check("8/8/8/3kp3/8/8/3BK3/8 w - - 0 1", False, False)
+
+    def test_no_false_positives(self):
+        # Checkmates must never be reached with insufficient material.
+        rng = random.Random(20)
+        pieces = [medieval_chess.QUEEN, medieval_chess.QUEEN_GRACE_JUMP, medieval_chess.BISHOP, medieval_chess.KNIGHT]
+        for _ in range(3000):
+            board = medieval_chess.Board(None)
+            squares = rng.sample(medieval_chess.SQUARES, 5)
+            board.set_piece_at(squares[0], medieval_chess.Piece(medieval_chess.KING, medieval_chess.WHITE))
+            board.set_piece_at(squares[1], medieval_chess.Piece(medieval_chess.KING, medieval_chess.BLACK))
+            for square in squares[2:]:
+                board.set_piece_at(square, medieval_chess.Piece(rng.choice(pieces), rng.choice(medieval_chess.COLORS)))
+            board.turn = medieval_chess.BLACK
+            if board.is_checkmate() and not board.was_into_check():
+                self.assertFalse(board.has_insufficient_material(medieval_chess.WHITE), board.fen())
+
+    def test_outcome(self):
+        board = medieval_chess.Board("8/8/8/3k4/8/8/2Q1K3/4q3 b - - 0 1")
+        self.assertIsNone(board.outcome())
+        board.push_san("Kd4")
+        self.assertIsNone(board.outcome())
+        board.push_san("Qd1")
+        self.assertIsNone(board.outcome())
+        board.push_san("Qd2")
+        board.push_san("Kxd2")
+        self.assertEqual(board.outcome().termination, medieval_chess.Termination.INSUFFICIENT_MATERIAL)
+
+
+class MedievalLegalMovesArrayTestCase(unittest.TestCase):
+
+    def test_legal_moves_array(self):
+        for fen in [
+            medieval_chess.STARTING_FEN,
+            "4k3/1P6/8/8/3pP3/8/8/R3K3 b - e3 0 1",
+            "4k3/4r3/8/8/8/8/4P3/4K3 w - - 0 1",
+            "4k3/8/8/8/8/2b5/8/1N2K3 w - - 0 1",
+        ]:
+            board = medieval_chess.Board(fen)
+            codes = board.legal_moves_array()
+            self.assertEqual(codes.typecode, "H")
+            self.assertEqual(sorted(codes), sorted(move.packed() for move in board.legal_moves))
+
+    def test_alfil_check_can_not_be_blocked(self):
+        board = medieval_chess.Board("4k3/8/8/8/8/2b5/8/1N2K3 w - - 0 1")
+        self.assertNotIn(medieval_chess.Move.from_uci("b1d2"), board.legal_moves)
+        self.assertIn(medieval_chess.Move.from_uci("b1c3"), board.legal_moves)
+        self.assertIn(medieval_chess.Move.from_uci("e1f2"), board.legal_moves)
+
+    def test_legal_moves_arrays(self):
+        boards = [medieval_chess.Board(), medieval_chess.Board("4k3/8/8/8/8/8/8/4K2R b - - 0 1")]
+        codes, offsets = medieval_chess.legal_moves_arrays(boards)
+        self.assertEqual(len(offsets), 3)
+        for i, board in enumerate(boards):
+            self.assertEqual(codes[offsets[i]:offsets[i + 1]], board.legal_moves_array())
+
+
+class MedievalPerftTestCase(unittest.TestCase):
+
+    def test_starting_position(self):
+        board = medieval_chess.Board()
+        for depth, nodes in enumerate([1, 27, 729, 19230], 0):
+            self.assertEqual(medieval_chess.perft.perft(board, depth), nodes)
+        self.assertEqual(board, medieval_chess.Board())
+
+    def test_table(self):
+        board = medieval_chess.Board()
+        table: medieval_chess.perft.PerftTable = {}
+        self.assertEqual(medieval_chess.perft.perft(board, 4, table=table), 506735)
+        self.assertTrue(table)
+        self.assertEqual(medieval_chess.perft.perft(board, 4, table=table), 506735)
+
+    def test_table_bounded(self):
+        board = medieval_chess.Board()
+        table: medieval_chess.perft.PerftTable = {}
+        with unittest.mock.patch.object(medieval_chess.perft, "TABLE_SIZE", 16):
+            self.assertEqual(medieval_chess.perft.perft(board, 4, table=table), 506735)
+        self.assertLessEqual(len(table), 16)
+
+    def test_divide(self):
+        board = medieval_chess.Board("4k3/8/8/8/8/8/4P3/4K3 w - - 0 1")
+        counts = medieval_chess.perft.divide(board, 3)
+        self.assertEqual(set(counts), set(board.legal_moves))
+        self.assertEqual(sum(counts.values()), medieval_chess.perft.perft(board, 3))
+
+    def test_parallel_divide(self):
+        board = medieval_chess.Board()
+        board.push_uci("e2e4")
+        board.push_uci("d7d5")
+        board.push_uci("e4d5")
+        expected = medieval_chess.perft.divide(board, 3)
+        for split_depth in [1, 2]:
+            counts = medieval_chess.perft.parallel_divide(board, 3, processes=2, split_depth=split_depth)
+            self.assertEqual(counts, expected)
+            self.assertEqual(list(counts), sorted(expected, key=lambda move: move.uci()))
+
+    def test_parallel_divide_mate(self):
+        board = medieval_chess.Board("k7/8/1K6/8/8/8/8/7R w - - 0 1")
+        counts = medieval_chess.perft.parallel_divide(board, 3, processes=2, split_depth=2)
+        self.assertEqual(counts, medieval_chess.perft.divide(board, 3))
+        self.assertEqual(counts[medieval_chess.Move.from_uci("h1h8")], 0)
+
+    def test_pack_position(self):
+        board = medieval_chess.Board()
+        board.push_uci("e2e4")
+        board.push_uci("d7d5")
+        board.push_uci("e4d5")
+        position = medieval_chess.perft._pack_position(board)
+        unpacked = medieval_chess.perft._unpack_position(position)
+        self.assertEqual(unpacked.queens_grace_jump, board.queens_grace_jump)
+        self.assertTrue(unpacked.capture_happened)
+        self.assertEqual(unpacked.zobrist(), board.zobrist())
+
+
+class MedievalPositionsTestCase(unittest.TestCase):
+
+    def test_read_epd(self):
+        positions = medieval_chess.positions.read("data/endgame.epd")
+        with open("data/endgame.epd") as epds:
+            lines = [line for line in epds if line.strip() and not line.startswith("#")]
+        self.assertEqual(len(positions), len(lines))
+
+        for index in [0, 1, 99, -1]:
+            board, operations = medieval_chess.Board.from_epd(lines[index])
+            self.assertEqual(positions.board(index), board)
+            self.assertEqual(positions.operations(index), operations)
+
+    def test_read_fen(self):
+        board = medieval_chess.Board()
+        board.push_uci("e2e4")
+        board.push_uci("d7d5")
+        board.push_uci("e4d5")
+        lines = [
+            board.fen(medieval=True),
+            board.epd(hmvc=7, fmvn=9),
+            "r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1",
+            "4k3/8/8/8/8/8/8/Q~3K3 b - - 3 7",
+            "",
+            "# comment",
+            "4k3/8/8/3pP3/8/8/8/4K3 w - d6 0 12",
+        ]
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "positions.epd")
+            with open(path, "w") as f:
+                f.write("\n".join(lines) + "\n")
+            positions = medieval_chess.positions.read(path)
+
+        self.assertEqual(len(positions), 5)
+        self.assertEqual(positions.board(0).fen(medieval=True), board.fen(medieval=True))
+        self.assertTrue(positions.capture_happened[0])
+        self.assertEqual(positions.queens_grace_jump[0], medieval_chess.BB_D1 | medieval_chess.BB_D8)
+        self.assertEqual((positions.halfmove_clock[1], positions.fullmove_number[1]), (7, 9))
+        self.assertEqual(positions.operations(1), {"hmvc": 7, "fmvn": 9})
+        self.assertEqual(positions.castling_rights[2], medieval_chess.BB_CORNERS)
+        self.assertEqual(positions.board(3).board_fen(promoted=True), "4k3/8/8/8/8/8/8/Q~3K3")
+        self.assertEqual(positions.ep_square[4], medieval_chess.D6)
+        self.assertEqual(positions.operations(4), {})
+        self.assertEqual(positions.offsets[4], sum(len(line) + 1 for line in lines[:6]))
+
+    def test_chunks(self):
+        expected = medieval_chess.positions.read("data/endgame.epd")
+        spans = medieval_chess.positions.split("data/endgame.epd", chunk_size=1000)
+        self.assertGreater(len(spans), 5)
+
+        offsets = []
+        for span, chunk in zip(spans, medieval_chess.positions.chunks("data/endgame.epd", chunk_size=1000)):
+            copy = pickle.loads(pickle.dumps(chunk))
+            self.assertEqual(list(medieval_chess.positions.read("data/endgame.epd", span).offsets), list(copy.offsets))
+            offsets.extend(copy.offsets)
+        self.assertEqual(offsets, list(expected.offsets))
+
+    def test_invalid(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "positions.epd")
+            with open(path, "w") as f:
+                f.write("4k3/8/8/8/8/8/8/4K3 w - -\n4k3/8/8/8/8/8/8/4K3 x - -\n")
+            with self.assertRaisesRegex(ValueError, "at byte 26"):
+                medieval_chess.positions.read(path)
+
+            open(path, "w").close()
+            self.assertEqual(len(medieval_chess.positions.read(path)), 0)
+            self.assertEqual(medieval_chess.positions.split(path), [])
+
+
+class MedievalPolyglotTestCase(unittest.TestCase):
+
+    def test_medieval_zobrist_hash(self):
+        board = medieval_chess.Board()
+        self.assertEqual(len(medieval_chess.polyglot.MEDIEVAL_RANDOM_ARRAY), 910)
+        self.assertEqual(len(set(medieval_chess.polyglot.MEDIEVAL_RANDOM_ARRAY)), 910)
+
+        # Independent of the keys of Board.zobrist().
+        board_keys = {key for color in medieval_chess.ZOBRIST_PIECES for keys in color for key in keys}
+        board_keys.update(medieval_chess.ZOBRIST_CASTLING, medieval_chess.ZOBRIST_EP, [medieval_chess.ZOBRIST_TURN, medieval_chess.ZOBRIST_CAPTURE_HAPPENED])
+        self.assertFalse(board_keys & set(medieval_chess.polyglot.MEDIEVAL_RANDOM_ARRAY))
+
+        # Standard books do not know about grace jumps and captures.
+        plain = medieval_chess.Board("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w - - 0 1")
+        plain.queens, plain.queens_grace_jump = plain.queens | plain.queens_grace_jump, medieval_chess.BB_EMPTY
+        self.assertEqual(medieval_chess.polyglot.zobrist_hash(board), medieval_chess.polyglot.zobrist_hash(plain))
+        self.assertNotEqual(medieval_chess.polyglot.medieval_zobrist_hash(board), medieval_chess.polyglot.medieval_zobrist_hash(plain))
+
+        captured = board.copy()
+        captured.capture_happened = True
+        self.assertEqual(medieval_chess.polyglot.zobrist_hash(board), medieval_chess.polyglot.zobrist_hash(captured))
+        self.assertNotEqual(medieval_chess.polyglot.medieval_zobrist_hash(board), medieval_chess.polyglot.medieval_zobrist_hash(captured))
+
+    def test_build_book(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            paths = []
+            for i, movetext in enumerate(["1. e4 e5 2. Nf3 (2. d4) Nc6 *", "1. e4 {best} e5 2. d3 1-0", "1. d4 e5 $1 2. Qd3 *"]):
+                paths.append(os.path.join(tmpdir, f"games{i}.pgn"))
+                with open(paths[-1], "w") as f:
+                    f.write(f"[Event \"{i}\"]\n\n{movetext}\n")
+
+            path = os.path.join(tmpdir, "book.bin")
+            self.assertEqual(medieval_chess.polyglot.build_book(paths, path, max_ply=3, run_size=2), 7)
+
+            with medieval_chess.polyglot.open_reader(path, medieval=True) as reader:
+                keys = [entry.key for entry in reader]
+                self.assertEqual(keys, sorted(keys))
+
+                board = medieval_chess.Board()
+                self.assertEqual([(entry.move.uci(), entry.weight) for entry in reader.find_all(board)], [("e2e4", 2), ("d2d4", 1)])
+                board.push_san("e4")
+                self.assertEqual(reader.find(board).move, medieval_chess.Move.from_uci("e7e5"))
+                board.push_san("e5")
+                self.assertEqual(sorted(entry.move.uci() for entry in reader.find_all(board)), ["d2d3", "g1f3"])
+
+            with medieval_chess.polyglot.open_reader(path) as reader:
+                self.assertIsNone(reader.get(medieval_chess.Board()))
+
+    def test_build_book_promotion(self):
+        board = medieval_chess.Board("4k3/1P6/8/8/8/8/8/4K3 w - - 0 1")
+        with tempfile.TemporaryDirectory() as tmpdir:
+            pgn = os.path.join(tmpdir, "games.pgn")
+            with open(pgn, "w") as f:
+                f.write(f"[FEN \"{board.fen()}\"]\n\n1. b8=Q+ *\n")
+            path = os.path.join(tmpdir, "book.bin")
+            medieval_chess.polyglot.build_book([pgn], path)
+
+            with medieval_chess.polyglot.open_reader(path, medieval=True) as reader:
+                move = reader.find(board).move
+        self.assertEqual(move.promotion, medieval_chess.QUEEN_GRACE_JUMP)
+        self.assertTrue(board.is_legal(move))
+
+    def test_build_book_invalid(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            pgn = os.path.join(tmpdir, "games.pgn")
+            with open(pgn, "w") as f:
+                f.write("1. e4 e5 2. Ke3 *\n")
+            with self.assertRaises(ValueError):
+                medieval_chess.polyglot.build_book([pgn], os.path.join(tmpdir, "book.bin"))
+
+    def test_merge_books(self):
+        pack = medieval_chess.polyglot.ENTRY_STRUCT.pack
+        with tempfile.TemporaryDirectory() as tmpdir:
+            a = os.path.join(tmpdir, "a.bin")
+            with open(a, "wb") as f:
+                f.write(pack(1, 10, 5, 7) + pack(1, 11, 0xfff0, 0) + pack(3, 10, 1, 0))
+            b = os.path.join(tmpdir, "b.bin")
+            with open(b, "wb") as f:
+                f.write(pack(1, 11, 0x20, 0) + pack(1, 10, 8, 9) + pack(2, 10, 0, 0))
+            empty = os.path.join(tmpdir, "empty.bin")
+            open(empty, "wb").close()
+
+            out = os.path.join(tmpdir, "out.bin")
+            self.assertEqual(medieval_chess.polyglot.merge_books([a, b, empty], out), 4)
+            with medieval_chess.polyglot.MemoryMappedReader(out) as reader:
+                self.assertEqual([entry[:4] for entry in reader], [(1, 11, 0xffff, 0), (1, 10, 13, 7), (2, 10, 0, 0), (3, 10, 1, 0)])
+
+            self.assertEqual(medieval_chess.polyglot.merge_books([a, b], out, combine="max", minimum_weight=2), 2)
+            with medieval_chess.polyglot.MemoryMappedReader(out) as reader:
+                self.assertEqual([entry[:4] for entry in reader], [(1, 11, 0xfff0, 0), (1, 10, 8, 7)])
+
+            # Filter in place.
+            self.assertEqual(medieval_chess.polyglot.merge_books([b], b, minimum_weight=1), 2)
+            self.assertEqual(os.path.getsize(b), 32)
+            self.assertEqual(sorted(os.listdir(tmpdir)), ["a.bin", "b.bin", "empty.bin", "out.bin"])
+
+            with self.assertRaises(ValueError):
+                medieval_chess.polyglot.merge_books([a], out, combine="min")
+            with open(empty, "wb") as f:
+                f.write(b"\x00" * 17)
+            with self.assertRaises(IOError):
+                medieval_chess.polyglot.merge_books([a, empty], out)
+
+    def test_main(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "book.bin")
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                medieval_chess.polyglot.main(["merge", "data/polyglot/performance.bin", "data/polyglot/lasker-trap.bin", "-o", path])
+                medieval_chess.polyglot.main(["filter", path, "--min-weight", "2", "-o", path])
+            self.assertIn(f"to {path}", output.getvalue())
+
+            with medieval_chess.polyglot.open_reader(path) as reader:
+                self.assertTrue(all(entry.weight >= 2 for entry in reader))
+                self.assertGreater(len(reader), 0)
+
+            if numpy is not None:
+                output = io.StringIO()
+                with contextlib.redirect_stdout(output):
+                    medieval_chess.polyglot.main(["stats", path])
+                self.assertIn("positions:", output.getvalue())
+
+    def test_fences_and_cache(self):
+        with medieval_chess.polyglot.open_reader("data/polyglot/performance.bin") as reader:
+            keys = [entry.key for entry in reader]
+
+        probes = keys[:3] + keys[255:258] + keys[-3:] + [0, 1, 0x463b96181691fc9c, 0xffff_ffff_ffff_ffff]
+        for fence_stride in [1, 7, 256, len(keys) + 1]:
+            with medieval_chess.polyglot.MemoryMappedReader("data/polyglot/performance.bin", fence_stride=fence_stride) as reader:
+                for key in probes:
+                    self.assertEqual(reader.bisect_key_left(key), bisect.bisect_left(keys, key))
+
+        with medieval_chess.polyglot.MemoryMappedReader("data/polyglot/performance.bin", cache_size=2) as reader:
+            start = [entry.move for entry in reader.find_all(0x463b96181691fc9c)]
+            self.assertEqual(len(start), 3)
+            self.assertEqual([entry.move for entry in reader.find_all(0x463b96181691fc9c)], start)
+            self.assertEqual((reader.hits, reader.misses), (1, 1))
+
+            reader.get(keys[0])
+            reader.get(keys[-1])
+            reader.get(0x463b96181691fc9c)
+            self.assertEqual((reader.hits, reader.misses), (1, 4))
+
+            reader.clear_cache()
+            self.assertEqual((reader.hits, reader.misses), (0, 0))
+
+    @unittest.skipIf(numpy is None, "numpy not installed")
+    def test_array(self):
+        with medieval_chess.polyglot.open_reader("data/polyglot/performance.bin") as reader:
+            entries = reader.array()
+            self.assertEqual(len(entries), len(reader))
+            for index in [0, 1, 1000, -1]:
+                self.assertEqual(tuple(int(value) for value in entries[index]), reader[index][:4])
+
+            keys = [reader[0].key, 0x463b96181691fc9c, 0, 0xffff_ffff_ffff_ffff, reader[-1].key]
+            start, stop = reader.key_ranges(keys)
+            for key, first, last in zip(keys, start.tolist(), stop.tolist()):
+                self.assertEqual(first, reader.bisect_key_left(key))
+                self.assertEqual(last - first, sum(1 for _ in reader.find_all(key, minimum_weight=0)))
+            self.assertEqual(stop[1] - start[1], 3)
+
+            stats = reader.stats(chunk_size=1000)
+            weights = [entry.weight for entry in reader]
+            self.assertEqual(stats, (len(reader), len(set(entry.key for entry in reader)), sum(weights), max(weights), weights.count(0)))
+            del entries, start, stop
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "empty.bin")
+            open(path, "wb").close()
+            with medieval_chess.polyglot.open_reader(path) as reader:
+                self.assertEqual(reader.stats(), (0, 0, 0, 0, 0))
+                self.assertEqual(reader.key_ranges([1])[0].tolist(), [0])
+
+
+class MedievalSearchTestCase(unittest.TestCase):
+
+    def test_mate_in_one(self):
+        board = medieval_chess.Board("6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1")
+        info = medieval_chess.search.analyse(board, medieval_chess.engine.Limit(depth=3))
+        self.assertEqual(info["pv"][0], medieval_chess.Move.from_uci("a1a8"))
+        self.assertEqual(info["score"], medieval_chess.engine.PovScore(medieval_chess.engine.Mate(+1), medieval_chess.WHITE))
+        self.assertEqual(info["depth"], 1)
+
+    def test_mate_in_two(self):
+        board = medieval_chess.Board("7k/8/5K2/8/8/8/8/R7 w - - 0 1")
+        info = medieval_chess.search.analyse(board, medieval_chess.engine.Limit(mate=2))
+        self.assertEqual(info["score"].relative, medieval_chess.engine.Mate(+2))
+        for move in info["pv"][:3]:
+            board.push(move)
+        self.assertTrue(board.is_checkmate())
+
+    def test_material(self):
+        board = medieval_chess.Board("4k3/8/8/8/3r4/8/P3N3/4K3 w - - 0 1")
+        result = medieval_chess.search.play(board, medieval_chess.engine.Limit(depth=2), info=medieval_chess.engine.INFO_SCORE)
+        self.assertEqual(result.move, medieval_chess.Move.from_uci("e2d4"))
+        self.assertEqual(set(result.info), {"score"})
+        self.assertGreater(result.info["score"].white().score(), 0)
+
+    def test_game_over(self):
+        board = medieval_chess.Board("R5k1/5ppp/8/8/8/8/8/6K1 b - - 0 1")
+        result = medieval_chess.search.play(board, medieval_chess.engine.Limit(depth=3), info=medieval_chess.engine.INFO_ALL)
+        self.assertIsNone(result.move)
+        self.assertEqual(result.info["score"].relative, medieval_chess.engine.Mate(-0))
+
+        board = medieval_chess.Board("7k/5Q2/6K1/8/8/8/8/8 b - - 0 1")
+        self.assertTrue(board.is_stalemate())
+        info = medieval_chess.search.analyse(board, medieval_chess.engine.Limit(depth=3))
+        self.assertEqual(info["score"].relative, medieval_chess.engine.Cp(0))
+        self.assertEqual(info["pv"], [])
+
+    def test_limits(self):
+        board = medieval_chess.Board()
+        board.push_san("e4")
+        fen, stack = board.fen(), board.move_stack[:]
+        searcher = medieval_chess.search.Searcher()
+
+        info = searcher.analyse(board, medieval_chess.engine.Limit(nodes=2000))
+        self.assertLessEqual(info["nodes"], 2000)
+        self.assertTrue(board.is_legal(info["pv"][0]))
+
+        start = time.perf_counter()
+        result = searcher.play(board, medieval_chess.engine.Limit(time=0.2))
+        self.assertLess(time.perf_counter() - start, 1.0)
+        self.assertTrue(board.is_legal(result.move))
+
+        result = searcher.play(board, medieval_chess.engine.Limit(white_clock=1.0, black_clock=1.0, remaining_moves=10))
+        self.assertTrue(board.is_legal(result.move))
+        self.assertEqual((board.fen(), board.move_stack), (fen, stack))
+
+        with self.assertRaises(ValueError):
+            searcher.analyse(board, medieval_chess.engine.Limit())
+
+    def test_repetition(self):
+        # Black is lost, but can escape into a repetition.
+        board = medieval_chess.Board("k7/8/8/8/8/8/6R1/6RK b - - 0 1")
+        board.push_san("Kb8")
+        board.push_san("Kh2")
+        board.push_san("Ka8")
+        board.push_san("Kh1")
+        self.assertEqual(medieval_chess.search.evaluate(board), -1000)
+        board.push_san("Kb8")
+        board.push_san("Kh2")
+        info = medieval_chess.search.analyse(board, medieval_chess.engine.Limit(depth=1))
+        self.assertEqual(info["score"].relative, medieval_chess.engine.Cp(0))
+        self.assertEqual(info["pv"][0], medieval_chess.Move.from_uci("b8a8"))
+
+
+@unittest.skipIf(numpy is None, "numpy not installed")
+class MedievalTensorTestCase(unittest.TestCase):
+
+    def test_encode(self):
+        board = medieval_chess.Board()
+        for uci in ["e2e4", "d7d5", "e4d5"]:
+            board.push_uci(uci)
+
+        planes = medieval_chess.tensor.encode(board)
+        self.assertEqual(planes.shape, (medieval_chess.tensor.PLANES, 8, 8))
+        self.assertEqual(planes.dtype, numpy.uint8)
+        for square in medieval_chess.SQUARES:
+            piece = board.piece_at(square)
+            column = planes[:medieval_chess.tensor.PIECE_PLANES, medieval_chess.square_rank(square), medieval_chess.square_file(square)]
+            if piece:
+                self.assertEqual(column.nonzero()[0].tolist(), [medieval_chess.tensor.piece_plane(piece.piece_type, piece.color)])
+            else:
+                self.assertFalse(column.any())
+        self.assertTrue(planes[medieval_chess.tensor.CAPTURE_HAPPENED_PLANE].all())
+        self.assertFalse(planes[medieval_chess.tensor.TURN_PLANE].any())
+        self.assertEqual(planes[medieval_chess.tensor.piece_plane(medieval_chess.QUEEN_GRACE_JUMP, medieval_chess.BLACK), 7, 3], 1)
+
+    def test_encode_batch(self):
+        boards = [medieval_chess.Board(), medieval_chess.Board("4k3/8/8/8/8/8/4P3/4K3 b - - 0 1")]
+        out = numpy.zeros((3, medieval_chess.tensor.PLANES, 8, 8), dtype=numpy.uint8)
+        encoded = medieval_chess.tensor.encode_batch(boards, out)
+        self.assertEqual(encoded.shape, (2, medieval_chess.tensor.PLANES, 8, 8))
+        for i, board in enumerate(boards):
+            self.assertTrue(numpy.array_equal(out[i], medieval_chess.tensor.encode(board)))
+
+    def test_fill_from_pgn(self):
+        pgn = io.StringIO(textwrap.dedent("""\
+            [Event "Comments and variations"]
+
+            1. e4 {a comment
+            [not a tag]} d5 2. exd5 (2. Nc3 Nf6) Nf6 $1 3. Nf3! Nxd5 1-0
+
+            [Event "Setup"]
+            [FEN "4k3/8/8/8/8/8/4P3/4K3 w - - 0 1"]
+
+            1. e4 Kd7 *
+            """))
+
+        expected = []
+        board = medieval_chess.Board()
+        expected.append(medieval_chess.tensor.encode(board))
+        for uci in ["e2e4", "d7d5", "e4d5", "g8f6", "g1f3", "f6d5"]:
+            board.push_uci(uci)
+            expected.append(medieval_chess.tensor.encode(board))
+        board = medieval_chess.Board("4k3/8/8/8/8/8/4P3/4K3 w - - 0 1")
+        expected.append(medieval_chess.tensor.encode(board))
+        for uci in ["e2e4", "e8d7"]:
+            board.push_uci(uci)
+            expected.append(medieval_chess.tensor.encode(board))
+
+        out = numpy.zeros((20, medieval_chess.tensor.PLANES, 8, 8), dtype=numpy.uint8)
+        self.assertEqual(medieval_chess.tensor.fill_from_pgn(pgn, out), 10)
+        self.assertTrue(numpy.array_equal(out[:10], numpy.stack(expected)))
+
+        pgn.seek(0)
+        out = numpy.zeros((4, medieval_chess.tensor.PLANES, 8, 8), dtype=numpy.uint8)
+        self.assertEqual(medieval_chess.tensor.fill_from_pgn(pgn, out), 4)
+        self.assertTrue(numpy.array_equal(out, numpy.stack(expected[:4])))
+
+
 if __name__ == "__main__":
     verbosity = sum(arg.count("v") for arg in sys.argv if all(c == "v" for c in arg.lstrip("-")))
     verbosity += sys.argv.count("--verbose")